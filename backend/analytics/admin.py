@@ -1,3 +1,19 @@
 from django.contrib import admin
 
 # Register your models here.
+from .models import SiteMetric, ProductViewRollup, ProductRecommendation
+
+admin.site.register(SiteMetric)
+
+@admin.register(ProductViewRollup)
+class ProductViewRollupAdmin(admin.ModelAdmin):
+    list_display = ('product', 'granularity', 'bucket_start', 'views')
+    list_filter = ('granularity',)
+    date_hierarchy = 'bucket_start'
+
+
+@admin.register(ProductRecommendation)
+class ProductRecommendationAdmin(admin.ModelAdmin):
+    list_display = ('product', 'rank', 'recommended', 'score', 'sessions')
+    list_select_related = ('product', 'recommended')
+    search_fields = ('product__name',)
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from analytics.recommendations import MIN_SESSIONS, TOP_K, WINDOW_DAYS, build_recommendations
+
+
+class Command(BaseCommand):
+    help = 'Recalcula o "quem viu também viu" a partir das sessões de visualização (rodar via cron).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=WINDOW_DAYS, help="Janela de sessões considerada")
+        parser.add_argument('--top-k', type=int, default=TOP_K, help="Vizinhos guardados por produto")
+        parser.add_argument('--min-sessions', type=int, default=MIN_SESSIONS,
+                            help="Mínimo de sessões em comum para recomendar")
+
+    def handle(self, *args, **options):
+        total = build_recommendations(days=options['days'], top_k=options['top_k'], min_sessions=options['min_sessions'])
+        self.stdout.write(self.style.SUCCESS(f"{total} recomendações gravadas."))
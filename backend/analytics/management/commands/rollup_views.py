@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from analytics.rollup import rollup_views
+
+
+class Command(BaseCommand):
+    help = "Agrega os eventos de visualização nos baldes de hora/dia (rodar via cron)."
+
+    def handle(self, *args, **options):
+        total = rollup_views()
+        self.stdout.write(self.style.SUCCESS(f"{total} visualizações agregadas."))
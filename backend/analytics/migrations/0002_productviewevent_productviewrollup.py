@@ -0,0 +1,51 @@
+# Generated by Django 5.1.15 on 2026-10-18 12:06
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+from django.db.models import Sum
+
+
+def seed_total_views(apps, schema_editor):
+    # O total do site passa a vir do SiteMetric: parte do que já está em views_count
+    Product = apps.get_model('products', 'Product')
+    SiteMetric = apps.get_model('analytics', 'SiteMetric')
+    total = Product.objects.aggregate(total=Sum('views_count'))['total'] or 0
+    SiteMetric.objects.update_or_create(pk=1, defaults={'total_catalog_views': total})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0001_initial'),
+        ('products', '0014_alter_product_views_count'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductViewEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('views', models.PositiveIntegerField(default=1)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='view_events', to='products.product')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ProductViewRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('granularity', models.CharField(choices=[('hour', 'Hora'), ('day', 'Dia')], max_length=4)),
+                ('bucket_start', models.DateTimeField()),
+                ('views', models.PositiveIntegerField(default=0)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='view_rollups', to='products.product')),
+            ],
+            options={
+                'verbose_name': 'Visualizações agregadas',
+                'verbose_name_plural': 'Visualizações agregadas',
+                'indexes': [models.Index(fields=['granularity', 'bucket_start'], name='view_rollup_bucket_idx')],
+                'constraints': [models.UniqueConstraint(fields=('product', 'granularity', 'bucket_start'), name='unique_view_bucket')],
+            },
+        ),
+        migrations.RunPython(seed_total_views, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.1.15 on 2026-10-18 12:36
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0002_productviewevent_productviewrollup'),
+        ('products', '0020_coupon_code_normalized'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductRecommendation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rank', models.PositiveSmallIntegerField()),
+                ('score', models.FloatField()),
+                ('sessions', models.PositiveIntegerField(help_text='Sessões que viram os dois produtos')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='recommendations', to='products.product')),
+                ('recommended', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='recommended_in', to='products.product')),
+            ],
+            options={
+                'verbose_name': 'Recomendação',
+                'verbose_name_plural': 'Recomendações',
+                'constraints': [models.UniqueConstraint(fields=('product', 'rank'), name='unique_recommendation_rank')],
+            },
+        ),
+        migrations.CreateModel(
+            name='SessionProductView',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('session', models.CharField(max_length=32)),
+                ('created_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='session_views', to='products.product')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('session', 'product'), name='unique_session_product')],
+            },
+        ),
+    ]
@@ -1,9 +1,87 @@
 from django.db import models
+from django.utils import timezone
 
 # Create your models here.
 class SiteMetric(models.Model):
+    """Linha única (pk=1) com o total de visualizações do catálogo, mantida pelo rollup."""
     total_catalog_views = models.PositiveIntegerField(default=0)
     last_updated = models.DateTimeField(auto_now=True)
 
     def __str__(self):
-        return f"Total Views: {self.total_catalog_views}"   
\ No newline at end of file
+        return f"Total Views: {self.total_catalog_views}"
+
+
+class ProductViewEvent(models.Model):
+    """
+    Eventos brutos de visualização (só INSERT). Cada flush do contador de views
+    grava uma linha por produto; o rollup consome e apaga essas linhas.
+    """
+    product = models.ForeignKey('products.Product', related_name='view_events', on_delete=models.CASCADE)
+    views = models.PositiveIntegerField(default=1)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"{self.product_id} +{self.views} ({self.created_at:%d/%m %H:%M})"
+
+
+class ProductViewRollup(models.Model):
+    """Visualizações já agregadas por produto em baldes de hora e de dia."""
+    HOUR = 'hour'
+    DAY = 'day'
+    GRANULARITY_CHOICES = [(HOUR, 'Hora'), (DAY, 'Dia')]
+
+    product = models.ForeignKey('products.Product', related_name='view_rollups', on_delete=models.CASCADE)
+    granularity = models.CharField(max_length=4, choices=GRANULARITY_CHOICES)
+    bucket_start = models.DateTimeField()
+    views = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name = "Visualizações agregadas"
+        verbose_name_plural = "Visualizações agregadas"
+        constraints = [
+            models.UniqueConstraint(fields=['product', 'granularity', 'bucket_start'], name='unique_view_bucket'),
+        ]
+        indexes = [
+            models.Index(fields=['granularity', 'bucket_start'], name='view_rollup_bucket_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id} [{self.granularity} {self.bucket_start:%d/%m %H:%M}] {self.views}"
+
+
+class SessionProductView(models.Model):
+    """
+    Produto visto numa sessão anônima (só o hash da sessão, nada de IP). Uma linha por
+    par sessão/produto: é a matéria-prima do "quem viu também viu".
+    """
+    session = models.CharField(max_length=32)
+    product = models.ForeignKey('products.Product', related_name='session_views', on_delete=models.CASCADE)
+    created_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['session', 'product'], name='unique_session_product'),
+        ]
+
+    def __str__(self):
+        return f"{self.session[:8]} -> {self.product_id}"
+
+
+class ProductRecommendation(models.Model):
+    """Top-K vizinhos de cada produto, reescrito pelo build_recommendations (analytics/recommendations.py)."""
+    product = models.ForeignKey('products.Product', related_name='recommendations', on_delete=models.CASCADE)
+    recommended = models.ForeignKey('products.Product', related_name='recommended_in', on_delete=models.CASCADE)
+    rank = models.PositiveSmallIntegerField()
+    score = models.FloatField()
+    sessions = models.PositiveIntegerField(help_text="Sessões que viram os dois produtos")
+
+    class Meta:
+        verbose_name = "Recomendação"
+        verbose_name_plural = "Recomendações"
+        constraints = [
+            # Também é o índice da leitura: WHERE product_id = X ORDER BY rank
+            models.UniqueConstraint(fields=['product', 'rank'], name='unique_recommendation_rank'),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id} #{self.rank} -> {self.recommended_id} ({self.score:.2f})"
@@ -0,0 +1,121 @@
+import hashlib
+import hmac
+from datetime import timedelta
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from rest_framework.throttling import BaseThrottle
+
+from .models import ProductRecommendation, SessionProductView
+
+TOP_K = 12
+WINDOW_DAYS = 30
+MIN_SESSIONS = 2
+# Sessão que abre dezenas de produtos é robô/crawler: entraria com n² pares e só faz ruído
+MAX_SESSION_ITEMS = 50
+
+
+def session_key(request):
+    """
+    Identificador anônimo da sessão: o id aleatório que a vitrine manda no corpo
+    (`session`) ou, sem ele, navegador + dia; sempre junto do IP do cliente. Só o HMAC
+    vai pro banco.
+
+    O IP vem do get_ident do DRF, que com NUM_PROXIES configurado só confia na entrada
+    do X-Forwarded-For anotada pelo nosso proxy. Como ele entra no hash, inventar ids de
+    sessão não basta para inflar as recomendações: cada IP é no máximo um "visitante" por id.
+    """
+    data = request.data if hasattr(request.data, 'get') else {}
+    session = str(data.get('session') or '')[:64]
+    if not session:
+        session = f"{request.headers.get('User-Agent', '')}|{timezone.localdate()}"
+    raw = f"{BaseThrottle().get_ident(request)}|{session}"
+    return hmac.new(settings.SECRET_KEY.encode(), raw.encode(), hashlib.sha256).hexdigest()[:32]
+
+
+def record_session_views(pairs):
+    """Grava um lote {(sessão, product_id)} vindo do contador de visualizações (repetidos são ignorados)."""
+    now = timezone.now()
+    SessionProductView.objects.bulk_create(
+        [SessionProductView(session=session, product_id=product_id, created_at=now) for session, product_id in pairs],
+        ignore_conflicts=True,
+    )
+
+
+def _cooccurrence(session_codes, product_codes, n_products):
+    """
+    Matriz produto x produto de sessões em comum, esparsa (formato COO: linhas, colunas,
+    valores), montada só com operações vetorizadas: todos os pares de cada sessão são
+    gerados de uma vez com repeat/arange, e o np.unique conta os pares iguais.
+    """
+    order = np.argsort(session_codes, kind='stable')
+    product_codes = product_codes[order]
+    _, starts, sizes = np.unique(session_codes[order], return_index=True, return_counts=True)
+
+    item_size = np.repeat(sizes, sizes)
+    item_start = np.repeat(starts, sizes)
+    usable = (item_size >= 2) & (item_size <= MAX_SESSION_ITEMS)
+    items = np.nonzero(usable)[0]
+    # Sessões por produto (cada par sessão/produto é único na tabela)
+    support = np.bincount(product_codes[usable], minlength=n_products)
+    if not len(items):
+        return np.empty(0, np.int64), np.empty(0, np.int64), np.empty(0, np.int64), support
+
+    # Cada item da sessão pareado com todos os itens da mesma sessão (menos ele mesmo)
+    repeats = item_size[items]
+    left = np.repeat(items, repeats)
+    offsets = np.arange(repeats.sum()) - np.repeat(np.cumsum(repeats) - repeats, repeats)
+    right = np.repeat(item_start[items], repeats) + offsets
+    distinct = left != right
+
+    pair_keys = product_codes[left[distinct]].astype(np.int64) * n_products + product_codes[right[distinct]]
+    keys, together = np.unique(pair_keys, return_counts=True)
+    return keys // n_products, keys % n_products, together, support
+
+
+def _top_k(rows, cols, together, support, top_k, min_sessions):
+    """Fica com os `top_k` vizinhos de cada produto, por similaridade de cosseno."""
+    keep = together >= min_sessions
+    rows, cols, together = rows[keep], cols[keep], together[keep]
+    score = together / np.sqrt(support[rows].astype(float) * support[cols])
+
+    order = np.lexsort((cols, -together, -score, rows))
+    rows, cols, together, score = rows[order], cols[order], together[order], score[order]
+    _, firsts, counts = np.unique(rows, return_index=True, return_counts=True)
+    rank = np.arange(len(rows)) - np.repeat(firsts, counts)
+    keep = rank < top_k
+    return rows[keep], cols[keep], together[keep], score[keep], rank[keep]
+
+
+def build_recommendations(days=WINDOW_DAYS, top_k=TOP_K, min_sessions=MIN_SESSIONS):
+    """
+    Job em lote (cron): recalcula o "quem viu também viu" a partir das sessões dos
+    últimos `days` dias e regrava a tabela ProductRecommendation inteira.
+    Também apaga as sessões mais velhas que a janela. Retorna quantas linhas gravou.
+    """
+    since = timezone.now() - timedelta(days=days)
+    SessionProductView.objects.filter(created_at__lt=since).delete()
+
+    views = SessionProductView.objects.filter(product__is_active=True).values_list('session', 'product_id')
+    sessions, products = [], []
+    for session, product_id in views.iterator(chunk_size=5000):
+        sessions.append(session)
+        products.append(product_id)
+
+    recommendations = []
+    if products:
+        _, session_codes = np.unique(np.array(sessions), return_inverse=True)
+        product_ids, product_codes = np.unique(np.array(products, dtype=np.int64), return_inverse=True)
+        rows, cols, together, support = _cooccurrence(session_codes, product_codes, len(product_ids))
+        for row, col, count, score, rank in zip(*_top_k(rows, cols, together, support, top_k, min_sessions)):
+            recommendations.append(ProductRecommendation(
+                product_id=int(product_ids[row]), recommended_id=int(product_ids[col]),
+                rank=int(rank), score=float(score), sessions=int(count),
+            ))
+
+    with transaction.atomic():
+        ProductRecommendation.objects.all().delete()
+        ProductRecommendation.objects.bulk_create(recommendations, batch_size=1000)
+    return len(recommendations)
@@ -0,0 +1,104 @@
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import F, Sum
+from django.db.models.functions import TruncDay, TruncHour
+from django.utils import timezone
+
+from .models import ProductViewEvent, ProductViewRollup, SiteMetric
+
+BUCKETS = (
+    (ProductViewRollup.HOUR, TruncHour),
+    (ProductViewRollup.DAY, TruncDay),
+)
+
+
+def record_view_events(batch):
+    """Grava um lote {product_id: views} vindo do contador de visualizações."""
+    now = timezone.now()
+    ProductViewEvent.objects.bulk_create(
+        [ProductViewEvent(product_id=product_id, views=views, created_at=now) for product_id, views in batch.items()]
+    )
+
+
+@transaction.atomic
+def rollup_views():
+    """
+    Agrega os eventos brutos nos baldes de hora/dia, soma no total do site e apaga
+    os eventos processados. Retorna quantas visualizações foram agregadas.
+    """
+    # Trava a linha do total: dois rollups simultâneos (vários workers) ficam em fila
+    SiteMetric.objects.get_or_create(pk=1)
+    metric = SiteMetric.objects.select_for_update().get(pk=1)
+
+    # Trava e anota exatamente as linhas processadas: um evento com id menor que fizer
+    # commit no meio do caminho fica para o próximo rollup, em vez de ser apagado sem contar
+    event_ids = list(ProductViewEvent.objects.select_for_update().values_list('id', flat=True))
+    if not event_ids:
+        return 0
+    events = ProductViewEvent.objects.filter(id__in=event_ids)
+
+    for granularity, trunc in BUCKETS:
+        rows = (
+            events.annotate(bucket=trunc('created_at'))
+            .values('product_id', 'bucket')
+            .annotate(total=Sum('views'))
+        )
+        _add_to_buckets(granularity, {(row['product_id'], row['bucket']): row['total'] for row in rows})
+
+    total = events.aggregate(total=Sum('views'))['total'] or 0
+    SiteMetric.objects.filter(pk=metric.pk).update(
+        total_catalog_views=F('total_catalog_views') + total, last_updated=timezone.now()
+    )
+    events.delete()
+    return total
+
+
+def _add_to_buckets(granularity, totals):
+    if not totals:
+        return
+    existing = ProductViewRollup.objects.filter(
+        granularity=granularity,
+        product_id__in={product_id for product_id, _ in totals},
+        bucket_start__in={bucket for _, bucket in totals},
+    )
+    to_update = []
+    for rollup in existing:
+        key = (rollup.product_id, rollup.bucket_start)
+        if key in totals:
+            rollup.views += totals.pop(key)
+            to_update.append(rollup)
+
+    ProductViewRollup.objects.bulk_update(to_update, ['views'])
+    ProductViewRollup.objects.bulk_create([
+        ProductViewRollup(product_id=product_id, granularity=granularity, bucket_start=bucket, views=views)
+        for (product_id, bucket), views in totals.items()
+    ])
+
+
+def total_catalog_views():
+    metric = SiteMetric.objects.filter(pk=1).first()
+    return metric.total_catalog_views if metric else 0
+
+
+def daily_trend(days=14):
+    """Total de views por dia (últimos N dias), lido só dos baldes diários."""
+    since = timezone.localtime().replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=days - 1)
+    rows = (
+        ProductViewRollup.objects.filter(granularity=ProductViewRollup.DAY, bucket_start__gte=since)
+        .values('bucket_start')
+        .annotate(views=Sum('views'))
+        .order_by('bucket_start')
+    )
+    return [{'date': timezone.localdate(row['bucket_start']), 'views': row['views']} for row in rows]
+
+
+def top_products(days=7, limit=10):
+    """Produtos mais vistos nos últimos N dias: [{'product_id': .., 'views': ..}]."""
+    since = timezone.now() - timedelta(days=days)
+    return list(
+        ProductViewRollup.objects.filter(granularity=ProductViewRollup.HOUR, bucket_start__gte=since)
+        .values('product_id')
+        .annotate(views=Sum('views'))
+        .order_by('-views')[:limit]
+    )
@@ -1,3 +1,98 @@
-from django.test import TestCase
+from django.conf import settings
+from django.test import TestCase, override_settings
+from rest_framework.parsers import JSONParser
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
 
-# Create your tests here.
+from products.models import Category, Product
+from .models import ProductRecommendation, ProductViewEvent, ProductViewRollup, SessionProductView
+from .recommendations import build_recommendations, record_session_views, session_key
+from .rollup import daily_trend, record_view_events, rollup_views, top_products, total_catalog_views
+
+
+class RollupTests(TestCase):
+    def setUp(self):
+        category = Category.objects.create(name='Cartões', slug='cartoes')
+        self.first = Product.objects.create(category=category, name='A', image='products/a.jpg', production_time='1 dia')
+        self.second = Product.objects.create(category=category, name='B', image='products/b.jpg', production_time='1 dia')
+
+    def test_events_are_rolled_up_additively(self):
+        record_view_events({self.first.pk: 3, self.second.pk: 1})
+        self.assertEqual(rollup_views(), 4)
+        record_view_events({self.first.pk: 2})
+        self.assertEqual(rollup_views(), 2)
+
+        self.assertFalse(ProductViewEvent.objects.exists())
+        hourly = ProductViewRollup.objects.get(product=self.first, granularity=ProductViewRollup.HOUR)
+        daily = ProductViewRollup.objects.get(product=self.first, granularity=ProductViewRollup.DAY)
+        self.assertEqual((hourly.views, daily.views), (5, 5))
+
+        self.assertEqual(total_catalog_views(), 6)
+        self.assertEqual(top_products()[0], {'product_id': self.first.pk, 'views': 5})
+        self.assertEqual(daily_trend()[-1]['views'], 6)
+
+    def test_dashboard_reads_rollups(self):
+        from django.contrib.auth.models import User
+        from rest_framework.test import APIClient
+
+        record_view_events({self.second.pk: 2})
+        rollup_views()
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user('admin'))
+        data = client.get('/api/dashboard/stats/').json()
+        self.assertEqual(data['total_catalog_views'], 2)
+        self.assertEqual(data['top_last_7_days'], [{'id': self.second.pk, 'name': 'B', 'views': 2}])
+
+
+class RecommendationTests(TestCase):
+    def setUp(self):
+        category = Category.objects.create(name='Cartões', slug='cartoes')
+        self.products = [
+            Product.objects.create(category=category, name=name, image='products/a.jpg', production_time='1 dia')
+            for name in ('A', 'B', 'C', 'D')
+        ]
+
+    def test_top_neighbours_from_session_cooccurrence(self):
+        a, b, c, d = (product.pk for product in self.products)
+        record_session_views({
+            ('s1', a), ('s1', b), ('s1', c),
+            ('s2', a), ('s2', b),
+            ('s3', a), ('s3', c),
+            ('s4', b), ('s4', d),
+        })
+        record_session_views({('s1', a)})  # repetido na mesma sessão não conta de novo
+
+        self.assertEqual(build_recommendations(top_k=2), 4)
+        neighbours = ProductRecommendation.objects.filter(product_id=a).order_by('rank')
+        # Empate em sessões comuns: C ganha no cosseno (é visto menos vezes fora de A)
+        self.assertEqual([(r.recommended_id, r.sessions) for r in neighbours], [(c, 2), (b, 2)])
+        # D só divide uma sessão com B: abaixo do mínimo
+        self.assertFalse(ProductRecommendation.objects.filter(recommended_id=d).exists())
+
+        self.products[1].is_active = False
+        self.products[1].save()
+        with self.assertNumQueries(1):
+            data = self.client.get(f'/api/products/{a}/recommendations/').json()
+        self.assertEqual([product['id'] for product in data], [c])
+
+    def test_views_record_anonymous_sessions(self):
+        from products.view_counter import ViewCounter
+
+        counter = ViewCounter(flush_interval=3600, flush_threshold=1000)
+        counter._ensure_flusher = lambda: None
+        for product in self.products[:3]:
+            counter.record(product.pk, session='hash-da-sessao')
+        self.products[2].delete()
+        counter.flush()
+        self.assertEqual(SessionProductView.objects.filter(session='hash-da-sessao').count(), 2)
+
+    @override_settings(REST_FRAMEWORK={**settings.REST_FRAMEWORK, 'NUM_PROXIES': 1})
+    def test_session_key_ignores_forged_forwarded_for(self):
+        def key(forwarded, session='abc'):
+            request = APIRequestFactory().post('/', {'session': session}, format='json',
+                                               HTTP_X_FORWARDED_FOR=forwarded)
+            return session_key(Request(request, parsers=[JSONParser()]))
+
+        self.assertEqual(key('6.6.6.6, 10.0.0.1'), key('7.7.7.7, 10.0.0.1'))
+        self.assertNotEqual(key('6.6.6.6, 10.0.0.1'), key('6.6.6.6, 10.0.0.2'))
+        self.assertNotEqual(key('10.0.0.1'), key('10.0.0.1', session='outra'))
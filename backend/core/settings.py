@@ -37,6 +37,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
 
     'rest_framework',
     'django_filters',
@@ -142,6 +143,15 @@ STATIC_URL = 'static/'
 STATIC_ROOT = BASE_DIR / "staticfiles"
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Entrega de /media/ pelo proxy (o worker do Django só manda os cabeçalhos):
+# nginx -> MEDIA_ACCEL_REDIRECT_PREFIX=/protected-media/ (location internal apontando pro MEDIA_ROOT)
+# Apache/lighttpd -> MEDIA_SENDFILE_HEADER=X-Sendfile
+MEDIA_ACCEL_REDIRECT_PREFIX = os.getenv('MEDIA_ACCEL_REDIRECT_PREFIX', '')
+MEDIA_SENDFILE_HEADER = os.getenv('MEDIA_SENDFILE_HEADER', '')
+
+# Domínio público da loja (links do feed do Google Merchant e do sitemap)
+SITE_URL = os.getenv('SITE_URL', 'https://cloudgraficarapida.com.br').rstrip('/')
+
 CORS_ALLOWED_ORIGINS = os.getenv('CORS_ALLOWED_ORIGINS', 'http://localhost:3000').split(',')
 CSRF_TRUSTED_ORIGINS = os.getenv('CSRF_TRUSTED_ORIGINS', 'http://localhost:3000').split(',')
 SECURE_PROXY_SSL_HEADER = ('HTTP_X_FORWARDED_PROTO', 'https')
@@ -159,8 +169,45 @@ REST_FRAMEWORK = {
     ],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 12,
+    # Proxies na frente do gunicorn. O DRF pega o IP do cliente nessa posição do
+    # X-Forwarded-For; sem isso o header inteiro vira a identidade e basta trocá-lo a cada
+    # requisição para escapar do throttle. Padrão 0 (usa o REMOTE_ADDR, o header é ignorado):
+    # só vale ligar (NUM_PROXIES=1 no docker-compose) se o backend não for acessível sem
+    # passar pelo proxy, senão quem fala direto com a porta inventa o IP que quiser.
+    'NUM_PROXIES': int(os.getenv('NUM_PROXIES', '0')),
+    # Rajada de 10 tentativas de cupom por IP, depois 1 a cada 6s (products/throttles.py)
+    'DEFAULT_THROTTLE_RATES': {
+        'coupon_validate': os.getenv('COUPON_VALIDATE_RATE', '10/min'),
+    },
 }
 
+# Cache das rotas públicas do catálogo (invalidado por signals ao salvar).
+# Baseado em arquivo por padrão para ser compartilhado entre os workers do gunicorn, sem Redis.
+# Os contadores de geração ficam num cache à parte: são poucas chaves (uma por model) e o
+# descarte aleatório do FileBasedCache (CULL_FREQUENCY) não pode apagar um contador junto das páginas.
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv('DJANGO_CACHE_BACKEND', 'django.core.cache.backends.filebased.FileBasedCache'),
+        'LOCATION': os.getenv('DJANGO_CACHE_LOCATION', '/tmp/catalogo-cache'),
+        'OPTIONS': {
+            # Páginas do catálogo, hashes de mídia e baldes do throttle; cheio, descarta 1/3
+            'MAX_ENTRIES': int(os.getenv('DJANGO_CACHE_MAX_ENTRIES', '20000')),
+            'CULL_FREQUENCY': 3,
+        },
+    },
+    'generations': {
+        'BACKEND': os.getenv('DJANGO_GENERATIONS_CACHE_BACKEND', 'django.core.cache.backends.filebased.FileBasedCache'),
+        'LOCATION': os.getenv('DJANGO_GENERATIONS_CACHE_LOCATION', '/tmp/catalogo-generations'),
+        'TIMEOUT': None,
+        'OPTIONS': {'MAX_ENTRIES': 1000},
+    },
+}
+CATALOG_CACHE_TIMEOUT = int(os.getenv('CATALOG_CACHE_TIMEOUT', '300'))
+
+# Contador de visualizações (write-behind): grava no banco a cada X segundos ou Y views
+VIEW_COUNTER_FLUSH_INTERVAL = int(os.getenv('VIEW_COUNTER_FLUSH_INTERVAL', '30'))
+VIEW_COUNTER_FLUSH_THRESHOLD = int(os.getenv('VIEW_COUNTER_FLUSH_THRESHOLD', '100'))
+
 from datetime import timedelta
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(days=1),
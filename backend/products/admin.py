@@ -1,5 +1,7 @@
 from django.contrib import admin
-from .models import Category, Product, ProductVariant, Banner, CompanyConfig, Coupon, Finishing, Kit, ExitPopupConfig
+from .models import Category, Product, ProductVariant, Banner, CompanyConfig, Coupon, Finishing, Kit, ExitPopupConfig, PriceCampaign
+from .campaigns import CampaignError, apply_campaign, rollback_campaign
+from .variants import sync_variants
 
 @admin.register(Category)
 class CategoryAdmin(admin.ModelAdmin):
@@ -21,6 +23,20 @@ class ProductAdmin(admin.ModelAdmin):
     readonly_fields = ('views_count',)
     filter_horizontal = ('finishings',)
 
+    def save_formset(self, request, form, formset, change):
+        if formset.model is not ProductVariant:
+            return super().save_formset(request, form, formset, change)
+        # Variações pelo mesmo caminho da API: só grava o que mudou, em lote
+        variants = [
+            {'id': f.instance.pk, 'name': f.cleaned_data['name'], 'price': f.cleaned_data['price']}
+            for f in formset.forms if f.cleaned_data and not f.cleaned_data.get('DELETE')
+        ]
+        result = sync_variants([(form.instance.pk, variants)])
+        # O admin monta o histórico a partir destes atributos do formset
+        formset.new_objects = result['created']
+        formset.changed_objects = [(variant, ['name', 'price']) for variant in result['updated']]
+        formset.deleted_objects = result['deleted']
+
 admin.site.register(Banner)
 admin.site.register(CompanyConfig)
 
@@ -47,4 +63,38 @@ class KitAdmin(admin.ModelAdmin):
 @admin.register(ExitPopupConfig)
 class ExitPopupConfigAdmin(admin.ModelAdmin):
     list_display = ('name', 'coupon_code', 'is_active', 'minimum_cart_value', 'timer_minutes')
-    list_editable = ('is_active',)
\ No newline at end of file
+    list_editable = ('is_active',)
+
+
+@admin.register(PriceCampaign)
+class PriceCampaignAdmin(admin.ModelAdmin):
+    list_display = ('name', 'kind', 'status', 'starts_at', 'ends_at', 'affected_products', 'affected_variants')
+    list_filter = ('kind', 'status')
+    filter_horizontal = ('categories', 'finishings')
+    readonly_fields = ('status', 'applied_at', 'rolled_back_at', 'affected_products', 'affected_variants')
+    actions = ['apply_now', 'rollback_now']
+
+    def get_readonly_fields(self, request, obj=None):
+        # Depois de aplicada só o nome muda (igual ao PriceCampaignSerializer): o desfazer
+        # casa o snapshot pelo tipo/desconto da campanha
+        if obj is None or obj.status == 'scheduled':
+            return self.readonly_fields
+        opts = self.model._meta
+        locked = [field.name for field in (*opts.fields, *opts.many_to_many) if field.editable and field.name not in ('id', 'name')]
+        return (*self.readonly_fields, *locked)
+
+    @admin.action(description="Aplicar agora")
+    def apply_now(self, request, queryset):
+        self._run(request, queryset, apply_campaign)
+
+    @admin.action(description="Desfazer")
+    def rollback_now(self, request, queryset):
+        self._run(request, queryset, rollback_campaign)
+
+    def _run(self, request, queryset, operation):
+        for campaign in queryset:
+            try:
+                operation(campaign)
+                self.message_user(request, f"{campaign.name}: ok")
+            except CampaignError as e:
+                self.message_user(request, f"{campaign.name}: {e}", level='error')
@@ -0,0 +1,105 @@
+import hashlib
+import json
+import time
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.db import transaction
+from django.utils.http import http_date, quote_etag
+from rest_framework.response import Response
+from rest_framework.utils.encoders import JSONEncoder
+
+
+def _generation_key(model):
+    return f"catalog-gen:{model._meta.label_lower}"
+
+
+def _generation_store():
+    # Cache separado das páginas (settings.CACHES['generations']): o descarte das
+    # páginas nunca leva um contador junto
+    return caches['generations']
+
+
+def get_generations(models):
+    """Geração atual de cada model (muda sempre que algo dele é salvo/apagado)."""
+    store = _generation_store()
+    keys = [_generation_key(model) for model in models]
+    found = store.get_many(keys)
+    for key in keys:
+        if key not in found:
+            # Começa num valor baseado no relógio: se a chave se perder (cache apagado),
+            # nunca voltamos a uma geração antiga (e às respostas velhas dela)
+            store.add(key, int(time.time() * 1000), timeout=None)
+            found[key] = store.get(key)
+    return [found[key] for key in keys]
+
+
+def bump_generation(*models):
+    """
+    Invalida tudo que foi cacheado a partir desses models — depois do commit. Dentro de
+    uma transação, subir agora deixaria outro processo cachear o dado antigo (ainda sem
+    commit) já com a geração nova, e ele ficaria valendo até a próxima escrita.
+    Fora de transação o on_commit roda na hora.
+    """
+    transaction.on_commit(lambda: _bump_now(models))
+
+
+def _bump_now(models):
+    store = _generation_store()
+    now = time.time()
+    for model in models:
+        key = _generation_key(model)
+        try:
+            store.incr(key)
+        except ValueError:
+            store.add(key, int(now * 1000), timeout=None)
+
+
+def body_etag(data):
+    """ETag forte a partir do conteúdo da resposta (mesmo corpo = mesmo ETag)."""
+    body = json.dumps(data, cls=JSONEncoder, ensure_ascii=False, separators=(',', ':'))
+    return quote_etag(hashlib.md5(body.encode()).hexdigest())
+
+
+class CachedResponseMixin:
+    """
+    Cache das respostas GET públicas de um ViewSet.
+
+    A chave leva a URL completa (query params inclusos) e a geração de cada model em
+    `cache_models`; os signals em products/signals.py sobem a geração ao salvar,
+    então a próxima leitura já cai numa chave nova, sem dado velho.
+
+    Junto do corpo ficam o ETag (hash do corpo) e a hora em que ele foi montado: uma
+    resposta servida do cache já sai com os validadores, sem consulta nenhuma.
+    """
+    cache_models = ()
+    cache_actions = ('list', 'retrieve')
+
+    def list(self, request, *args, **kwargs):
+        return self._cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self._cached_response(super().retrieve, request, *args, **kwargs)
+
+    def _cached_response(self, handler, request, *args, **kwargs):
+        # O painel (logado) sempre lê direto do banco
+        if self.action not in self.cache_actions or request.user.is_authenticated:
+            return handler(request, *args, **kwargs)
+
+        generations = ':'.join(str(gen) for gen in get_generations(self.cache_models))
+        raw_key = f"{self.basename}:{self.action}:{generations}:{request.build_absolute_uri()}"
+        key = f"catalog-page:{hashlib.md5(raw_key.encode()).hexdigest()}"
+
+        entry = cache.get(key)
+        if entry is not None:
+            data, etag, built_at = entry
+            response = Response(data)
+        else:
+            response = handler(request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+            data, etag, built_at = response.data, body_etag(response.data), int(time.time())
+            cache.set(key, (data, etag, built_at), getattr(settings, 'CATALOG_CACHE_TIMEOUT', 300))
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(built_at)
+        return response
@@ -0,0 +1,198 @@
+from decimal import Decimal
+
+from django.db import connection, transaction
+from django.db.models import DecimalField, ExpressionWrapper, F, OuterRef, Subquery, Value
+from django.db.models.functions import Greatest, Round
+from django.utils import timezone
+
+from .cache import bump_generation
+from .models import CampaignProductSale, CampaignVariantPrice, PriceCampaign, Product, ProductVariant
+from .search import build_prefix_query, is_postgres
+
+PREVIEW_LIMIT = 20
+PRICE_FIELD = DecimalField(max_digits=10, decimal_places=2)
+
+
+class CampaignError(ValueError):
+    pass
+
+
+def target_products(campaign):
+    """Produtos que a campanha alcança (categorias E acabamentos E busca; vazio = todos)."""
+    queryset = Product.objects.all()
+    category_ids = [category.pk for category in campaign.categories.all()]
+    if category_ids:
+        queryset = queryset.filter(category_id__in=category_ids)
+    finishing_ids = [finishing.pk for finishing in campaign.finishings.all()]
+    if finishing_ids:
+        # Subquery em vez de JOIN: um produto com dois acabamentos não aparece duas vezes
+        queryset = queryset.filter(pk__in=Product.finishings.through.objects.filter(
+            finishing_id__in=finishing_ids).values('product_id'))
+    if campaign.search.strip():
+        query = build_prefix_query([campaign.search]) if is_postgres() else None
+        if query is not None:
+            queryset = queryset.filter(search_vector=query)
+        else:
+            queryset = queryset.filter(name__icontains=campaign.search.strip())
+    return queryset.order_by()
+
+
+def new_price_expression(campaign):
+    """Preço novo calculado no próprio SQL (nunca abaixo de zero)."""
+    if campaign.adjustment_type == 'percent':
+        factor = (Decimal(100) + campaign.value) / Decimal(100)
+        expression = Round(ExpressionWrapper(F('price') * factor, output_field=PRICE_FIELD), 2)
+    else:
+        expression = ExpressionWrapper(F('price') + campaign.value, output_field=PRICE_FIELD)
+    return Greatest(expression, Value(Decimal('0.00'), output_field=PRICE_FIELD), output_field=PRICE_FIELD)
+
+
+def preview(campaign, limit=PREVIEW_LIMIT):
+    """Quantos itens a campanha vai mexer e uma amostra do antes/depois (sem gravar nada)."""
+    products = target_products(campaign)
+    if campaign.kind == 'reprice':
+        variants = ProductVariant.objects.filter(product__in=products.values('pk'))
+        sample = (
+            variants.annotate(new_price=new_price_expression(campaign))
+            .order_by('product_id', 'pk')
+            .values('id', 'product_id', 'product__name', 'name', 'price', 'new_price')[:limit]
+        )
+        return {
+            'products': products.count(),
+            'variants': variants.count(),
+            'sample': [
+                {'variant_id': row['id'], 'product_id': row['product_id'], 'product': row['product__name'],
+                 'variant': row['name'], 'price': row['price'], 'new_price': row['new_price']}
+                for row in sample
+            ],
+        }
+
+    discount = campaign.discount_percent
+    sale_price = Round(
+        ExpressionWrapper(F('min_price') * (Decimal(100) - discount) / Decimal(100), output_field=PRICE_FIELD), 2
+    )
+    sample = (
+        products.annotate(new_sale_price=sale_price)
+        .order_by('pk')
+        .values('id', 'name', 'is_on_sale', 'discount_percent', 'min_price', 'sale_price', 'new_sale_price')[:limit]
+    )
+    return {
+        'products': products.count(),
+        'variants': 0,
+        'sample': [
+            {'product_id': row['id'], 'product': row['name'], 'was_on_sale': row['is_on_sale'],
+             'discount_percent': row['discount_percent'], 'min_price': row['min_price'],
+             'sale_price': row['sale_price'], 'new_sale_price': row['new_sale_price']}
+            for row in sample
+        ],
+    }
+
+
+def _snapshot(model, columns, queryset, campaign):
+    """
+    INSERT ... SELECT: copia os valores atuais para a tabela de backup num único comando,
+    sem trazer as linhas para o Python. `queryset` é um values_list nas colunas de origem.
+    """
+    select_sql, params = queryset.query.sql_with_params()
+    quote = connection.ops.quote_name
+    source_columns = ', '.join(f'source.{quote(column)}' for column in queryset.query.values_select)
+    target_columns = ', '.join(quote(column) for column in ['campaign_id', *columns])
+    sql = (
+        f'INSERT INTO {quote(model._meta.db_table)} ({target_columns}) '
+        f'SELECT %s, {source_columns} FROM ({select_sql}) source'
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, (campaign.pk, *params))
+        return cursor.rowcount
+
+
+def _lock(campaign, expected_status):
+    locked = PriceCampaign.objects.select_for_update().get(pk=campaign.pk)
+    if locked.status != expected_status:
+        raise CampaignError(f"A campanha está {locked.get_status_display().lower()}")
+    return locked
+
+
+def apply_campaign(campaign):
+    """
+    Aplica a campanha com poucos comandos, não importa o tamanho do catálogo:
+    1 INSERT ... SELECT do backup + 1 UPDATE nas variações (ou nos produtos) + 1 UPDATE
+    da faixa de preço. Nada de save() por linha, então os signals não rodam: o cache
+    é invalidado aqui mesmo.
+    """
+    with transaction.atomic():
+        campaign = _lock(campaign, 'scheduled')
+        products = target_products(campaign)
+
+        if campaign.kind == 'reprice':
+            variants = ProductVariant.objects.filter(product__in=products.values('pk')).order_by()
+            campaign.affected_variants = _snapshot(
+                CampaignVariantPrice, ['variant_id', 'old_price'], variants.values_list('id', 'price'), campaign
+            )
+            variants.update(price=new_price_expression(campaign))
+            # Guarda o preço aplicado: o desfazer não passa por cima de quem foi editado depois
+            campaign.variant_prices.update(new_price=Subquery(
+                ProductVariant.objects.filter(pk=OuterRef('variant_id')).values('price')[:1]
+            ))
+            touched = Product.objects.filter(pk__in=variants.values('product_id'))
+        else:
+            campaign.affected_variants = 0
+            _snapshot(
+                CampaignProductSale, ['product_id', 'was_on_sale', 'old_discount_percent'],
+                products.values_list('id', 'is_on_sale', 'discount_percent'), campaign
+            )
+            products.update(is_on_sale=True, discount_percent=campaign.discount_percent)
+            touched = Product.objects.filter(pk__in=campaign.product_sales.values('product_id'))
+
+        campaign.affected_products = touched.refresh_price_range()
+        campaign.status, campaign.applied_at = 'active', timezone.now()
+        campaign.save(update_fields=['status', 'applied_at', 'affected_products', 'affected_variants'])
+        bump_generation(Product, ProductVariant)
+    return campaign
+
+
+def rollback_campaign(campaign):
+    """
+    Volta os valores guardados no apply, também em UPDATEs únicos. Só restaura o que
+    ainda está como a campanha deixou (uma edição manual feita depois é respeitada).
+    """
+    with transaction.atomic():
+        campaign = _lock(campaign, 'active')
+
+        if campaign.kind == 'reprice':
+            backups = CampaignVariantPrice.objects.filter(campaign=campaign, variant_id=OuterRef('pk'))
+            ProductVariant.objects.filter(
+                campaign_prices__campaign=campaign, price=F('campaign_prices__new_price')
+            ).update(price=Subquery(backups.values('old_price')[:1]))
+            touched = Product.objects.filter(
+                pk__in=ProductVariant.objects.filter(campaign_prices__campaign=campaign).values('product_id')
+            )
+        else:
+            backups = CampaignProductSale.objects.filter(campaign=campaign, product_id=OuterRef('pk'))
+            Product.objects.filter(
+                campaign_sales__campaign=campaign, is_on_sale=True, discount_percent=campaign.discount_percent
+            ).update(
+                is_on_sale=Subquery(backups.values('was_on_sale')[:1]),
+                discount_percent=Subquery(backups.values('old_discount_percent')[:1]),
+            )
+            touched = Product.objects.filter(pk__in=campaign.product_sales.values('product_id'))
+
+        touched.refresh_price_range()
+        campaign.status, campaign.rolled_back_at = 'rolled_back', timezone.now()
+        campaign.save(update_fields=['status', 'rolled_back_at'])
+        bump_generation(Product, ProductVariant)
+    return campaign
+
+
+def run_due_campaigns(now=None):
+    """Aplica as agendadas que chegaram no início e desfaz as que passaram do fim (cron)."""
+    now = now or timezone.now()
+    applied = rolled_back = 0
+    due = PriceCampaign.objects.filter(status='scheduled', starts_at__lte=now).exclude(ends_at__lte=now)
+    for campaign in due:
+        apply_campaign(campaign)
+        applied += 1
+    for campaign in PriceCampaign.objects.filter(status='active', ends_at__lte=now):
+        rollback_campaign(campaign)
+        rolled_back += 1
+    return applied, rolled_back
@@ -0,0 +1,178 @@
+from decimal import ROUND_HALF_UP, Decimal
+
+from rest_framework import permissions, serializers
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from .coupons import coupon_index
+from .models import Kit, Product, ProductVariant
+from .throttles import CartQuoteCouponThrottle
+
+# Mesmas regras da vitrine (ProductDetailsM2 / CartDrawer / PIX_DISCOUNT_PERCENT do api.ts)
+MIN_METER_AREA = Decimal('0.5')
+PIX_DISCOUNT_PERCENT = 5
+MAX_ITEMS = 100
+CENTS = Decimal('0.01')
+
+
+def _money(value):
+    return value.quantize(CENTS, rounding=ROUND_HALF_UP)
+
+
+def _percent_off(value, percent):
+    return value * (Decimal(100) - percent) / Decimal(100)
+
+
+class CartItemSerializer(serializers.Serializer):
+    variant = serializers.IntegerField(required=False)
+    kit = serializers.IntegerField(required=False)
+    quantity = serializers.IntegerField(min_value=1, max_value=10000, default=1)
+    width = serializers.DecimalField(max_digits=8, decimal_places=3, min_value=Decimal('0'), required=False)
+    height = serializers.DecimalField(max_digits=8, decimal_places=3, min_value=Decimal('0'), required=False)
+    finishings = serializers.ListField(child=serializers.IntegerField(), default=list)
+
+    def validate(self, data):
+        if ('variant' in data) == ('kit' in data):
+            raise serializers.ValidationError("Informe 'variant' ou 'kit' (um dos dois).")
+        return data
+
+
+class CartQuoteSerializer(serializers.Serializer):
+    items = serializers.ListField(child=CartItemSerializer(), allow_empty=False, max_length=MAX_ITEMS)
+    coupon = serializers.CharField(required=False, allow_blank=True, default='')
+
+
+def _variant_line(item, variant, finishing_names):
+    product = variant.product
+    base = variant.price
+    line = {
+        'type': 'variant',
+        'variant': variant.pk,
+        'product': product.pk,
+        'product_name': product.name,
+        'variant_name': variant.name,
+        'quantity': item['quantity'],
+        'finishings': [],
+    }
+
+    if product.is_meter_price:
+        width, height = item.get('width') or 0, item.get('height') or 0
+        if width <= 0 or height <= 0:
+            raise serializers.ValidationError("Informe largura e altura para produtos vendidos por m².")
+        area = width * height
+        # Regra do meio metro: abaixo de 0,5 m² cobra 0,5 m²
+        charged_area = max(area, MIN_METER_AREA)
+        base = base * charged_area
+        line.update(width=str(width), height=str(height), area=str(area), charged_area=str(charged_area))
+
+    unit = _percent_off(base, product.discount_percent) if product.is_on_sale else base
+    for finishing_id in item['finishings']:
+        name = finishing_names.get((product.pk, finishing_id))
+        if name is None:
+            raise serializers.ValidationError(f"Acabamento {finishing_id} não disponível para este produto.")
+        line['finishings'].append({'id': finishing_id, 'name': name})
+
+    line['original_unit_price'] = _money(base)
+    line['unit_price'] = _money(unit)
+    return line
+
+
+def _kit_line(item, kit):
+    return {
+        'type': 'kit',
+        'kit': kit.pk,
+        'kit_name': kit.name,
+        'quantity': item['quantity'],
+        'finishings': [],
+        'original_unit_price': kit.price,
+        'unit_price': kit.price,
+    }
+
+
+def quote_cart(items, coupon_code=''):
+    """
+    Preço do carrinho inteiro no servidor: uma consulta para as variações (com o produto),
+    uma para os acabamentos dos produtos envolvidos e uma para os kits, não importa
+    quantos itens vierem. O cupom sai do índice em memória (products/coupons.py).
+
+    Levanta ValidationError ({'items': {índice: [erro]}}) se algum item não existir.
+    """
+    variant_ids = {item['variant'] for item in items if 'variant' in item}
+    kit_ids = {item['kit'] for item in items if 'kit' in item}
+
+    variants = ProductVariant.objects.select_related('product').filter(product__is_active=True).in_bulk(variant_ids)
+    kits = Kit.objects.filter(is_active=True).in_bulk(kit_ids)
+
+    finishing_ids = {finishing for item in items for finishing in item['finishings']}
+    finishing_names = {}
+    if finishing_ids:
+        rows = Product.finishings.through.objects.filter(
+            product_id__in={variant.product_id for variant in variants.values()},
+            finishing_id__in=finishing_ids,
+        ).values_list('product_id', 'finishing_id', 'finishing__name')
+        finishing_names = {(product_id, finishing_id): name for product_id, finishing_id, name in rows}
+
+    lines, errors = [], {}
+    for index, item in enumerate(items):
+        try:
+            if 'variant' in item:
+                variant = variants.get(item['variant'])
+                if variant is None:
+                    raise serializers.ValidationError(f"Variação {item['variant']} não encontrada.")
+                line = _variant_line(item, variant, finishing_names)
+            else:
+                kit = kits.get(item['kit'])
+                if kit is None:
+                    raise serializers.ValidationError(f"Kit {item['kit']} não encontrado.")
+                line = _kit_line(item, kit)
+        except serializers.ValidationError as exc:
+            errors[index] = exc.detail
+            continue
+        line['line_total'] = line['unit_price'] * line['quantity']
+        lines.append(line)
+    if errors:
+        raise serializers.ValidationError({'items': errors})
+
+    subtotal = sum((line['line_total'] for line in lines), Decimal('0.00'))
+    coupon = coupon_index.get(coupon_code)
+    discount = _money(subtotal * coupon['discount_percentage'] / Decimal(100)) if coupon else Decimal('0.00')
+    total = subtotal - discount
+    return {
+        'items': lines,
+        'subtotal': subtotal,
+        'coupon': coupon,
+        'discount': discount,
+        'total': total,
+        'pix_discount_percent': PIX_DISCOUNT_PERCENT,
+        'pix_total': _money(_percent_off(total, PIX_DISCOUNT_PERCENT)),
+    }
+
+
+def _as_strings(value):
+    # Mesmo formato dos serializers do DRF: dinheiro como string "12.34"
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, dict):
+        return {key: _as_strings(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_as_strings(item) for item in value]
+    return value
+
+
+class CartQuoteView(APIView):
+    """
+    POST /api/cart/quote/ — recalcula o carrinho com os preços atuais do banco.
+
+    Corpo: {"items": [{"variant": 12, "quantity": 1, "width": 1.2, "height": 0.8,
+    "finishings": [3]}, {"kit": 4}], "coupon": "PROMO10"}. Cupom inválido não dá erro,
+    só volta "coupon": null sem desconto. Com cupom, conta no mesmo limite por IP do
+    /coupons/validate/.
+    """
+    permission_classes = [permissions.AllowAny]
+    throttle_classes = [CartQuoteCouponThrottle]
+
+    def post(self, request):
+        serializer = CartQuoteSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        quote = quote_cart(serializer.validated_data['items'], serializer.validated_data['coupon'])
+        return Response(_as_strings(quote))
@@ -0,0 +1,390 @@
+"""
+Importação/exportação do catálogo em lote (CSV ou JSONL, um produto por linha).
+
+Colunas: slug, name, category (slug da categoria), description, production_time, image
+(caminho já enviado ao MEDIA), is_active, is_featured, is_meter_price, is_on_sale,
+discount_percent, variants, finishings, upsells.
+
+No JSONL, variants é uma lista de {"name", "price"} e finishings/upsells listas de nomes/slugs.
+No CSV são separados por "|": variants = "100 unidades=45.90|500 unidades=120.00".
+Célula vazia no CSV (ou chave ausente no JSONL) = não mexe naquele campo.
+Linha com slug atualiza o produto (ou cria com esse slug); sem slug cria um produto
+novo com slug livre gerado do nome, como no painel.
+"""
+import csv
+import io
+import json
+import time
+from contextlib import nullcontext
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction
+from django.db.models import Prefetch
+from django.utils import timezone
+from django.utils.text import slugify
+
+from .cache import bump_generation
+from .images import schedule_derivatives
+from .models import Category, Finishing, Product, ProductVariant
+from .search import refresh_search_vector
+from .slugs import reserve_slugs
+from .variants import sync_variants
+
+BATCH_SIZE = 500
+LIST_SEPARATOR = '|'
+COLUMNS = [
+    'slug', 'name', 'category', 'description', 'production_time', 'image', 'is_active', 'is_featured',
+    'is_meter_price', 'is_on_sale', 'discount_percent', 'variants', 'finishings', 'upsells',
+]
+TEXT_FIELDS = ('name', 'description', 'production_time', 'image')
+BOOLEAN_FIELDS = ('is_active', 'is_featured', 'is_meter_price', 'is_on_sale')
+TRUE_VALUES = {'1', 'true', 'sim', 's', 'yes', 'y', 'x'}
+FALSE_VALUES = {'0', 'false', 'nao', 'não', 'n', 'no'}
+
+
+class RowError(ValueError):
+    pass
+
+
+# --- Leitura --------------------------------------------------------------------
+
+def detect_format(filename):
+    return 'jsonl' if filename.lower().endswith(('.jsonl', '.ndjson', '.json')) else 'csv'
+
+
+def read_rows(stream, file_format):
+    """Gera (número da linha, dict) lendo o arquivo aos poucos (stream binário ou texto)."""
+    if isinstance(stream.read(0), bytes):
+        stream = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    if file_format == 'jsonl':
+        for number, line in enumerate(stream, start=1):
+            if line.strip():
+                try:
+                    yield number, json.loads(line)
+                except ValueError:
+                    yield number, RowError("JSON inválido")
+    else:
+        reader = csv.DictReader(stream)
+        for row in reader:
+            # CSV: célula vazia é "não informado"
+            yield reader.line_num, {key: value for key, value in row.items() if key and value not in (None, '')}
+
+
+def _boolean(value):
+    if isinstance(value, bool):
+        return value
+    text = str(value).strip().lower()
+    if text in TRUE_VALUES:
+        return True
+    if text in FALSE_VALUES:
+        return False
+    raise RowError(f"valor booleano inválido: {value!r}")
+
+
+def _price(value):
+    try:
+        price = Decimal(str(value).strip().replace(',', '.'))
+        # NaN/Infinity não são preço (e o NaN passaria pelo quantize)
+        if not price.is_finite():
+            raise InvalidOperation
+        price = price.quantize(Decimal('0.01'))
+    except ArithmeticError:
+        raise RowError(f"preço inválido: {value!r}")
+    if price < 0:
+        raise RowError(f"preço negativo: {value!r}")
+    return price
+
+
+def _list(value):
+    if isinstance(value, list):
+        return [str(item).strip() for item in value if str(item).strip()]
+    return [item.strip() for item in str(value).split(LIST_SEPARATOR) if item.strip()]
+
+
+def _variants(value):
+    if isinstance(value, list):
+        items = value
+    else:
+        items = []
+        for chunk in _list(value):
+            name, separator, price = chunk.rpartition('=')
+            if not separator:
+                raise RowError(f"variação sem preço: {chunk!r} (use nome=preço)")
+            items.append({'name': name, 'price': price})
+
+    variants, seen = [], set()
+    for item in items:
+        if not isinstance(item, dict) or not str(item.get('name', '')).strip() or 'price' not in item:
+            raise RowError(f"variação inválida: {item!r}")
+        name = str(item['name']).strip()
+        if name in seen:
+            raise RowError(f"variação repetida: {name!r}")
+        seen.add(name)
+        variants.append({'name': name, 'price': _price(item['price'])})
+    return variants
+
+
+def parse_row(raw, categories):
+    """Valida e normaliza uma linha. `categories` é o mapa slug -> id."""
+    if isinstance(raw, RowError):
+        raise raw
+    if not isinstance(raw, dict):
+        raise RowError("a linha precisa ser um objeto")
+
+    fields = {}
+    for name in TEXT_FIELDS:
+        if raw.get(name) is not None:
+            value = str(raw[name]).strip()
+            max_length = Product._meta.get_field(name).max_length
+            if max_length and len(value) > max_length:
+                raise RowError(f"{name} passa de {max_length} caracteres")
+            fields[name] = value
+    for name in BOOLEAN_FIELDS:
+        if raw.get(name) is not None:
+            fields[name] = _boolean(raw[name])
+    if raw.get('discount_percent') is not None:
+        try:
+            discount = int(raw['discount_percent'])
+        except (TypeError, ValueError):
+            raise RowError(f"discount_percent inválido: {raw['discount_percent']!r}")
+        if not 0 <= discount <= 100:
+            raise RowError("discount_percent deve ficar entre 0 e 100")
+        fields['discount_percent'] = discount
+    if raw.get('category') is not None:
+        category_id = categories.get(str(raw['category']).strip())
+        if category_id is None:
+            raise RowError(f"categoria não encontrada: {raw['category']!r}")
+        fields['category_id'] = category_id
+
+    slug = slugify(str(raw.get('slug') or '').strip())
+    if not slug and not fields.get('name'):
+        raise RowError("informe slug ou name")
+    if len(slug) > Product._meta.get_field('slug').max_length:
+        raise RowError("slug muito longo")
+
+    return {
+        'slug': slug,
+        'fields': fields,
+        'variants': _variants(raw['variants']) if raw.get('variants') is not None else None,
+        'finishings': _list(raw['finishings']) if raw.get('finishings') is not None else None,
+        'upsells': _list(raw['upsells']) if raw.get('upsells') is not None else None,
+    }
+
+
+# --- Gravação ---------------------------------------------------------------------
+
+class ProductImporter:
+    """
+    Upsert de produtos pelo slug, em lotes de `batch_size` linhas: cada lote é uma
+    transação com poucas queries (in_bulk + bulk_create/bulk_update por tabela),
+    não importa quantas variações venham. Só o lote atual fica em memória.
+
+    Como bulk_create/bulk_update não disparam signals, o próprio importador recalcula
+    faixa de preço e busca do lote e sobe a geração do cache a cada lote gravado.
+    """
+
+    def __init__(self, batch_size=BATCH_SIZE, dry_run=False):
+        self.batch_size = batch_size
+        self.dry_run = dry_run
+        self.categories = dict(Category.objects.values_list('slug', 'id'))
+        self.finishings = {name.lower(): pk for pk, name in Finishing.objects.values_list('id', 'name')}
+        self.pending_upsells = []  # upsells que apontam para produtos de lotes seguintes
+        self.errors = []
+        self.stats = {
+            'rows': 0, 'created': 0, 'updated': 0,
+            'variants_created': 0, 'variants_updated': 0, 'variants_deleted': 0,
+        }
+
+    def run(self, rows):
+        """
+        Cada lote é commitado sozinho (uma transação por lote). No dry_run tudo roda
+        dentro de uma transação que é desfeita no final, só para validar e medir.
+        """
+        started = time.monotonic()
+        with transaction.atomic() if self.dry_run else nullcontext():
+            batch, slugs = [], set()
+            for number, raw in rows:
+                self.stats['rows'] += 1
+                try:
+                    row = parse_row(raw, self.categories)
+                    if row['slug'] and row['slug'] in slugs:
+                        raise RowError(f"slug repetido no mesmo lote: {row['slug']}")
+                except RowError as e:
+                    self.errors.append({'line': number, 'error': str(e)})
+                    continue
+                slugs.add(row['slug'])
+                batch.append((number, row))
+                if len(batch) >= self.batch_size:
+                    self._write_batch(batch)
+                    batch, slugs = [], set()
+            if batch:
+                self._write_batch(batch)
+            with transaction.atomic():
+                self._write_upsells(self.pending_upsells, final=True)
+            bump_generation(Product)
+
+            if self.dry_run:
+                transaction.set_rollback(True)
+
+        elapsed = time.monotonic() - started
+        return {
+            **self.stats,
+            'errors': self.errors,
+            'dry_run': self.dry_run,
+            'seconds': round(elapsed, 3),
+            'rows_per_second': round(self.stats['rows'] / elapsed, 1) if elapsed else None,
+        }
+
+    def _write_batch(self, batch):
+        # Um lote com erro de banco é descartado inteiro, sem derrubar os anteriores
+        snapshot = dict(self.stats), dict(self.finishings), len(self.pending_upsells)
+        try:
+            with transaction.atomic():
+                self._upsert_products(batch)
+            bump_generation(Product, ProductVariant, Finishing)
+        except Exception as e:
+            stats, self.finishings, pending = snapshot
+            self.stats.update({key: value for key, value in stats.items() if key != 'rows'})
+            del self.pending_upsells[pending:]
+            for number, _ in batch:
+                self.errors.append({'line': number, 'error': f"lote não gravado: {e}"})
+
+    def _upsert_products(self, batch):
+        existing = Product.objects.in_bulk([row['slug'] for _, row in batch if row['slug']], field_name='slug')
+        # Linhas sem slug são produtos novos: reserva os slugs do lote numa consulta só
+        unnamed = [row for _, row in batch if not row['slug'] and 'category_id' in row['fields']]
+        for row, slug in zip(unnamed, reserve_slugs(Product, [row['fields']['name'] for row in unnamed])):
+            row['slug'] = slug
+        to_create, to_update, update_fields = [], [], set()
+        products = []
+        now = timezone.now()
+
+        for number, row in batch:
+            product = existing.get(row['slug'])
+            if product is None:
+                missing = [name for name in ('name', 'category_id') if name not in row['fields']]
+                if missing:
+                    self.errors.append({'line': number, 'error': "produto novo precisa de name e category"})
+                    continue
+                product = Product(slug=row['slug'], **row['fields'])
+                to_create.append(product)
+            else:
+                for name, value in row['fields'].items():
+                    setattr(product, name, value)
+                update_fields.update(row['fields'])
+                product.updated_at = now
+                to_update.append(product)
+            products.append((product, row))
+
+        Product.objects.bulk_create(to_create)
+        if to_update:
+            Product.objects.bulk_update(to_update, [*update_fields, 'updated_at'])
+        self.stats['created'] += len(to_create)
+        self.stats['updated'] += len(to_update)
+
+        self._sync_variants([(product.pk, row['variants']) for product, row in products if row['variants'] is not None])
+        self._write_finishings([(product.pk, row['finishings']) for product, row in products if row['finishings'] is not None])
+        self._write_upsells([(product.pk, row['upsells']) for product, row in products if row['upsells'] is not None])
+
+        # O que os signals fariam a cada save
+        saved = Product.objects.filter(pk__in=[product.pk for product, _ in products])
+        saved.refresh_price_range()
+        refresh_search_vector(saved)
+        for product, row in products:
+            if 'image' in row['fields']:
+                schedule_derivatives(product, ['image'])
+
+    def _sync_variants(self, items):
+        # O preço do lote inteiro é recalculado logo depois, em _upsert_products
+        result = sync_variants(items, refresh_prices=False)
+        for key in ('created', 'updated', 'deleted'):
+            self.stats[f'variants_{key}'] += len(result[key])
+
+    def _write_finishings(self, items):
+        if not items:
+            return
+        names = {name for _, finishings in items for name in finishings}
+        missing = {name.lower(): name for name in names if name.lower() not in self.finishings}
+        for finishing in Finishing.objects.bulk_create([Finishing(name=name) for name in missing.values()]):
+            self.finishings[finishing.name.lower()] = finishing.pk
+
+        through = Product.finishings.through
+        through.objects.filter(product_id__in=[pk for pk, _ in items]).delete()
+        through.objects.bulk_create([
+            through(product_id=product_id, finishing_id=self.finishings[name.lower()])
+            for product_id, finishings in items for name in set(finishings)
+        ], ignore_conflicts=True)
+
+    def _write_upsells(self, items, final=False):
+        if not items:
+            return
+        slugs = {slug for _, upsells in items for slug in upsells}
+        ids = dict(Product.objects.filter(slug__in=slugs).values_list('slug', 'id'))
+
+        through = Product.upsell_products.through
+        through.objects.filter(from_product_id__in=[pk for pk, _ in items]).delete()
+        links = []
+        for product_id, upsells in items:
+            unresolved = [slug for slug in upsells if slug not in ids]
+            if unresolved and not final:
+                # Pode estar num lote seguinte: tenta de novo no fim
+                self.pending_upsells.append((product_id, upsells))
+                continue
+            for slug in unresolved:
+                self.errors.append({'line': None, 'error': f"upsell não encontrado: {slug} (produto {product_id})"})
+            links.extend(
+                through(from_product_id=product_id, to_product_id=ids[slug])
+                for slug in set(upsells) if slug in ids and ids[slug] != product_id
+            )
+        through.objects.bulk_create(links, ignore_conflicts=True)
+
+
+# --- Exportação -------------------------------------------------------------------
+
+def export_products(queryset=None, chunk_size=BATCH_SIZE):
+    """Gera um dict por produto (mesmo formato da importação), com prefetch por pedaço."""
+    queryset = (queryset if queryset is not None else Product.objects.all()).order_by('id')
+    queryset = queryset.select_related('category').prefetch_related(
+        'variants', 'finishings', Prefetch('upsell_products', queryset=Product.objects.only('id', 'slug'))
+    )
+    for product in queryset.iterator(chunk_size=chunk_size):
+        yield {
+            'slug': product.slug,
+            'name': product.name,
+            'category': product.category.slug,
+            'description': product.description or '',
+            'production_time': product.production_time,
+            'image': product.image.name or '',
+            'is_active': product.is_active,
+            'is_featured': product.is_featured,
+            'is_meter_price': product.is_meter_price,
+            'is_on_sale': product.is_on_sale,
+            'discount_percent': product.discount_percent,
+            'variants': [{'name': v.name, 'price': str(v.price)} for v in product.variants.all()],
+            'finishings': [f.name for f in product.finishings.all()],
+            'upsells': [p.slug for p in product.upsell_products.all()],
+        }
+
+
+class _Echo:
+    def write(self, value):
+        return value
+
+
+def export_lines(rows, file_format):
+    """Transforma os dicts em linhas de texto, prontas para arquivo ou StreamingHttpResponse."""
+    if file_format == 'jsonl':
+        for row in rows:
+            yield json.dumps(row, ensure_ascii=False) + '\n'
+        return
+
+    writer = csv.writer(_Echo())
+    yield writer.writerow(COLUMNS)
+    for row in rows:
+        row = {
+            **row,
+            'variants': LIST_SEPARATOR.join(f"{v['name']}={v['price']}" for v in row['variants']),
+            'finishings': LIST_SEPARATOR.join(row['finishings']),
+            'upsells': LIST_SEPARATOR.join(row['upsells']),
+        }
+        yield writer.writerow([row[column] for column in COLUMNS])
@@ -0,0 +1,52 @@
+from django.utils.http import parse_etags, parse_http_date_safe
+from rest_framework import status
+from rest_framework.response import Response
+
+from .cache import body_etag
+
+
+class ConditionalGetMixin:
+    """
+    GET condicional (ETag / Last-Modified) para as rotas do catálogo.
+
+    O ETag é o hash do corpo da resposta. Com o CachedResponseMixin ele é calculado uma
+    vez, quando a página entra no cache, e a validação não custa consulta nenhuma. Por
+    vir do corpo, também pega o que não sobe geração (views_count gravado com F(),
+    ordem por mais vistos): muda assim que o cache da página expira. Sem cache (painel
+    logado) o hash sai da resposta recém-montada. Se o cliente já tem a versão atual,
+    devolvemos 304 sem mandar o corpo.
+    """
+    conditional_actions = ('list', 'retrieve')
+
+    def list(self, request, *args, **kwargs):
+        return self._conditional_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self._conditional_response(super().retrieve, request, *args, **kwargs)
+
+    def _conditional_response(self, handler, request, *args, **kwargs):
+        response = handler(request, *args, **kwargs)
+        if self.action not in self.conditional_actions or response.status_code != 200:
+            return response
+
+        if not response.has_header('ETag'):
+            response['ETag'] = body_etag(response.data)
+        etag = response['ETag']
+        last_modified = parse_http_date_safe(response.get('Last-Modified') or '')
+        if not self._is_not_modified(request, etag, last_modified):
+            return response
+
+        not_modified = Response(status=status.HTTP_304_NOT_MODIFIED)
+        not_modified['ETag'] = etag
+        if last_modified is not None:
+            not_modified['Last-Modified'] = response['Last-Modified']
+        return not_modified
+
+    def _is_not_modified(self, request, etag, last_modified):
+        if_none_match = request.headers.get('If-None-Match')
+        if if_none_match:
+            # If-None-Match tem prioridade sobre If-Modified-Since (RFC 9110)
+            return if_none_match.strip() == '*' or etag in parse_etags(if_none_match)
+
+        if_modified_since = parse_http_date_safe(request.headers.get('If-Modified-Since') or '')
+        return bool(if_modified_since and last_modified is not None and last_modified <= if_modified_since)
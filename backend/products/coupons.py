@@ -0,0 +1,39 @@
+import threading
+
+from .cache import get_generations
+from .models import Coupon, normalize_coupon_code
+
+
+class CouponIndex:
+    """
+    Cupons ativos em memória, por código normalizado (maiúsculo).
+
+    A validação do carrinho vira uma consulta a um dict: nada de banco por tentativa,
+    nem para os códigos que não existem. Salvar/apagar um cupom sobe a geração de
+    Coupon (signals), e cada processo recarrega na próxima consulta.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._coupons = {}
+        self._generation = None
+
+    def _ensure_fresh(self):
+        generation = get_generations([Coupon])
+        if generation == self._generation:
+            return
+        rows = Coupon.objects.filter(is_active=True).values('code', 'code_normalized', 'discount_percentage')
+        coupons = {row['code_normalized']: {'code': row['code'], 'discount_percentage': row['discount_percentage']} for row in rows}
+        with self._lock:
+            self._coupons, self._generation = coupons, generation
+
+    def get(self, code):
+        """{'code', 'discount_percentage'} do cupom ativo, ou None."""
+        code = normalize_coupon_code(code)
+        if not code:
+            return None
+        self._ensure_fresh()
+        return self._coupons.get(code)
+
+
+coupon_index = CouponIndex()
@@ -0,0 +1,119 @@
+import hashlib
+from xml.sax.saxutils import escape
+
+from django.conf import settings
+from django.http import HttpResponseNotModified, StreamingHttpResponse
+from django.utils.http import parse_etags, quote_etag
+from django.views import View
+
+from .cache import get_generations
+from .models import Category, Kit, Product, ProductVariant
+
+CHUNK_SIZE = 500
+
+
+def _absolute(path):
+    return f"{settings.SITE_URL}/{path.lstrip('/')}"
+
+
+def _media_url(path):
+    # Mesmo formato que o frontend montava: https://site/media/products/foto.jpg
+    path = str(path or '').lstrip('/')
+    return _absolute(path if path.startswith('media/') else f"media/{path}")
+
+
+class StreamingXMLView(View):
+    """
+    Base dos XMLs públicos (feed e sitemap): varre o catálogo inteiro com .values() +
+    .iterator(), montando o XML em pedaços (memória constante, sem serializer).
+    O ETag sai das gerações do cache, então um 304 não toca no banco.
+
+    É uma View do Django, não do DRF: sem negociação de conteúdo, qualquer Accept
+    (application/xml, text/xml...) recebe o XML. Subclasses implementam generate().
+    """
+    etag_models = (Product, ProductVariant, Kit, Category)
+
+    def get_etag(self):
+        generations = get_generations(self.etag_models)
+        raw = f"{type(self).__name__}:{settings.SITE_URL}:{generations}"
+        return quote_etag(hashlib.md5(raw.encode()).hexdigest())
+
+    def get(self, request):
+        etag = self.get_etag()
+        if etag in parse_etags(request.headers.get('If-None-Match', '')):
+            response = HttpResponseNotModified()
+        else:
+            response = StreamingHttpResponse(self.generate(), content_type='application/xml; charset=utf-8')
+        response['ETag'] = etag
+        response['Cache-Control'] = 'public, max-age=3600'
+        return response
+
+    def generate(self):
+        """Pedaços (str) do XML; cada subclasse monta o seu."""
+        raise NotImplementedError
+
+
+class ProductFeedView(StreamingXMLView):
+    """Feed do Google Merchant: GET /api/feed.xml"""
+
+    def generate(self):
+        yield (
+            '<?xml version="1.0" encoding="UTF-8"?>\n'
+            '<rss xmlns:g="http://base.google.com/ns/1.0" version="2.0">\n'
+            '<channel>\n'
+            '<title>Cloud Design Gráfica</title>\n'
+            f'<link>{escape(settings.SITE_URL)}</link>\n'
+            '<description>Catálogo Oficial de Produtos - Cloud Design Gráfica Rápida</description>\n'
+        )
+        rows = (
+            Product.objects.filter(is_active=True)
+            .exclude(slug='')
+            .order_by('id')
+            .values('id', 'name', 'description', 'slug', 'image', 'min_price', 'sale_price', 'is_on_sale')
+        )
+        for row in rows.iterator(chunk_size=CHUNK_SIZE):
+            price = row['min_price'] or 0
+            item = (
+                '<item>'
+                f"<g:id>{row['id']}</g:id>"
+                f"<g:title>{escape(row['name'])}</g:title>"
+                f"<g:description>{escape(row['description'] or row['name'])}</g:description>"
+                f"<g:link>{escape(_absolute('produto/' + row['slug']))}</g:link>"
+                f"<g:image_link>{escape(_media_url(row['image']))}</g:image_link>"
+                '<g:availability>in_stock</g:availability>'
+                f"<g:price>{price:.2f} BRL</g:price>"
+            )
+            if row['is_on_sale'] and row['sale_price'] is not None and row['sale_price'] < price:
+                item += f"<g:sale_price>{row['sale_price']:.2f} BRL</g:sale_price>"
+            item += '<g:condition>new</g:condition><g:brand>Cloud Design</g:brand></item>\n'
+            yield item
+        yield '</channel>\n</rss>\n'
+
+
+class SitemapView(StreamingXMLView):
+    """Sitemap com todas as páginas públicas: GET /api/sitemap.xml"""
+
+    def url(self, path, priority, changefreq='weekly', lastmod=None):
+        entry = f"<url><loc>{escape(_absolute(path))}</loc>"
+        if lastmod:
+            entry += f"<lastmod>{lastmod.date().isoformat()}</lastmod>"
+        return entry + f"<changefreq>{changefreq}</changefreq><priority>{priority}</priority></url>\n"
+
+    def generate(self):
+        yield '<?xml version="1.0" encoding="UTF-8"?>\n<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
+        yield self.url('', '1.0', changefreq='daily')
+        yield self.url('carrinho', '0.5')
+
+        categories = Category.objects.order_by('id').values('slug', 'updated_at')
+        for row in categories.iterator(chunk_size=CHUNK_SIZE):
+            yield self.url(f"?category__slug={row['slug']}", '0.7', lastmod=row['updated_at'])
+
+        kits = Kit.objects.filter(is_active=True).exclude(slug='').order_by('id').values('slug', 'updated_at')
+        for row in kits.iterator(chunk_size=CHUNK_SIZE):
+            yield self.url(f"kit/{row['slug']}", '0.9', lastmod=row['updated_at'])
+
+        products = Product.objects.filter(is_active=True).exclude(slug='').order_by('id').values('slug', 'updated_at')
+        for row in products.iterator(chunk_size=CHUNK_SIZE):
+            yield self.url(f"produto/{row['slug']}", '0.8', lastmod=row['updated_at'])
+
+        yield '</urlset>\n'
@@ -0,0 +1,215 @@
+import base64
+import hashlib
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import close_old_connections, transaction
+from django.core.exceptions import FieldDoesNotExist
+from PIL import Image, ImageFilter, ImageOps
+
+from .media import file_hash
+
+# Larguras geradas para cada imagem enviada pelo painel (nunca amplia a original)
+WIDTHS = (320, 640, 1280)
+FORMATS = {'webp': ('WEBP', {'quality': 80, 'method': 4}), 'jpeg': ('JPEG', {'quality': 82, 'optimize': True, 'progressive': True})}
+# Placeholder (LQIP): ~20px de largura, borrado, embutido no JSON como data URI (~200 bytes)
+PLACEHOLDER_WIDTH = 20
+
+logger = logging.getLogger(__name__)
+
+# Poucas threads: é CPU pesado e não pode competir com os workers da API
+_executor = ThreadPoolExecutor(max_workers=getattr(settings, 'IMAGE_WORKERS', 2), thread_name_prefix='image-derivatives')
+
+
+def derivative_name(name, width, fmt, content):
+    """
+    'products/foto.png' -> 'products/foto__w640.1a2b3c4d.webp' (fica ao lado da original).
+    O hash do conteúdo no nome deixa servir com cache imutável: regerar com outro
+    resultado (--force, qualidade nova) gera outro nome.
+    """
+    root, _ = os.path.splitext(name)
+    extension = 'jpg' if fmt == 'jpeg' else fmt
+    digest = hashlib.md5(content).hexdigest()[:8]
+    return f"{root}__w{width}.{digest}.{extension}"
+
+
+def _encode(image, fmt):
+    pil_format, options = FORMATS[fmt]
+    if fmt == 'jpeg' and image.mode != 'RGB':
+        # JPEG não tem transparência: achata sobre fundo branco
+        background = Image.new('RGB', image.size, 'white')
+        background.paste(image, mask=image.getchannel('A') if 'A' in image.getbands() else None)
+        image = background
+    buffer = BytesIO()
+    image.save(buffer, pil_format, **options)
+    return buffer.getvalue()
+
+
+def _open(field_file):
+    with field_file.storage.open(field_file.name, 'rb') as original:
+        image = ImageOps.exif_transpose(Image.open(original))
+        image.load()
+    if image.mode not in ('RGB', 'RGBA'):
+        has_alpha = image.mode in ('LA', 'PA', 'P') or 'transparency' in image.info
+        image = image.convert('RGBA' if has_alpha else 'RGB')
+    return image
+
+
+def generate_derivatives(field_file, image=None, previous=None):
+    """
+    Gera as versões WebP + JPEG de cada largura e devolve o que gravar em
+    `<campo>_derivatives`: {'source': original, 'hash': hash da original (o ?v= do
+    media_url), 'webp': [[320, nome], ...], 'jpeg': [...]}.
+    Derivadas de uma geração anterior (`previous`) que não se repetiram são apagadas.
+    """
+    if not field_file:
+        return {}
+    storage, name = field_file.storage, field_file.name
+    image = image or _open(field_file)
+    with storage.open(name, 'rb') as original:
+        digest = file_hash(original)
+
+    derivatives = {'source': name, 'hash': digest, **{fmt: [] for fmt in FORMATS}}
+    for width in WIDTHS:
+        # Imagem pequena: gera só a menor largura (do tamanho original)
+        if width > image.width and width != WIDTHS[0]:
+            break
+        resized = image.copy()
+        resized.thumbnail((width, width * 10), Image.LANCZOS)
+        for fmt in FORMATS:
+            content = _encode(resized, fmt)
+            target = derivative_name(name, width, fmt, content)
+            # Mesmo nome = mesmo conteúdo: nada a regravar
+            if not storage.exists(target):
+                target = storage.save(target, ContentFile(content))
+            derivatives[fmt].append([width, target])
+
+    written = {target for fmt in FORMATS for _, target in derivatives[fmt]}
+    for fmt in FORMATS:
+        for _, target in (previous or {}).get(fmt, []):
+            if target not in written:
+                storage.delete(target)
+    return derivatives
+
+
+def placeholder(image):
+    """Miniatura borrada em data URI, para o front pintar enquanto a imagem carrega."""
+    tiny = image.copy()
+    tiny.thumbnail((PLACEHOLDER_WIDTH, PLACEHOLDER_WIDTH * 10), Image.BILINEAR)
+    tiny = tiny.filter(ImageFilter.GaussianBlur(1))
+    buffer = BytesIO()
+    tiny.save(buffer, 'WEBP', quality=40)
+    return 'data:image/webp;base64,' + base64.b64encode(buffer.getvalue()).decode()
+
+
+def has_metadata(model, field_name):
+    """O modelo guarda largura/altura/placeholder dessa imagem? (<campo>_placeholder)"""
+    try:
+        model._meta.get_field(f'{field_name}_placeholder')
+        return True
+    except FieldDoesNotExist:
+        return False
+
+
+def image_metadata(field_name, image):
+    return {
+        f'{field_name}_width': image.width,
+        f'{field_name}_height': image.height,
+        f'{field_name}_placeholder': placeholder(image),
+    }
+
+
+def needs_metadata(instance, field_name):
+    return (
+        bool(getattr(instance, field_name))
+        and has_metadata(type(instance), field_name)
+        and not getattr(instance, f'{field_name}_placeholder')
+    )
+
+
+def process_image(instance, field_name, derivatives=True):
+    """
+    Abre a imagem uma vez, gera as derivadas e devolve os campos a gravar:
+    `<campo>_derivatives` e os metadados (largura, altura, placeholder), se o modelo tiver.
+    """
+    field_file = getattr(instance, field_name)
+    if not field_file:
+        return {}
+    image = _open(field_file)
+    fields = {}
+    if derivatives:
+        previous = getattr(instance, f'{field_name}_derivatives')
+        fields[f'{field_name}_derivatives'] = generate_derivatives(field_file, image, previous)
+    if has_metadata(type(instance), field_name):
+        fields.update(image_metadata(field_name, image))
+    return fields
+
+
+def _current_derivatives(instance, field_name):
+    # Só vale se foi gerado a partir do arquivo atual (a imagem pode ter sido trocada)
+    field_file = getattr(instance, field_name)
+    derivatives = getattr(instance, f'{field_name}_derivatives') or {}
+    if not field_file or derivatives.get('source') != field_file.name:
+        return None
+    return derivatives
+
+
+def srcset(instance, field_name='image'):
+    """
+    {'webp': 'url 320w, url 640w', 'jpeg': '...'} com as larguras já geradas,
+    pronto para <picture><source srcSet=...>. None se ainda não houver derivadas.
+    Sai do que o worker gravou no model: nada de consultar o storage por imagem.
+    """
+    derivatives = _current_derivatives(instance, field_name)
+    if not derivatives or not derivatives.get('webp'):
+        return None
+    return {
+        fmt: ', '.join(f"{settings.MEDIA_URL}{target} {width}w" for width, target in derivatives[fmt])
+        for fmt in FORMATS
+    }
+
+
+def needs_derivatives(instance, field_name):
+    if not getattr(instance, field_name):
+        return False
+    derivatives = _current_derivatives(instance, field_name)
+    # Gerações antigas não tinham o hash da original
+    return derivatives is None or 'hash' not in derivatives
+
+
+def _process(model, pk, field_names):
+    from .cache import bump_generation
+
+    try:
+        instance = model.objects.filter(pk=pk).first()
+        if instance is None:
+            return
+        metadata = {}
+        for field_name in field_names:
+            metadata.update(process_image(instance, field_name))
+        if metadata:
+            # .update() não dispara post_save (que reagendaria tudo de novo); o filtro pelo
+            # nome do arquivo evita gravar dados velhos se a imagem foi trocada no meio tempo
+            current = {field_name: getattr(instance, field_name).name for field_name in field_names}
+            model.objects.filter(pk=pk, **current).update(**metadata)
+        # As respostas cacheadas passam a mostrar o srcset e o placeholder
+        bump_generation(model)
+    except Exception:
+        logger.exception("Erro ao gerar imagens de %s %s", model.__name__, pk)
+    finally:
+        close_old_connections()
+
+
+def schedule_derivatives(instance, field_names):
+    """Enfileira a geração em background, depois do commit (o upload não espera)."""
+    pending = [
+        name for name in field_names
+        if needs_derivatives(instance, name) or needs_metadata(instance, name)
+    ]
+    if pending:
+        model, pk = type(instance), instance.pk
+        transaction.on_commit(lambda: _executor.submit(_process, model, pk, pending))
@@ -0,0 +1,28 @@
+import sys
+
+from django.core.management.base import BaseCommand
+
+from products.catalog_io import detect_format, export_lines, export_products
+
+
+class Command(BaseCommand):
+    help = "Exporta os produtos (com variações, acabamentos e upsells) em CSV ou JSONL, no formato do import_products."
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', nargs='?', default='-', help="Arquivo de saída (padrão: saída padrão)")
+        parser.add_argument('--format', choices=['csv', 'jsonl'], help="Força o formato (padrão: pela extensão)")
+
+    def handle(self, *args, **options):
+        path = options['path']
+        file_format = options['format'] or ('csv' if path == '-' else detect_format(path))
+        lines = export_lines(export_products(), file_format)
+        if path == '-':
+            sys.stdout.writelines(lines)
+            return
+        total = 0
+        with open(path, 'w', encoding='utf-8', newline='') as output:
+            for line in lines:
+                output.write(line)
+                total += 1
+        header = 1 if file_format == 'csv' else 0
+        self.stdout.write(self.style.SUCCESS(f"{total - header} produtos exportados para {path}."))
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+
+from products.cache import bump_generation
+from products.images import needs_derivatives, needs_metadata, process_image
+from products.signals import IMAGE_FIELDS
+
+
+class Command(BaseCommand):
+    help = "Gera as versões WebP/JPEG (320/640/1280) e o placeholder das imagens que ainda não têm."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help="Regera mesmo as que já existem")
+
+    def handle(self, *args, **options):
+        total = 0
+        for model, field_names in IMAGE_FIELDS.items():
+            for instance in model.objects.iterator(chunk_size=200):
+                metadata = {}
+                for field_name in field_names:
+                    field_file = getattr(instance, field_name)
+                    missing_derivatives = options['force'] or needs_derivatives(instance, field_name)
+                    if not field_file or not (missing_derivatives or needs_metadata(instance, field_name)):
+                        continue
+                    try:
+                        metadata.update(process_image(instance, field_name, derivatives=missing_derivatives))
+                        total += 1
+                    except Exception as e:
+                        self.stderr.write(f"{model.__name__} {instance.pk} ({field_file.name}): {e}")
+                if metadata:
+                    model.objects.filter(pk=instance.pk).update(**metadata)
+        if total:
+            bump_generation(*IMAGE_FIELDS)
+        self.stdout.write(self.style.SUCCESS(f"{total} imagens processadas."))
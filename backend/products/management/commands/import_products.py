@@ -0,0 +1,37 @@
+import json
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from products.catalog_io import BATCH_SIZE, ProductImporter, detect_format, read_rows
+
+
+class Command(BaseCommand):
+    help = "Importa/atualiza produtos (com variações, acabamentos e upsells) de um CSV ou JSONL, em lotes."
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Arquivo .csv ou .jsonl (use - para ler da entrada padrão)")
+        parser.add_argument('--format', choices=['csv', 'jsonl'], help="Força o formato (padrão: pela extensão)")
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+        parser.add_argument('--dry-run', action='store_true', help="Valida e mede, mas desfaz tudo no final")
+
+    def handle(self, *args, **options):
+        path = options['path']
+        file_format = options['format'] or detect_format(path)
+        importer = ProductImporter(batch_size=options['batch_size'], dry_run=options['dry_run'])
+        try:
+            if path == '-':
+                report = importer.run(read_rows(sys.stdin, file_format))
+            else:
+                with open(path, encoding='utf-8-sig', newline='') as stream:
+                    report = importer.run(read_rows(stream, file_format))
+        except OSError as e:
+            raise CommandError(str(e))
+
+        for error in report['errors']:
+            self.stderr.write(f"linha {error['line']}: {error['error']}")
+        summary = {key: value for key, value in report.items() if key != 'errors'}
+        summary['errors'] = len(report['errors'])
+        self.stdout.write(json.dumps(summary))
+        message = f"{report['rows']} linhas em {report['seconds']}s ({report['rows_per_second']} linhas/s)"
+        self.stdout.write(self.style.SUCCESS(message) if not report['errors'] else self.style.WARNING(message))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from products.campaigns import run_due_campaigns
+
+
+class Command(BaseCommand):
+    help = "Aplica as campanhas de preço que começaram e desfaz as que terminaram (rodar via cron)."
+
+    def handle(self, *args, **options):
+        applied, rolled_back = run_due_campaigns()
+        self.stdout.write(self.style.SUCCESS(f"{applied} campanhas aplicadas, {rolled_back} desfeitas."))
@@ -0,0 +1,146 @@
+import hashlib
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseNotModified, StreamingHttpResponse
+from django.utils._os import safe_join
+from django.utils.http import http_date, parse_etags
+from django.views.decorators.http import require_safe
+
+# Um ano: URLs versionadas (?v=hash do conteúdo atual) nunca mudam de conteúdo
+IMMUTABLE_CACHE = 'public, max-age=31536000, immutable'
+DEFAULT_CACHE = 'public, max-age=3600'
+RANGE_CHUNK = 64 * 1024
+
+# Derivadas com hash do conteúdo no nome (products/foto__w640.1a2b3c4d.webp) nunca mudam
+DERIVATIVE_RE = re.compile(r'__w\d+\.[0-9a-f]{8}\.(webp|jpg)$')
+
+
+def file_hash(file):
+    """Hash curto (sha256, 12 hex) do conteúdo de um arquivo aberto em modo binário."""
+    digest = hashlib.sha256()
+    for block in iter(lambda: file.read(1024 * 1024), b''):
+        digest.update(block)
+    return digest.hexdigest()[:12]
+
+
+def _disk_hash(full_path, stat):
+    # Só para conferir o ?v= no serve_media: uma leitura por versão do arquivo (tamanho + mtime)
+    def compute():
+        with open(full_path, 'rb') as f:
+            return file_hash(f)
+
+    return cache.get_or_set(f"media-hash:{full_path}:{stat.st_size}:{stat.st_mtime_ns}", compute, timeout=None)
+
+
+def media_url(instance, field_name='image'):
+    """
+    URL pública da imagem com ?v=<hash do conteúdo>, que pode ir pro cache por um ano.
+    O hash é gravado pelo worker de imagens em `<campo>_derivatives`, então aqui não se
+    toca no disco; enquanto ele não roda, sai a URL sem versão.
+    """
+    field_file = getattr(instance, field_name)
+    if not field_file:
+        return None
+    url = f"{settings.MEDIA_URL}{field_file}"
+    derivatives = getattr(instance, f'{field_name}_derivatives', None) or {}
+    if derivatives.get('source') == field_file.name and derivatives.get('hash'):
+        return f"{url}?v={derivatives['hash']}"
+    return url
+
+
+def _parse_range(header, size):
+    """'bytes=100-199' -> (100, 199). Só um intervalo; None se não der para atender."""
+    match = re.fullmatch(r'bytes=(\d*)-(\d*)', header.strip())
+    if not match or match.groups() == ('', ''):
+        return None
+    start, end = match.groups()
+    if start == '':
+        # bytes=-500: os últimos 500 bytes
+        start, end = max(size - int(end), 0), size - 1
+    else:
+        start, end = int(start), min(int(end), size - 1) if end else size - 1
+    if start > end or start >= size:
+        return None
+    return start, end
+
+
+def _read_range(path, start, length):
+    with open(path, 'rb') as f:
+        f.seek(start)
+        while length > 0:
+            chunk = f.read(min(RANGE_CHUNK, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+@require_safe
+def serve_media(request, path):
+    """
+    Serve /media/ com ETag, Cache-Control longo e Range.
+
+    Se o proxy na frente souber entregar o arquivo (MEDIA_ACCEL_REDIRECT_PREFIX para o
+    X-Accel-Redirect do nginx, ou MEDIA_SENDFILE_HEADER para X-Sendfile), o Django só
+    responde os cabeçalhos e o worker fica livre. Senão, FileResponse usa o sendfile
+    do gunicorn (zero-copy).
+    """
+    try:
+        full_path = safe_join(settings.MEDIA_ROOT, path)
+        stat = os.stat(full_path)
+    except (OSError, ValueError, SuspiciousFileOperation):
+        raise Http404
+    if not os.path.isfile(full_path):
+        raise Http404
+
+    etag = f'"{stat.st_size:x}-{stat.st_mtime_ns:x}"'
+    # ?v= só vale como versão se bater com o conteúdo atual; senão qualquer um fixaria um ano de cache
+    version = request.GET.get('v')
+    immutable = DERIVATIVE_RE.search(path) or (version and version == _disk_hash(full_path, stat))
+    headers = {
+        'ETag': etag,
+        'Last-Modified': http_date(stat.st_mtime),
+        'Cache-Control': IMMUTABLE_CACHE if immutable else DEFAULT_CACHE,
+        'Accept-Ranges': 'bytes',
+    }
+
+    if etag in parse_etags(request.headers.get('If-None-Match', '')):
+        response = HttpResponseNotModified()
+    elif getattr(settings, 'MEDIA_ACCEL_REDIRECT_PREFIX', ''):
+        response = HttpResponse()
+        response['X-Accel-Redirect'] = settings.MEDIA_ACCEL_REDIRECT_PREFIX.rstrip('/') + '/' + quote(path)
+    elif getattr(settings, 'MEDIA_SENDFILE_HEADER', ''):
+        response = HttpResponse()
+        response[settings.MEDIA_SENDFILE_HEADER] = full_path
+    else:
+        response = _file_response(request, full_path, stat.st_size, etag)
+
+    content_type, _ = mimetypes.guess_type(full_path)
+    if response.status_code != 304:
+        response['Content-Type'] = content_type or 'application/octet-stream'
+    for name, value in headers.items():
+        response[name] = value
+    return response
+
+
+def _file_response(request, full_path, size, etag):
+    range_header = request.headers.get('Range')
+    if_range = request.headers.get('If-Range')
+    if range_header and (not if_range or if_range == etag):
+        bounds = _parse_range(range_header, size)
+        if bounds is None:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            return response
+        start, end = bounds
+        response = StreamingHttpResponse(_read_range(full_path, start, end - start + 1), status=206)
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+        response['Content-Length'] = str(end - start + 1)
+        return response
+    return FileResponse(open(full_path, 'rb'))
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.15 on 2026-10-18 12:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0013_product_discount_percent_product_is_on_sale'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='product',
+            name='views_count',
+            field=models.PositiveIntegerField(db_index=True, default=0),
+        ),
+    ]
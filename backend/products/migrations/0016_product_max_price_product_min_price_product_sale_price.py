@@ -0,0 +1,45 @@
+# Generated by Django 5.1.15 on 2026-10-18 12:09
+
+from decimal import Decimal
+
+from django.db import migrations, models
+
+
+def fill_price_range(apps, schema_editor):
+    Product = apps.get_model('products', 'Product')
+    for product in Product.objects.prefetch_related('variants'):
+        prices = [variant.price for variant in product.variants.all()]
+        if not prices:
+            continue
+        product.min_price, product.max_price = min(prices), max(prices)
+        product.sale_price = product.min_price
+        if product.is_on_sale and product.discount_percent:
+            discounted = product.min_price * (Decimal(100) - product.discount_percent) / Decimal(100)
+            product.sale_price = discounted.quantize(Decimal('0.01'))
+        product.save(update_fields=['min_price', 'max_price', 'sale_price'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0015_banner_updated_at_category_updated_at_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='max_price',
+            field=models.DecimalField(blank=True, db_index=True, decimal_places=2, editable=False, max_digits=10, null=True),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='min_price',
+            field=models.DecimalField(blank=True, db_index=True, decimal_places=2, editable=False, max_digits=10, null=True),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='sale_price',
+            field=models.DecimalField(blank=True, db_index=True, decimal_places=2, editable=False, help_text='Menor preço já com o desconto da promoção aplicado', max_digits=10, null=True),
+        ),
+        migrations.RunPython(fill_price_range, migrations.RunPython.noop),
+    ]
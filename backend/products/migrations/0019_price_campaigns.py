@@ -0,0 +1,73 @@
+# Generated by Django 5.1.15 on 2026-10-18 12:25
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0018_image_placeholders'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PriceCampaign',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=150)),
+                ('kind', models.CharField(choices=[('sale', 'Promoção (selo + desconto)'), ('reprice', 'Reajuste de preço das variações')], default='sale', max_length=10, verbose_name='Tipo')),
+                ('adjustment_type', models.CharField(choices=[('percent', 'Percentual (%)'), ('absolute', 'Valor fixo (R$)')], default='percent', max_length=10, verbose_name='Reajuste em')),
+                ('value', models.DecimalField(decimal_places=2, default=0, help_text='Só no reajuste. Ex: 8 = +8% (ou +R$ 8,00); use negativo para baixar', max_digits=10)),
+                ('discount_percent', models.PositiveIntegerField(default=0, help_text='Só na promoção', verbose_name='Desconto (%)')),
+                ('search', models.CharField(blank=True, help_text='Só produtos que casam com a busca', max_length=200, verbose_name='Busca')),
+                ('starts_at', models.DateTimeField(blank=True, help_text='Vazio = aplicar manualmente', null=True, verbose_name='Início')),
+                ('ends_at', models.DateTimeField(blank=True, help_text='Desfaz sozinha nesse horário', null=True, verbose_name='Fim')),
+                ('status', models.CharField(choices=[('scheduled', 'Agendada'), ('active', 'Aplicada'), ('rolled_back', 'Desfeita')], default='scheduled', editable=False, max_length=15)),
+                ('applied_at', models.DateTimeField(blank=True, editable=False, null=True)),
+                ('rolled_back_at', models.DateTimeField(blank=True, editable=False, null=True)),
+                ('affected_products', models.PositiveIntegerField(default=0, editable=False)),
+                ('affected_variants', models.PositiveIntegerField(default=0, editable=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('categories', models.ManyToManyField(blank=True, to='products.category', verbose_name='Categorias')),
+                ('finishings', models.ManyToManyField(blank=True, to='products.finishing', verbose_name='Com os acabamentos')),
+            ],
+            options={
+                'verbose_name': 'Campanha de Preço',
+                'verbose_name_plural': 'Campanhas de Preço',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='CampaignVariantPrice',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('old_price', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('new_price', models.DecimalField(decimal_places=2, max_digits=10, null=True)),
+                ('variant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='campaign_prices', to='products.productvariant')),
+                ('campaign', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='variant_prices', to='products.pricecampaign')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='CampaignProductSale',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('was_on_sale', models.BooleanField()),
+                ('old_discount_percent', models.PositiveIntegerField()),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='campaign_sales', to='products.product')),
+                ('campaign', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='product_sales', to='products.pricecampaign')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='pricecampaign',
+            index=models.Index(fields=['status', 'starts_at'], name='campaign_status_starts_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='campaignvariantprice',
+            constraint=models.UniqueConstraint(fields=('campaign', 'variant'), name='unique_campaign_variant'),
+        ),
+        migrations.AddConstraint(
+            model_name='campaignproductsale',
+            constraint=models.UniqueConstraint(fields=('campaign', 'product'), name='unique_campaign_product'),
+        ),
+    ]
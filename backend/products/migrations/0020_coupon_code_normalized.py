@@ -0,0 +1,45 @@
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import Trim, Upper
+
+
+def fill_code_normalized(apps, schema_editor):
+    Coupon = apps.get_model('products', 'Coupon')
+    Coupon.objects.update(code_normalized=Upper(Trim('code')))
+
+    # Códigos que só diferem em maiúsculas/espaços ("promo" e "PROMO "): fica valendo um
+    # (o ativo, depois o mais antigo); os outros são desativados e ganham um sufixo com o
+    # id para o unique passar. Para reativar, o admin precisa dar outro código a eles.
+    duplicated = (
+        Coupon.objects.values('code_normalized').annotate(total=Count('id')).filter(total__gt=1)
+        .values_list('code_normalized', flat=True)
+    )
+    for normalized in list(duplicated):
+        coupons = list(Coupon.objects.filter(code_normalized=normalized).order_by('-is_active', 'id'))
+        for coupon in coupons[1:]:
+            suffix = f"~{coupon.pk}"
+            coupon.code_normalized = normalized[:50 - len(suffix)] + suffix
+            coupon.is_active = False
+            coupon.save(update_fields=['code_normalized', 'is_active'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0019_price_campaigns'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='coupon',
+            name='code_normalized',
+            field=models.CharField(default='', editable=False, max_length=50),
+            preserve_default=False,
+        ),
+        migrations.RunPython(fill_code_normalized, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='coupon',
+            name='code_normalized',
+            field=models.CharField(editable=False, max_length=50, unique=True),
+        ),
+    ]
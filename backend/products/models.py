@@ -1,10 +1,27 @@
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
+from django.core.exceptions import ValidationError
 from django.db import models
-from django.utils.text import slugify
+
+from .querysets import CategoryQuerySet, ProductQuerySet
+from .slugs import save_with_unique_slug
 
 class Category(models.Model):
     name = models.CharField(max_length=100)
     slug = models.SlugField(unique=True)
     icon = models.ImageField(upload_to='categories/', null=True, blank=True)
+    # Derivadas geradas (nomes com hash do conteúdo) — ver products/images.py
+    icon_derivatives = models.JSONField(default=dict, blank=True, editable=False)
+    icon_width = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    icon_height = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    icon_placeholder = models.TextField(blank=True, default='', editable=False)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = CategoryQuerySet.as_manager()
+
+    def save(self, *args, **kwargs):
+        # O painel pode mandar só o nome: o slug sai dele, sem colidir com outra categoria
+        save_with_unique_slug(self, self.name, lambda: super(Category, self).save(*args, **kwargs))
 
     def __str__(self):
         return self.name
@@ -21,9 +38,15 @@ class Product(models.Model):
     name = models.CharField(max_length=200)
     description = models.TextField(null=True, blank=True)
     image = models.ImageField(upload_to='products/')
+    # Preenchidos em background depois do upload (products/images.py)
+    image_width = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    image_height = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    image_placeholder = models.TextField(blank=True, default='', editable=False)
+    # Derivadas geradas (nomes com hash do conteúdo) — ver products/images.py
+    image_derivatives = models.JSONField(default=dict, blank=True, editable=False)
     production_time = models.CharField(max_length=50, help_text="Ex: 2 dias úteis, 5 horas") # Novo campo
     is_active = models.BooleanField(default=True)
-    views_count = models.PositiveIntegerField(default=0)
+    views_count = models.PositiveIntegerField(default=0, db_index=True)
     slug = models.SlugField(unique=True, blank=True, max_length=250, help_text="URL amigável para SEO")
     is_featured = models.BooleanField(default=False, verbose_name="Destaque")
     finishings = models.ManyToManyField(Finishing, blank=True, verbose_name="Acabamentos")
@@ -52,24 +75,36 @@ class Product(models.Model):
         help_text="Ex: Digite 15 para dar 15% de desconto no produto e em todas as suas variações."
     )
 
+    # Preços desnormalizados das variações (mantidos por signal) para filtrar/ordenar sem JOIN
+    min_price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True, editable=False, db_index=True)
+    max_price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True, editable=False, db_index=True)
+    sale_price = models.DecimalField(
+        max_digits=10, decimal_places=2, null=True, blank=True, editable=False, db_index=True,
+        help_text="Menor preço já com o desconto da promoção aplicado"
+    )
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    # Busca full-text (nome + descrição), mantida pelos signals — ver products/search.py
+    search_vector = SearchVectorField(null=True, editable=False)
+
     # (Opcional) Se você quiser flexibilidade no futuro para mudar o limite de 0.5m²
     # min_meter_area = models.DecimalField(
     #     max_digits=5, decimal_places=2, default=0.50,
     #     verbose_name="Área Mínima Cobrada (m²)"
     # )
+
+    objects = ProductQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            GinIndex(fields=['search_vector'], name='product_search_vector_idx'),
+            GinIndex(fields=['name'], name='product_name_trgm_idx', opclasses=['gin_trgm_ops']),
+        ]
     
     def save(self, *args, **kwargs):
-        if not self.slug:
-            # Cria o slug baseado no nome (Ex: "Cartão de Visita" -> "cartao-de-visita")
-            base_slug = slugify(self.name)
-            slug = base_slug
-            counter = 1
-            # Garante que seja único se já existir outro igual
-            while Product.objects.filter(slug=slug).exists():
-                slug = f"{base_slug}-{counter}"
-                counter += 1
-            self.slug = slug
-        super().save(*args, **kwargs)
+        # Cria o slug baseado no nome (Ex: "Cartão de Visita" -> "cartao-de-visita", "cartao-de-visita-1"...)
+        save_with_unique_slug(self, self.name, lambda: super(Product, self).save(*args, **kwargs))
 
     def __str__(self):
         return self.name
@@ -95,10 +130,20 @@ class Banner(models.Model):
         null=True,
         help_text="Formato recomendado: 800x1000px (Retrato)"
     )
+    image_width = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    image_height = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    image_placeholder = models.TextField(blank=True, default='', editable=False)
+    image_mobile_width = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    image_mobile_height = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    image_mobile_placeholder = models.TextField(blank=True, default='', editable=False)
+    # Derivadas geradas (nomes com hash do conteúdo) — ver products/images.py
+    image_derivatives = models.JSONField(default=dict, blank=True, editable=False)
+    image_mobile_derivatives = models.JSONField(default=dict, blank=True, editable=False)
     link = models.URLField(max_length=500, blank=True, verbose_name="Link de Destino")
     is_active = models.BooleanField(default=True, verbose_name="Ativo?")
     order = models.PositiveIntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True) # <--- O CAMPO QUE FALTAVA
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         verbose_name = "Banner"
@@ -116,15 +161,32 @@ class CompanyConfig(models.Model):
     facebook_pixel_id = models.CharField(max_length=50, blank=True, null=True, help_text="Ex: 1234567890")
     google_analytics_id = models.CharField(max_length=50, blank=True, null=True, help_text="Ex: G-XXXXXXXXXX")
     map_iframe = models.TextField(null=True, blank=True, help_text="Cole aqui o iframe do Google Maps")
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return self.name
 
+def normalize_coupon_code(code):
+    return (code or '').strip().upper()
+
+
 class Coupon(models.Model):
     code = models.CharField(max_length=50, unique=True)
+    # Código em maiúsculas: a validação busca por igualdade (índice) em vez de iexact
+    code_normalized = models.CharField(max_length=50, unique=True, editable=False)
     discount_percentage = models.PositiveIntegerField()
     is_active = models.BooleanField(default=True)
 
+    def clean(self):
+        # code_normalized não aparece no form, então o admin não checaria o unique dele
+        normalized = normalize_coupon_code(self.code)
+        if Coupon.objects.filter(code_normalized=normalized).exclude(pk=self.pk).exists():
+            raise ValidationError({'code': "Já existe um cupom com esse código (maiúsculas e espaços não contam)."})
+
+    def save(self, *args, **kwargs):
+        self.code_normalized = normalize_coupon_code(self.code)
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return f"{self.code} ({self.discount_percentage}%)"
 
@@ -134,6 +196,10 @@ class Kit(models.Model):
     slug = models.SlugField(unique=True, blank=True, max_length=250, help_text="URL amigável")
     description = models.TextField(null=True, blank=True)
     image = models.ImageField(upload_to='kits/', null=True, blank=True)
+    image_width = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    image_height = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    image_placeholder = models.TextField(blank=True, default='', editable=False)
+    image_derivatives = models.JSONField(default=dict, blank=True, editable=False)
     price = models.DecimalField(max_digits=10, decimal_places=2, help_text="Preço promocional do combo")
     
     # É aqui que a mágica acontece: vinculamos os produtos ao Kit
@@ -141,18 +207,18 @@ class Kit(models.Model):
     
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    class Meta:
+        indexes = [
+            GinIndex(fields=['search_vector'], name='kit_search_vector_idx'),
+            GinIndex(fields=['name'], name='kit_name_trgm_idx', opclasses=['gin_trgm_ops']),
+        ]
 
     def save(self, *args, **kwargs):
-        if not self.slug:
-            # Cria o slug baseado no nome do kit (Ex: "Kit Empreendedor" -> "kit-empreendedor")
-            base_slug = slugify(self.name)
-            slug = base_slug
-            counter = 1
-            while Kit.objects.filter(slug=slug).exists():
-                slug = f"{base_slug}-{counter}"
-                counter += 1
-            self.slug = slug
-        super().save(*args, **kwargs)
+        # Cria o slug baseado no nome do kit (Ex: "Kit Empreendedor" -> "kit-empreendedor")
+        save_with_unique_slug(self, self.name, lambda: super(Kit, self).save(*args, **kwargs))
 
     def __str__(self):
         return self.name
@@ -161,6 +227,10 @@ class Kit(models.Model):
 class ExitPopupConfig(models.Model):
     name = models.CharField(max_length=100, help_text="Nome interno para identificação")
     image = models.ImageField(upload_to='popups/', help_text="Banner que aparecerá (Ex: 600x400px)")
+    image_derivatives = models.JSONField(default=dict, blank=True, editable=False)
+    image_width = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    image_height = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    image_placeholder = models.TextField(blank=True, default='', editable=False)
     coupon_code = models.CharField(max_length=50, default="BEMVINDO", help_text="Código do cupom que será copiado (Ex: PRIMEIRACOMPRA)")
     
     # Regras de Exibição
@@ -176,4 +246,77 @@ class ExitPopupConfig(models.Model):
         verbose_name_plural = "Configurações do Pop-up"
 
     def __str__(self):
-        return f"{self.name} - {'Ativo' if self.is_active else 'Inativo'}"
\ No newline at end of file
+        return f"{self.name} - {'Ativo' if self.is_active else 'Inativo'}"
+
+class PriceCampaign(models.Model):
+    """
+    Promoção ou reajuste aplicado de uma vez a um grupo de produtos (ver products/campaigns.py).
+    Os valores anteriores ficam guardados para o "desfazer".
+    """
+    KIND_CHOICES = [
+        ('sale', 'Promoção (selo + desconto)'),
+        ('reprice', 'Reajuste de preço das variações'),
+    ]
+    ADJUSTMENT_CHOICES = [
+        ('percent', 'Percentual (%)'),
+        ('absolute', 'Valor fixo (R$)'),
+    ]
+    STATUS_CHOICES = [
+        ('scheduled', 'Agendada'),
+        ('active', 'Aplicada'),
+        ('rolled_back', 'Desfeita'),
+    ]
+
+    name = models.CharField(max_length=150)
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES, default='sale', verbose_name="Tipo")
+    adjustment_type = models.CharField(max_length=10, choices=ADJUSTMENT_CHOICES, default='percent', verbose_name="Reajuste em")
+    value = models.DecimalField(
+        max_digits=10, decimal_places=2, default=0,
+        help_text="Só no reajuste. Ex: 8 = +8% (ou +R$ 8,00); use negativo para baixar"
+    )
+    discount_percent = models.PositiveIntegerField(default=0, verbose_name="Desconto (%)", help_text="Só na promoção")
+
+    # Filtros (vazio = todos os produtos)
+    categories = models.ManyToManyField(Category, blank=True, verbose_name="Categorias")
+    finishings = models.ManyToManyField(Finishing, blank=True, verbose_name="Com os acabamentos")
+    search = models.CharField(max_length=200, blank=True, verbose_name="Busca", help_text="Só produtos que casam com a busca")
+
+    starts_at = models.DateTimeField(null=True, blank=True, verbose_name="Início", help_text="Vazio = aplicar manualmente")
+    ends_at = models.DateTimeField(null=True, blank=True, verbose_name="Fim", help_text="Desfaz sozinha nesse horário")
+    status = models.CharField(max_length=15, choices=STATUS_CHOICES, default='scheduled', editable=False)
+    applied_at = models.DateTimeField(null=True, blank=True, editable=False)
+    rolled_back_at = models.DateTimeField(null=True, blank=True, editable=False)
+    affected_products = models.PositiveIntegerField(default=0, editable=False)
+    affected_variants = models.PositiveIntegerField(default=0, editable=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Campanha de Preço"
+        verbose_name_plural = "Campanhas de Preço"
+        ordering = ['-created_at']
+        indexes = [models.Index(fields=['status', 'starts_at'], name='campaign_status_starts_idx')]
+
+    def __str__(self):
+        return f"{self.name} ({self.get_status_display()})"
+
+
+class CampaignVariantPrice(models.Model):
+    """Preço de cada variação antes (e depois) de um reajuste, para poder desfazer."""
+    campaign = models.ForeignKey(PriceCampaign, related_name='variant_prices', on_delete=models.CASCADE)
+    variant = models.ForeignKey(ProductVariant, related_name='campaign_prices', on_delete=models.CASCADE)
+    old_price = models.DecimalField(max_digits=10, decimal_places=2)
+    new_price = models.DecimalField(max_digits=10, decimal_places=2, null=True)
+
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=['campaign', 'variant'], name='unique_campaign_variant')]
+
+
+class CampaignProductSale(models.Model):
+    """Promoção de cada produto antes de uma campanha de promoção, para poder desfazer."""
+    campaign = models.ForeignKey(PriceCampaign, related_name='product_sales', on_delete=models.CASCADE)
+    product = models.ForeignKey(Product, related_name='campaign_sales', on_delete=models.CASCADE)
+    was_on_sale = models.BooleanField()
+    old_discount_percent = models.PositiveIntegerField()
+
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=['campaign', 'product'], name='unique_campaign_product')]
@@ -0,0 +1,104 @@
+import base64
+import json
+from datetime import datetime
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class CatalogPagination(PageNumberPagination):
+    """
+    Paginação do catálogo: por padrão continua a mesma (?page=N, com COUNT + OFFSET).
+
+    Com ?cursor= (vazio na primeira página) passa para keyset: a próxima página é
+    buscada com WHERE (campo, id) depois do último item visto, então a página 50 custa
+    o mesmo que a 1. O COUNT só roda se o cliente pedir ?count=true.
+    A view define as ordenações aceitas em `keyset_orderings` (a primeira é o padrão).
+    """
+    cursor_query_param = 'cursor'
+    count_query_param = 'count'
+    invalid_cursor_message = 'Cursor inválido'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = self.cursor_query_param in request.query_params
+        if not self.keyset:
+            return super().paginate_queryset(queryset, request, view)
+
+        self.request = request
+        page_size = self.get_page_size(request)
+        orderings = getattr(view, 'keyset_orderings', ['-id'])
+        cursor = self.decode_cursor(request)
+
+        if cursor:
+            ordering = cursor['o']
+            if ordering not in orderings:
+                raise NotFound(self.invalid_cursor_message)
+        else:
+            ordering = request.query_params.get('ordering')
+            if ordering not in orderings:
+                ordering = orderings[0]
+        field = ordering.lstrip('-')
+        descending = ordering.startswith('-')
+
+        # O id desempata valores repetidos (ex: vários produtos com 0 views)
+        tiebreak = '-id' if descending else 'id'
+        queryset = queryset.order_by(ordering) if field == 'id' else queryset.order_by(ordering, tiebreak)
+        self.total = queryset.count() if request.query_params.get(self.count_query_param) == 'true' else None
+
+        if cursor:
+            lookup = 'lt' if descending else 'gt'
+            if field == 'id':
+                queryset = queryset.filter(**{f'id__{lookup}': cursor['id']})
+            else:
+                queryset = queryset.filter(
+                    Q(**{f'{field}__{lookup}': cursor['v']}) | Q(**{field: cursor['v'], f'id__{lookup}': cursor['id']})
+                )
+
+        rows = list(queryset[:page_size + 1])
+        page = rows[:page_size]
+        self.next_cursor = None
+        if len(rows) > page_size:
+            last = page[-1]
+            value = getattr(last, field)
+            # O DjangoJSONEncoder corta datas em milissegundos; o cursor precisa do valor exato
+            if isinstance(value, datetime):
+                value = value.isoformat()
+            self.next_cursor = self.encode_cursor({'o': ordering, 'v': value, 'id': last.pk})
+        return page
+
+    def get_paginated_response(self, data):
+        if not self.keyset:
+            return super().get_paginated_response(data)
+
+        response = {}
+        if self.total is not None:
+            response['count'] = self.total
+        response['next'] = self.get_next_cursor_link()
+        response['results'] = data
+        return Response(response)
+
+    def get_next_cursor_link(self):
+        if self.next_cursor is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.next_cursor)
+
+    @staticmethod
+    def encode_cursor(position):
+        raw = json.dumps(position, cls=DjangoJSONEncoder, separators=(',', ':'))
+        return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            padded = encoded + '=' * (-len(encoded) % 4)
+            position = json.loads(base64.urlsafe_b64decode(padded.encode()))
+            return {'o': str(position['o']), 'v': position.get('v'), 'id': int(position['id'])}
+        except (TypeError, ValueError, KeyError):
+            raise NotFound(self.invalid_cursor_message)
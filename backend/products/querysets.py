@@ -0,0 +1,69 @@
+from decimal import Decimal
+
+from django.db import models
+from django.db.models import Case, Count, DecimalField, ExpressionWrapper, F, Max, Min, OuterRef, Prefetch, Q, Subquery, When
+from django.db.models.functions import Round
+
+
+class ProductQuerySet(models.QuerySet):
+    """
+    Monta os select_related/prefetch certos para cada serializer de produto,
+    assim a listagem custa sempre o mesmo número de queries (sem N+1).
+    """
+
+    def with_starting_price(self):
+        """Anota o 'A partir de' (preço da primeira variação) direto no SQL."""
+        from .models import ProductVariant
+
+        first_variant = ProductVariant.objects.filter(product=OuterRef('pk')).order_by('pk')
+        return self.annotate(starting_price=Subquery(first_variant.values('price')[:1]))
+
+    def for_upsell(self):
+        """Usado pelo UpsellProductSerializer (Compre Junto e itens do Kit)."""
+        return self.with_starting_price()
+
+    def for_serializer(self, relations=None):
+        """
+        Usado pelo ProductSerializer completo (listagem, detalhe e dashboard).
+        `relations` limita os prefetches ao que a resposta vai mostrar (?fields= / ?expand=).
+        """
+        prefetches = {
+            'variants': 'variants',
+            'finishings': 'finishings',
+            'upsell_products': Prefetch('upsell_products', queryset=self.model.objects.for_upsell()),
+        }
+        if relations is not None:
+            prefetches = {name: prefetch for name, prefetch in prefetches.items() if name in relations}
+        return self.select_related('category').prefetch_related(*prefetches.values())
+
+    def refresh_price_range(self):
+        """
+        Recalcula min_price/max_price/sale_price a partir das variações, num único UPDATE
+        para todo o queryset. Chamado pelos signals de ProductVariant e Product.
+        """
+        from .models import ProductVariant
+
+        def variant_price(aggregate):
+            variants = ProductVariant.objects.filter(product=OuterRef('pk')).order_by().values('product')
+            return Subquery(variants.annotate(value=aggregate('price')).values('value'))
+
+        price_field = DecimalField(max_digits=10, decimal_places=2)
+        discounted = ExpressionWrapper(
+            variant_price(Min) * (Decimal(100) - F('discount_percent')) / Decimal(100), output_field=price_field
+        )
+        return self.update(
+            min_price=variant_price(Min),
+            max_price=variant_price(Max),
+            sale_price=Case(
+                When(is_on_sale=True, discount_percent__gt=0, then=Round(discounted, 2)),
+                default=variant_price(Min),
+                output_field=price_field,
+            ),
+        )
+
+
+class CategoryQuerySet(models.QuerySet):
+
+    def with_products_count(self):
+        """Quantidade de produtos ativos de cada categoria, num único GROUP BY."""
+        return self.annotate(products_count=Count('products', filter=Q(products__is_active=True)))
@@ -0,0 +1,61 @@
+import re
+
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+from django.db import connection
+from django.db.models import F, Q
+from rest_framework import filters
+
+# Configuração criada na migration 0017: dicionário português + unaccent
+# ("cartão" e "cartao" viram o mesmo lexema)
+SEARCH_CONFIG = 'portuguese_unaccent'
+
+
+def is_postgres():
+    return connection.vendor == 'postgresql'
+
+
+def build_search_vector():
+    """Nome pesa mais que a descrição no ranking."""
+    return (
+        SearchVector('name', weight='A', config=SEARCH_CONFIG)
+        + SearchVector('description', weight='B', config=SEARCH_CONFIG)
+    )
+
+
+def refresh_search_vector(queryset):
+    """Regrava o search_vector do queryset num único UPDATE (Product ou Kit)."""
+    if not is_postgres():
+        return 0
+    return queryset.update(search_vector=build_search_vector())
+
+
+def build_prefix_query(terms):
+    """'cart visi' -> to_tsquery('cart:* & visi:*'): casa enquanto o cliente digita."""
+    words = [word for term in terms for word in re.findall(r'\w+', term)]
+    if not words:
+        return None
+    return SearchQuery(' & '.join(f"{word}:*" for word in words), config=SEARCH_CONFIG, search_type='raw')
+
+
+class FullTextSearchFilter(filters.SearchFilter):
+    """
+    Substitui o SearchFilter do DRF (ILIKE '%termo%') pela busca full-text do Postgres:
+    tsvector indexado (GIN) + ranking por SearchRank, com fallback por trigrama no nome
+    para erros de digitação. Fora do Postgres (ex: testes em SQLite) usa o SearchFilter normal.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        if not is_postgres():
+            return super().filter_queryset(request, queryset, view)
+
+        terms = self.get_search_terms(request)
+        query = build_prefix_query(terms)
+        if query is None:
+            return queryset
+
+        text = ' '.join(terms)
+        return (
+            queryset.annotate(search_rank=SearchRank(F('search_vector'), query))
+            .filter(Q(search_vector=query) | Q(name__trigram_word_similar=text))
+            .order_by('-search_rank', '-id')
+        )
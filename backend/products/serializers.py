@@ -1,7 +1,40 @@
 from rest_framework import serializers
 import json
-from .models import Category, Product, ProductVariant, Banner, CompanyConfig, Coupon, Finishing, Kit, ExitPopupConfig
-from django.conf import settings
+from decimal import Decimal
+from .models import Category, Product, ProductVariant, Banner, CompanyConfig, Coupon, Finishing, Kit, ExitPopupConfig, PriceCampaign
+from .images import srcset
+from .media import media_url
+from .variants import clean_variants, sync_variants
+
+def _query_list(request, param):
+    value = request.query_params.get(param, '') if request else ''
+    return [name.strip() for name in value.split(',') if name.strip()]
+
+
+class DynamicFieldsMixin:
+    """
+    Sparse fieldsets nas leituras (GET):
+      ?fields=id,name,image  -> devolve só esses campos
+      ?expand=variants       -> liga campos pesados de `expandable_fields` (off por padrão)
+    Só vale para o serializer da resposta, não para os aninhados.
+    """
+    expandable_fields = {}
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
+        if request is None or request.method != 'GET':
+            return
+
+        for name in _query_list(request, 'expand'):
+            if name in self.expandable_fields:
+                self.fields[name] = self.expandable_fields[name]()
+
+        requested = set(_query_list(request, 'fields'))
+        if requested:
+            for name in set(self.fields) - requested:
+                self.fields.pop(name)
+
 
 class VariantSerializer(serializers.ModelSerializer):
     class Meta:
@@ -23,22 +56,24 @@ class UpsellProductSerializer(serializers.ModelSerializer):
         fields = ['id', 'name', 'slug', 'image', 'starting_price']
 
     def get_image(self, obj):
-        if obj.image:
-            return f"{settings.MEDIA_URL}{obj.image}"
-        return None
+        return media_url(obj)
 
     def get_starting_price(self, obj):
+        # Vem anotado pelo ProductQuerySet.for_upsell(); o fallback evita quebrar querysets "crus"
+        if hasattr(obj, 'starting_price'):
+            return obj.starting_price if obj.starting_price is not None else 0
         first_variant = obj.variants.first()
         return first_variant.price if first_variant else 0
 # -----------------------------------------
 
-class ProductSerializer(serializers.ModelSerializer):
+class ProductSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     variants = VariantSerializer(many=True, read_only=True)
     finishings = FinishingSerializer(many=True, read_only=True)
     upsell_products = UpsellProductSerializer(many=True, read_only=True) # <--- NOVO
     category_name = serializers.ReadOnlyField(source='category.name')
     category_slug = serializers.ReadOnlyField(source='category.slug')
     image = serializers.SerializerMethodField()
+    image_srcset = serializers.SerializerMethodField()
     
     class Meta:
         model = Product
@@ -46,13 +81,29 @@ class ProductSerializer(serializers.ModelSerializer):
             'id', 'name', 'slug', 'description', 'image',
             'production_time', 'category', 'category_name', 
             'variants', 'finishings', 'is_featured',
-            'views_count', 'category_slug', 'upsell_products', 'is_meter_price', 'is_on_sale', 'discount_percent'
+            'views_count', 'category_slug', 'upsell_products', 'is_meter_price', 'is_on_sale', 'discount_percent',
+            'min_price', 'max_price', 'sale_price', 'image_srcset',
+            'image_width', 'image_height', 'image_placeholder'
         ]
 
     def get_image(self, obj):
-        if obj.image:
-            return f"{settings.MEDIA_URL}{obj.image}"
-        return None
+        return media_url(obj)
+
+    def get_image_srcset(self, obj):
+        return srcset(obj)
+
+    def _parse_variants(self, variants_data):
+        if not variants_data:
+            return None
+        try:
+            variants_list = json.loads(variants_data)
+            if not isinstance(variants_list, list):
+                raise ValueError("variants_json deve ser uma lista")
+            # Valida antes de salvar o produto (sync_variants levanta ValueError)
+            clean_variants(variants_list)
+        except ValueError as e:
+            raise serializers.ValidationError({'variants_json': str(e)})
+        return variants_list
 
     def create(self, validated_data):
         request = self.context.get('request')
@@ -60,16 +111,11 @@ class ProductSerializer(serializers.ModelSerializer):
         finishings_data = request.data.get('finishings_json')
         upsells_data = request.data.get('upsells_json') # <--- NOVO
         
+        variants_list = self._parse_variants(variants_data)
         product = Product.objects.create(**validated_data)
         
-        if variants_data:
-            try:
-                variants_list = json.loads(variants_data)
-                for variant in variants_list:
-                    ProductVariant.objects.create(
-                        product=product, name=variant.get('name'), price=variant.get('price')
-                    )
-            except: pass
+        if variants_list is not None:
+            sync_variants([(product.pk, variants_list)])
 
         if finishings_data:
             try:
@@ -91,19 +137,14 @@ class ProductSerializer(serializers.ModelSerializer):
         finishings_data = request.data.get('finishings_json')
         upsells_data = request.data.get('upsells_json') # <--- NOVO
 
+        variants_list = self._parse_variants(variants_data)
         for attr, value in validated_data.items():
             setattr(instance, attr, value)
         instance.save()
 
-        if variants_data:
-            try:
-                variants_list = json.loads(variants_data)
-                instance.variants.all().delete()
-                for v in variants_list:
-                    ProductVariant.objects.create(
-                        product=instance, name=v.get('name'), price=v.get('price')
-                    )
-            except: pass
+        if variants_list is not None:
+            # Só grava o que mudou: as variações mantêm os ids
+            sync_variants([(instance.pk, variants_list)])
             
         if finishings_data:
             try:
@@ -119,32 +160,73 @@ class ProductSerializer(serializers.ModelSerializer):
 
         return instance
 
+class ProductCompactSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
+    """Versão enxuta para os cards da vitrine e os seletores do painel (?view=compact)."""
+    category_name = serializers.ReadOnlyField(source='category.name')
+    category_slug = serializers.ReadOnlyField(source='category.slug')
+    image = serializers.SerializerMethodField()
+    image_srcset = serializers.SerializerMethodField()
+
+    expandable_fields = {
+        'variants': lambda: VariantSerializer(many=True, read_only=True),
+        'finishings': lambda: FinishingSerializer(many=True, read_only=True),
+        'upsell_products': lambda: UpsellProductSerializer(many=True, read_only=True),
+    }
+
+    class Meta:
+        model = Product
+        fields = [
+            'id', 'name', 'slug', 'image', 'production_time', 'category', 'category_name', 'category_slug',
+            'is_featured', 'is_meter_price', 'is_on_sale', 'discount_percent', 'min_price', 'sale_price',
+            'image_srcset', 'image_width', 'image_height', 'image_placeholder'
+        ]
+        read_only_fields = fields
+
+    def get_image(self, obj):
+        return media_url(obj)
+
+    def get_image_srcset(self, obj):
+        return srcset(obj)
+
 class CategorySerializer(serializers.ModelSerializer):
-    products_count = serializers.IntegerField(source='products.count', read_only=True)
+    products_count = serializers.SerializerMethodField()
+    icon = serializers.SerializerMethodField()
 
     class Meta:
         model = Category
-        fields = ['id', 'name', 'slug', 'products_count']
+        fields = ['id', 'name', 'slug', 'products_count', 'icon', 'icon_width', 'icon_height', 'icon_placeholder']
+        # Sem slug, Category.save gera um livre a partir do nome
         extra_kwargs = {'slug': {'required': False}}
 
-    def create(self, validated_data):
-        if 'slug' not in validated_data:
-            from django.utils.text import slugify
-            validated_data['slug'] = slugify(validated_data['name'])
-        return super().create(validated_data)
+    def get_icon(self, obj):
+        return media_url(obj, 'icon')
+
+    def get_products_count(self, obj):
+        # Vem anotado pelo CategoryQuerySet.with_products_count(); o fallback cobre create/update
+        if hasattr(obj, 'products_count'):
+            return obj.products_count
+        return obj.products.filter(is_active=True).count()
 
 
 class BannerSerializer(serializers.ModelSerializer):
     image = serializers.SerializerMethodField()
+    image_srcset = serializers.SerializerMethodField()
+    image_mobile_srcset = serializers.SerializerMethodField()
 
     class Meta:
         model = Banner
-        fields = ['id', 'title', 'subtitle', 'image', 'image_mobile', 'link', 'is_active', 'order']
+        fields = ['id', 'title', 'subtitle', 'image', 'image_mobile', 'link', 'is_active', 'order',
+                  'image_srcset', 'image_mobile_srcset', 'image_width', 'image_height', 'image_placeholder',
+                  'image_mobile_width', 'image_mobile_height', 'image_mobile_placeholder']
 
     def get_image(self, obj):
-        if obj.image:
-            return f"{settings.MEDIA_URL}{obj.image}"
-        return None
+        return media_url(obj)
+
+    def get_image_srcset(self, obj):
+        return srcset(obj)
+
+    def get_image_mobile_srcset(self, obj):
+        return srcset(obj, 'image_mobile')
 
 class CompanyConfigSerializer(serializers.ModelSerializer):
     class Meta:
@@ -161,18 +243,40 @@ class KitSerializer(serializers.ModelSerializer):
     # Usamos o mini-serializer do Upsell para mostrar os itens do kit sem pesar o JSON
     products_details = UpsellProductSerializer(source='products', many=True, read_only=True)
     image = serializers.SerializerMethodField()
+    image_srcset = serializers.SerializerMethodField()
+    savings = serializers.SerializerMethodField()
 
     class Meta:
         model = Kit
         fields = [
             'id', 'name', 'slug', 'description', 'image', 
-            'price', 'is_active', 'products', 'products_details', 'created_at'
+            'price', 'is_active', 'products', 'products_details', 'created_at', 'image_srcset',
+            'image_width', 'image_height', 'image_placeholder', 'savings'
         ]
 
     def get_image(self, obj):
-        if obj.image:
-            return f"{settings.MEDIA_URL}{obj.image}"
-        return None
+        return media_url(obj)
+
+    def get_savings(self, obj):
+        """
+        Soma dos itens avulsos (menor preço de cada um, já com a promoção) contra o preço
+        do kit. Sai dos produtos pré-carregados pelo KitViewSet, sem query extra; a resposta
+        inteira fica no cache por geração (Kit/Product/ProductVariant), que o m2m_changed
+        de Kit.products e os saves de variação já invalidam.
+        """
+        items_total = sum(
+            (product.sale_price if product.sale_price is not None else product.min_price or Decimal('0'))
+            for product in obj.products.all()
+        )
+        amount = max(items_total - obj.price, Decimal('0')) if items_total else Decimal('0')
+        return {
+            'items_total': f"{items_total:.2f}",
+            'amount': f"{amount:.2f}",
+            'percent': int(amount * 100 / items_total) if items_total else 0,
+        }
+
+    def get_image_srcset(self, obj):
+        return srcset(obj)
 
     def create(self, validated_data):
         # Remove os produtos para salvar depois
@@ -221,6 +325,38 @@ class KitSerializer(serializers.ModelSerializer):
 
 
 class ExitPopupConfigSerializer(serializers.ModelSerializer):
+    image_srcset = serializers.SerializerMethodField()
+
     class Meta:
         model = ExitPopupConfig
-        fields = '__all__'
\ No newline at end of file
+        exclude = ['image_derivatives']
+
+    def get_image_srcset(self, obj):
+        return srcset(obj)
+
+
+class PriceCampaignSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = PriceCampaign
+        fields = [
+            'id', 'name', 'kind', 'adjustment_type', 'value', 'discount_percent', 'categories', 'finishings',
+            'search', 'starts_at', 'ends_at', 'status', 'applied_at', 'rolled_back_at',
+            'affected_products', 'affected_variants', 'created_at'
+        ]
+
+    def validate(self, attrs):
+        if self.instance is not None and self.instance.status != 'scheduled':
+            raise serializers.ValidationError("Campanha já aplicada não pode ser editada (desfaça e crie outra).")
+        data = dict(attrs)
+        if self.instance is not None:
+            # PATCH: completa com o que já está salvo
+            for field in ('kind', 'value', 'discount_percent', 'starts_at', 'ends_at'):
+                data.setdefault(field, getattr(self.instance, field))
+        kind = data.get('kind', 'sale')
+        if kind == 'sale' and not 0 < data.get('discount_percent', 0) <= 100:
+            raise serializers.ValidationError({'discount_percent': "Informe um desconto entre 1 e 100."})
+        if kind == 'reprice' and not data.get('value'):
+            raise serializers.ValidationError({'value': "Informe o valor do reajuste."})
+        if data.get('starts_at') and data.get('ends_at') and data['ends_at'] <= data['starts_at']:
+            raise serializers.ValidationError({'ends_at': "O fim precisa ser depois do início."})
+        return attrs
@@ -0,0 +1,70 @@
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from .cache import bump_generation
+from .images import schedule_derivatives
+from .models import Banner, Category, CompanyConfig, Coupon, ExitPopupConfig, Finishing, Kit, Product, ProductVariant
+from .search import refresh_search_vector
+from .suggest import suggestion_index
+
+# Tudo que aparece nas rotas públicas do catálogo
+CATALOG_MODELS = (Category, Finishing, Product, ProductVariant, Banner, CompanyConfig, Coupon, Kit, ExitPopupConfig)
+
+
+@receiver(post_save)
+@receiver(post_delete)
+def invalidate_catalog_cache(sender, **kwargs):
+    if sender in CATALOG_MODELS:
+        bump_generation(sender)
+
+
+@receiver(m2m_changed, sender=Product.finishings.through)
+@receiver(m2m_changed, sender=Product.upsell_products.through)
+@receiver(m2m_changed, sender=Kit.products.through)
+def invalidate_catalog_cache_m2m(sender, instance, action, model, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        bump_generation(type(instance), model)
+
+
+@receiver(post_save, sender=ProductVariant)
+@receiver(post_delete, sender=ProductVariant)
+def refresh_product_prices_from_variant(sender, instance, **kwargs):
+    Product.objects.filter(pk=instance.product_id).refresh_price_range()
+
+
+@receiver(post_save, sender=Product)
+def refresh_product_prices(sender, instance, **kwargs):
+    # Promoção/desconto podem ter mudado: recalcula o sale_price
+    Product.objects.filter(pk=instance.pk).refresh_price_range()
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_save, sender=Kit)
+def refresh_search(sender, instance, **kwargs):
+    refresh_search_vector(sender.objects.filter(pk=instance.pk))
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+@receiver(post_save, sender=Kit)
+@receiver(post_delete, sender=Kit)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def update_suggestion_index(sender, instance, **kwargs):
+    suggestion_index.update(sender._meta.model_name, instance.pk)
+
+
+# Campos de imagem que ganham versões redimensionadas (WebP + JPEG) — ver products/images.py
+IMAGE_FIELDS = {
+    Product: ['image'],
+    Kit: ['image'],
+    Banner: ['image', 'image_mobile'],
+    Category: ['icon'],
+    ExitPopupConfig: ['image'],
+}
+
+
+@receiver(post_save)
+def generate_image_derivatives(sender, instance, **kwargs):
+    if sender in IMAGE_FIELDS:
+        schedule_derivatives(instance, IMAGE_FIELDS[sender])
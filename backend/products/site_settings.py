@@ -0,0 +1,71 @@
+import hashlib
+import threading
+
+from django.utils.http import parse_etags, quote_etag
+from rest_framework import permissions, status
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from .cache import get_generations
+from .media import media_url
+from .models import CompanyConfig, ExitPopupConfig
+from .serializers import CompanyConfigSerializer, ExitPopupConfigSerializer
+
+
+class SiteSettings:
+    """
+    Configurações da loja (CompanyConfig + pop-up de saída ativo) carregadas uma vez
+    por processo. Mudam poucas vezes por ano: a cada save/delete os signals sobem a
+    geração desses models no cache, e cada worker recarrega na próxima leitura.
+    Fora isso, servir a página não toca no banco.
+    """
+    models = (CompanyConfig, ExitPopupConfig)
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._payload = None
+        self._version = None
+
+    def version(self):
+        generations = get_generations(self.models)
+        return hashlib.md5(str(generations).encode()).hexdigest()
+
+    def _load(self):
+        company = CompanyConfig.objects.order_by('id').first()
+        popup = ExitPopupConfig.objects.filter(is_active=True).order_by('-created_at').first()
+        popup_data = None
+        if popup is not None:
+            popup_data = dict(ExitPopupConfigSerializer(popup).data)
+            popup_data['image'] = media_url(popup)
+        return {
+            'company': CompanyConfigSerializer(company).data if company else None,
+            'exit_popup': popup_data,
+        }
+
+    def get(self):
+        """(versão, payload) — recarrega do banco só se alguém salvou algo desde a última vez."""
+        version = self.version()
+        if version != self._version:
+            payload = self._load()
+            with self._lock:
+                self._payload, self._version = payload, version
+        return self._version, self._payload
+
+
+site_settings = SiteSettings()
+
+
+class SiteSettingsView(APIView):
+    """Bootstrap da vitrine: GET /api/site-settings/ (dados da empresa + pop-up ativo)."""
+    permission_classes = [permissions.AllowAny]
+
+    def get(self, request):
+        version, payload = site_settings.get()
+        etag = quote_etag(version)
+        if etag in parse_etags(request.headers.get('If-None-Match', '')):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = Response({**payload, 'version': version})
+        response['ETag'] = etag
+        response['Cache-Control'] = 'public, max-age=60'
+        return response
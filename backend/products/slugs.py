@@ -0,0 +1,91 @@
+import re
+
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils.text import slugify
+
+SAVE_ATTEMPTS = 5
+SUFFIX_RE = re.compile(r'^(.*)-(\d+)$')
+# Quantas bases por consulta no reserve_slugs (a regex cresce com a lista)
+RESERVE_CHUNK = 100
+
+
+def _base(model, text):
+    max_length = model._meta.get_field('slug').max_length
+    # Deixa espaço para o sufixo (-123) sem estourar o tamanho da coluna
+    base = slugify(text or '')[:max_length - 6].strip('-')
+    return base or model._meta.model_name
+
+
+def _taken_suffixes(model, bases):
+    """
+    Uma consulta para várias bases: {base: {sufixos usados}} (0 = a própria base).
+    O startswith deixa o banco usar o índice do slug; a regex filtra só base e base-N.
+    """
+    taken = {base: set() for base in bases}
+    if not bases:
+        return taken
+    pattern = '^(' + '|'.join(re.escape(base) for base in bases) + r')(-[0-9]+)?$'
+    prefixes = Q()
+    for base in bases:
+        prefixes |= Q(slug__startswith=base)
+    for slug in model.objects.filter(prefixes, slug__regex=pattern).values_list('slug', flat=True):
+        if slug in taken:
+            taken[slug].add(0)
+        match = SUFFIX_RE.match(slug)
+        if match and match.group(1) in taken:
+            taken[match.group(1)].add(int(match.group(2)))
+    return taken
+
+
+def _next(base, used):
+    if 0 not in used:
+        return base, 0
+    suffix = max(used) + 1
+    return f"{base}-{suffix}", suffix
+
+
+def allocate_slug(model, text):
+    """Próximo slug livre para o texto ("cartao", "cartao-1", "cartao-2"...) em uma query."""
+    base = _base(model, text)
+    slug, _ = _next(base, _taken_suffixes(model, [base])[base])
+    return slug
+
+
+def reserve_slugs(model, texts):
+    """
+    Slugs livres para uma lista de nomes de uma vez (imports em lote), já sem
+    repetição entre si: ["Cartão", "Cartão"] -> ["cartao-3", "cartao-4"].
+    """
+    bases = [_base(model, text) for text in texts]
+    distinct = list(dict.fromkeys(bases))
+    taken = {}
+    for start in range(0, len(distinct), RESERVE_CHUNK):
+        taken.update(_taken_suffixes(model, distinct[start:start + RESERVE_CHUNK]))
+
+    slugs = []
+    for base in bases:
+        slug, suffix = _next(base, taken[base])
+        taken[base].add(suffix)
+        slugs.append(slug)
+    return slugs
+
+
+def save_with_unique_slug(instance, text, save):
+    """
+    Preenche o slug (se vazio) e chama `save()`. Se outro processo pegar o mesmo slug
+    entre a consulta e o INSERT, o banco recusa (unique) e tentamos o próximo.
+    """
+    if instance.slug:
+        return save()
+    model = type(instance)
+    for attempt in range(SAVE_ATTEMPTS):
+        instance.slug = allocate_slug(model, text)
+        try:
+            with transaction.atomic():
+                return save()
+        except IntegrityError:
+            collided = model.objects.filter(slug=instance.slug).exclude(pk=instance.pk).exists()
+            instance.slug = ''
+            if not collided or attempt == SAVE_ATTEMPTS - 1:
+                raise
@@ -0,0 +1,149 @@
+import heapq
+import threading
+import unicodedata
+from bisect import bisect_left, insort
+
+from django.conf import settings
+from django.db import transaction
+
+from .cache import get_generations
+
+
+def fold(text):
+    """'Cartão de Visita' -> 'cartao de visita' (sem acento, minúsculo)."""
+    normalized = unicodedata.normalize('NFKD', text or '')
+    return ''.join(char for char in normalized if not unicodedata.combining(char)).lower()
+
+
+def _image_url(path):
+    return f"{settings.MEDIA_URL}{path}" if path else None
+
+
+class SuggestionIndex:
+    """
+    Índice de prefixos em memória para o autocomplete da busca.
+
+    Guarda uma lista ordenada de (palavra, tipo, id) com cada palavra dos nomes de
+    produtos, kits e categorias; a busca é um bisect + varredura só da faixa do prefixo.
+    Os signals atualizam o índice do próprio processo item a item; os outros workers
+    percebem pela geração do cache (products/cache.py) e reconstroem.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._words = []    # [(palavra, tipo, id)] ordenada
+        self._entries = {}  # (tipo, id) -> payload da sugestão
+        self._folded = {}   # (tipo, id) -> (nome sem acento, palavras)
+        self._generations = None
+
+    # --- Montagem -------------------------------------------------------------
+
+    @staticmethod
+    def _sources():
+        from .models import Category, Kit, Product
+        return {'product': Product, 'kit': Kit, 'category': Category}
+
+    @classmethod
+    def _load(cls, kind, queryset):
+        if kind == 'category':
+            rows = queryset.values('id', 'slug', 'name', 'icon')
+            return [{'type': kind, 'id': r['id'], 'slug': r['slug'], 'name': r['name'], 'image': _image_url(r['icon'])} for r in rows]
+        rows = queryset.filter(is_active=True).values('id', 'slug', 'name', 'image')
+        return [{'type': kind, 'id': r['id'], 'slug': r['slug'], 'name': r['name'], 'image': _image_url(r['image'])} for r in rows]
+
+    def rebuild(self):
+        sources = self._sources()
+        generations = get_generations(sources.values())
+        entries, folded = {}, {}
+        for kind, model in sources.items():
+            for entry in self._load(kind, model.objects.all()):
+                entries[(kind, entry['id'])] = entry
+                folded[(kind, entry['id'])] = self._fold_entry(entry)
+        words = sorted((word, kind, pk) for (kind, pk), (_, name_words) in folded.items() for word in set(name_words))
+        with self._lock:
+            self._words, self._entries, self._folded, self._generations = words, entries, folded, generations
+
+    @staticmethod
+    def _fold_entry(entry):
+        name = fold(entry['name'])
+        return name, tuple(name.split())
+
+    def _ensure_fresh(self):
+        generations = get_generations(self._sources().values())
+        if generations != self._generations:
+            self.rebuild()
+
+    # --- Atualização incremental (signals) -------------------------------------
+
+    def update(self, kind, pk):
+        """
+        Reindexa um único item depois de salvo/apagado neste processo — no commit, como o
+        bump_generation: dentro de uma transação a geração ainda não subiu (e o dado pode
+        nem ser gravado). O bump do mesmo save foi registrado antes, então já rodou.
+        """
+        transaction.on_commit(lambda: self._update_now(kind, pk))
+
+    def _update_now(self, kind, pk):
+        with self._lock:
+            if self._generations is None:
+                return  # ainda não foi montado: a primeira busca monta tudo
+            model = self._sources()[kind]
+            self._remove(kind, pk)
+            for entry in self._load(kind, model.objects.filter(pk=pk)):
+                self._entries[(kind, pk)] = entry
+                self._folded[(kind, pk)] = self._fold_entry(entry)
+                for word in set(self._folded[(kind, pk)][1]):
+                    insort(self._words, (word, kind, pk))
+            self._accept_own_bump(kind)
+
+    def _remove(self, kind, pk):
+        self._entries.pop((kind, pk), None)
+        _, name_words = self._folded.pop((kind, pk), ('', ()))
+        if name_words:
+            for word in set(name_words):
+                index = bisect_left(self._words, (word, kind, pk))
+                if index < len(self._words) and self._words[index] == (word, kind, pk):
+                    del self._words[index]
+
+    def _accept_own_bump(self, kind):
+        # O save que nos chamou já subiu a geração em 1; se só ele mudou, o índice
+        # continua em dia e não precisa reconstruir na próxima busca
+        position = list(self._sources()).index(kind)
+        current = get_generations(self._sources().values())
+        expected = list(self._generations)
+        expected[position] += 1
+        self._generations = current if current == expected else None
+
+    # --- Consulta ----------------------------------------------------------------
+
+    def _prefix_range(self, prefix):
+        return bisect_left(self._words, (prefix,)), bisect_left(self._words, (prefix + '\uffff',))
+
+    def search(self, text, limit=8):
+        terms = fold(text).split()
+        if not terms:
+            return []
+        if self._generations is None:
+            self.rebuild()
+        else:
+            self._ensure_fresh()
+
+        folded_text = ' '.join(terms)
+        matches = {}
+        with self._lock:
+            # Varre só a faixa do termo mais seletivo (menos palavras com aquele prefixo)
+            ranges = {term: self._prefix_range(term) for term in terms}
+            chosen = min(ranges, key=lambda term: ranges[term][1] - ranges[term][0])
+            others = [term for term in terms if term != chosen]
+            start, end = ranges[chosen]
+            for _, kind, pk in self._words[start:end]:
+                key = (kind, pk)
+                name, name_words = self._folded[key]
+                if key not in matches and all(any(word.startswith(term) for word in name_words) for term in others):
+                    # Nome que começa com o texto digitado vem primeiro, depois os mais curtos
+                    matches[key] = (not name.startswith(folded_text), len(name), name)
+            ranked = heapq.nsmallest(limit, matches, key=matches.get)
+            return [self._entries[key] for key in ranked]
+
+
+suggestion_index = SuggestionIndex()
@@ -1,3 +1,844 @@
-from django.test import TestCase
+import json
+import shutil
+import tempfile
+from datetime import timedelta
+from decimal import Decimal
+from io import BytesIO
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib import admin
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection, transaction
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from PIL import Image
+from rest_framework.test import APIClient
+
+from . import campaigns
+from .cache import bump_generation, get_generations
+from .images import FORMATS, _process, generate_derivatives, srcset
+from .media import file_hash
+from .models import Category, CompanyConfig, Coupon, ExitPopupConfig, Finishing, Kit, PriceCampaign, Product, ProductVariant
+from .slugs import allocate_slug, reserve_slugs
+from .suggest import suggestion_index
+from .view_counter import ViewCounter
+
+
+def clear_caches():
+    # Páginas e também os contadores de geração, que ficam num cache à parte
+    for store in caches.all():
+        store.clear()
+
+
+def create_product(category, name, **kwargs):
+    product = Product.objects.create(
+        category=category, name=name, image='products/teste.jpg', production_time='2 dias úteis', **kwargs
+    )
+    ProductVariant.objects.create(product=product, name='100 unidades', price='50.00')
+    ProductVariant.objects.create(product=product, name='500 unidades', price='120.00')
+    return product
+
+
+class ProductQueryCountTests(TestCase):
+    def setUp(self):
+        clear_caches()
+        self.client = APIClient()
+        self.category = Category.objects.create(name='Cartões', slug='cartoes')
+        self.finishing = Finishing.objects.create(name='Frente e Verso')
+
+    def populate(self, total, upsells_per_product):
+        # O cache só é invalidado no commit (bump_generation usa on_commit); as imagens
+        # de teste não existem, então o worker de derivadas fica de fora
+        with self.captureOnCommitCallbacks(execute=True), mock.patch('products.signals.schedule_derivatives'):
+            products = [create_product(self.category, f'Produto {i}') for i in range(total)]
+            for product in products:
+                product.finishings.add(self.finishing)
+                product.upsell_products.set([p for p in products if p != product][:upsells_per_product])
+        return products
+
+    def count_list_queries(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get('/api/products/')
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries)
+
+    def test_list_query_count_is_constant(self):
+        self.populate(total=2, upsells_per_product=1)
+        small_page = self.count_list_queries()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Product.objects.all().delete()
+        self.populate(total=12, upsells_per_product=8)
+        full_page = self.count_list_queries()
+
+        self.assertEqual(small_page, full_page)
+        # COUNT + produtos/categoria + variações + acabamentos + upsells
+        self.assertEqual(full_page, 5)
+
+    def test_upsell_starting_price_is_first_variant(self):
+        main, upsell = self.populate(total=2, upsells_per_product=1)
+        response = self.client.get('/api/products/', {'slug': main.slug})
+        upsells = response.json()['results'][0]['upsell_products']
+        self.assertEqual(upsells[0]['id'], upsell.id)
+        self.assertEqual(float(upsells[0]['starting_price']), 50.0)
+
+
+class ViewCounterTests(TestCase):
+    def test_views_are_buffered_and_flushed_in_batch(self):
+        category = Category.objects.create(name='Cartões', slug='cartoes')
+        first, second = create_product(category, 'Produto A'), create_product(category, 'Produto B')
+        counter = ViewCounter(flush_interval=3600, flush_threshold=1000)
+        counter._ensure_flusher = lambda: None
+
+        for product_id in (first.pk, first.pk, second.pk):
+            counter.record(product_id)
+
+        self.assertEqual(counter.pending(), 3)
+        self.assertEqual(counter.pending(first.pk), 2)
+        first.refresh_from_db()
+        self.assertEqual(first.views_count, 0)
+
+        self.assertEqual(counter.flush(), 3)
+        self.assertEqual(counter.pending(), 0)
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual((first.views_count, second.views_count), (2, 1))
+
+    def test_failed_inline_flush_does_not_break_the_request(self):
+        counter = ViewCounter(flush_interval=0, max_buffer=2)
+        with mock.patch('analytics.rollup.record_view_events', side_effect=RuntimeError('banco fora')), \
+                self.assertLogs('products.view_counter', 'ERROR'):
+            for product_id in (1, 2, 3):
+                counter.record(product_id)
+        self.assertLessEqual(len(counter._pending), 2)
+
+    def test_views_of_deleted_product_are_dropped(self):
+        category = Category.objects.create(name='Cartões', slug='cartoes')
+        first, second = create_product(category, 'Produto A'), create_product(category, 'Produto B')
+        counter = ViewCounter(flush_interval=3600, flush_threshold=1000)
+        counter._ensure_flusher = lambda: None
+        counter.record(first.pk)
+        counter.record(second.pk, amount=2)
+        first.delete()
+
+        self.assertEqual(counter.flush(), 2)
+        self.assertEqual(counter.pending(), 0)
+        second.refresh_from_db()
+        self.assertEqual(second.views_count, 2)
+
+
+class CatalogCacheTests(TestCase):
+    def setUp(self):
+        clear_caches()
+        self.client = APIClient()
+        self.product = create_product(Category.objects.create(name='Cartões', slug='cartoes'), 'Cartão')
+
+    def test_list_is_cached_until_a_model_is_saved(self):
+        self.client.get('/api/products/')
+        # A resposta (e o ETag) sai do cache
+        with self.assertNumQueries(0):
+            cached = self.client.get('/api/products/')
+            self.assertEqual(self.client.get('/api/products/', HTTP_IF_NONE_MATCH=cached['ETag']).status_code, 304)
+
+        variant = self.product.variants.first()
+        variant.price = '42.00'
+        with self.captureOnCommitCallbacks(execute=True):
+            variant.save()
+        response = self.client.get('/api/products/')
+        self.assertEqual(response.json()['results'][0]['variants'][0]['price'], '42.00')
+
+
+    def test_generation_is_bumped_only_after_commit(self):
+        before = get_generations([ProductVariant])
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            self.product.variants.update(price='1.00')
+            bump_generation(ProductVariant)
+            self.assertEqual(get_generations([ProductVariant]), before)
+        callbacks[0]()
+        self.assertNotEqual(get_generations([ProductVariant]), before)
+
+    def test_culling_cached_pages_keeps_generations(self):
+        before = get_generations([ProductVariant])
+        caches['default'].clear()
+        self.assertEqual(get_generations([ProductVariant]), before)
+
+
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        clear_caches()
+        self.client = APIClient()
+        self.product = create_product(Category.objects.create(name='Cartões', slug='cartoes'), 'Cartão')
+
+    def test_list_answers_304_until_something_changes(self):
+        etag = self.client.get('/api/products/')['ETag']
+        response = self.client.get('/api/products/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.variants.first().delete()
+        response = self.client.get('/api/products/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_view_counts_change_the_etag_once_the_page_expires(self):
+        # views_count é gravado com F() (sem subir geração): o ETag vem do corpo
+        etag = self.client.get('/api/products/', {'ordering': '-views_count'})['ETag']
+        Product.objects.filter(pk=self.product.pk).update(views_count=10)
+        clear_caches()
+        response = self.client.get('/api/products/', {'ordering': '-views_count'}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['results'][0]['views_count'], 10)
+
+    def test_if_modified_since(self):
+        last_modified = self.client.get('/api/categories/')['Last-Modified']
+        response = self.client.get('/api/categories/', HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, 304)
+
+
+class PriceRangeTests(TestCase):
+    def setUp(self):
+        clear_caches()
+        self.category = Category.objects.create(name='Cartões', slug='cartoes')
+
+    def test_price_range_follows_variants_and_sale(self):
+        product = create_product(self.category, 'Cartão')
+        product.refresh_from_db()
+        self.assertEqual((str(product.min_price), str(product.max_price)), ('50.00', '120.00'))
+
+        product.is_on_sale, product.discount_percent = True, 15
+        product.save()
+        product.variants.filter(price=50).delete()
+        product.refresh_from_db()
+        self.assertEqual((str(product.min_price), str(product.sale_price)), ('120.00', '102.00'))
+
+    def test_filter_uses_price_columns(self):
+        cheap = create_product(self.category, 'Barato')
+        ProductVariant.objects.filter(product=cheap).update(price=10)
+        Product.objects.filter(pk=cheap.pk).refresh_price_range()
+        create_product(self.category, 'Caro')
+
+        response = self.client.get('/api/products/', {'max_price': 20})
+        self.assertEqual([p['id'] for p in response.json()['results']], [cheap.id])
+
+    def test_range_uses_one_effective_price(self):
+        # Variações de 50 e 120: nenhuma cai entre 60 e 100
+        create_product(self.category, 'Dos dois lados')
+        on_sale = create_product(self.category, 'Promoção', is_on_sale=True, discount_percent=50)
+
+        response = self.client.get('/api/products/', {'min_price': 60, 'max_price': 100})
+        self.assertEqual(response.json()['results'], [])
+        # 50 com 50% de desconto = 25
+        response = self.client.get('/api/products/', {'min_price': 20, 'max_price': 30})
+        self.assertEqual([p['id'] for p in response.json()['results']], [on_sale.id])
+
+
+class VariantSyncTests(TestCase):
+    def test_update_only_touches_changed_variants(self):
+        product = create_product(Category.objects.create(name='Cartões', slug='cartoes'), 'Cartão')
+        small, large = product.variants.order_by('pk')
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user('admin', password='x'))
+
+        variants = [
+            {'id': small.pk, 'name': '100 un', 'price': '45.00'},
+            {'id': large.pk, 'name': large.name, 'price': str(large.price)},
+            {'name': '1000 un', 'price': '200.00'},
+        ]
+        response = client.patch(f'/api/products/{product.pk}/', {'variants_json': json.dumps(variants)}, format='multipart')
+        self.assertEqual(response.status_code, 200)
+        rows = list(product.variants.order_by('pk').values_list('id', 'name', 'price'))
+        self.assertEqual([pk for pk, _, _ in rows[:2]], [small.pk, large.pk])
+        self.assertEqual([(name, price) for _, name, price in rows], [
+            ('100 un', Decimal('45.00')), (large.name, large.price), ('1000 un', Decimal('200.00')),
+        ])
+        self.assertEqual(Product.objects.get(pk=product.pk).min_price, Decimal('45.00'))
+
+        for price in ('abc', 'NaN', 'Infinity'):
+            variants_json = json.dumps([{'name': 'x', 'price': price}])
+            response = client.patch(f'/api/products/{product.pk}/', {'variants_json': variants_json}, format='multipart')
+            self.assertEqual(response.status_code, 400)
+        self.assertEqual(product.variants.count(), 3)
+
+
+class PriceCampaignTests(TestCase):
+    def setUp(self):
+        clear_caches()
+        self.category = Category.objects.create(name='Cartões', slug='cartoes')
+        self.products = [create_product(self.category, f'Cartão {i}') for i in range(3)]
+        self.other = create_product(Category.objects.create(name='Lonas', slug='lonas'), 'Lona')
+
+    def test_reprice_applies_in_bulk_and_rolls_back(self):
+        campaign = PriceCampaign.objects.create(name='Papel +10%', kind='reprice', value=10)
+        campaign.categories.add(self.category)
+        self.assertEqual(campaigns.preview(campaign)['variants'], 6)
+
+        with CaptureQueriesContext(connection) as ctx:
+            campaigns.apply_campaign(campaign)
+        self.assertLess(len(ctx), 12)  # não depende de quantos produtos/variações
+
+        first = self.products[0]
+        self.assertEqual(sorted(first.variants.values_list('price', flat=True)), [Decimal('55.00'), Decimal('132.00')])
+        self.assertEqual(Product.objects.get(pk=first.pk).min_price, Decimal('55.00'))
+        self.assertEqual(Product.objects.get(pk=self.other.pk).min_price, Decimal('50.00'))
+
+        # Preço editado à mão depois da campanha não é sobrescrito no desfazer
+        edited = self.products[1].variants.get(price=55)
+        ProductVariant.objects.filter(pk=edited.pk).update(price=60)
+        campaigns.rollback_campaign(campaign)
+        self.assertEqual(sorted(first.variants.values_list('price', flat=True)), [Decimal('50.00'), Decimal('120.00')])
+        self.assertEqual(ProductVariant.objects.get(pk=edited.pk).price, Decimal('60.00'))
+
+    def test_scheduled_sale_starts_and_ends(self):
+        now = timezone.now()
+        campaign = PriceCampaign.objects.create(
+            name='Black Friday', kind='sale', discount_percent=20, search='Lona',
+            starts_at=now - timedelta(minutes=1), ends_at=now + timedelta(hours=1),
+        )
+        self.assertEqual(campaigns.run_due_campaigns(now), (1, 0))
+        lona = Product.objects.get(pk=self.other.pk)
+        self.assertEqual((lona.is_on_sale, lona.sale_price), (True, Decimal('40.00')))
+        self.assertFalse(Product.objects.get(pk=self.products[0].pk).is_on_sale)
+
+        self.assertEqual(campaigns.run_due_campaigns(now + timedelta(hours=2)), (0, 1))
+        lona.refresh_from_db()
+        self.assertEqual((lona.is_on_sale, lona.discount_percent, lona.sale_price), (False, 0, Decimal('50.00')))
+        campaign.refresh_from_db()
+        self.assertEqual(campaign.status, 'rolled_back')
+
+    def test_admin_locks_applied_campaign_except_name(self):
+        campaign = PriceCampaign.objects.create(name='Papel +10%', kind='reprice', value=10)
+        campaign_admin = admin.site._registry[PriceCampaign]
+        self.assertNotIn('value', campaign_admin.get_readonly_fields(None, campaign))
+
+        campaigns.apply_campaign(campaign)
+        campaign.refresh_from_db()
+        locked = campaign_admin.get_readonly_fields(None, campaign)
+        self.assertTrue({'kind', 'value', 'discount_percent', 'categories', 'starts_at'} <= set(locked))
+        self.assertNotIn('name', locked)
+
+
+class SlugAllocationTests(TestCase):
+    def setUp(self):
+        self.category = Category.objects.create(name='Cartões')
+
+    def test_next_suffix_in_one_query(self):
+        for _ in range(3):
+            create_product(self.category, 'Cartão')
+        create_product(self.category, 'Cartão de Visita')
+        with self.assertNumQueries(1):
+            self.assertEqual(allocate_slug(Product, 'Cartão'), 'cartao-3')
+        self.assertEqual(reserve_slugs(Product, ['Cartão', 'Panfleto', 'Cartão']), ['cartao-3', 'panfleto', 'cartao-4'])
+        self.assertEqual(self.category.slug, 'cartoes')
+
+    def test_retries_when_another_process_takes_the_slug(self):
+        create_product(self.category, 'Cartão')
+        real_allocate = allocate_slug
+        answers = iter(['cartao', None])  # 1ª tentativa "perde a corrida" para o produto acima
+        with mock.patch('products.slugs.allocate_slug', side_effect=lambda model, text: next(answers) or real_allocate(model, text)):
+            product = create_product(self.category, 'Cartão')
+        self.assertEqual(product.slug, 'cartao-1')
+
+    def test_category_api_without_slug(self):
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user('admin', password='x'))
+        response = client.post('/api/categories/', {'name': 'Cartões'}, format='json')
+        self.assertEqual((response.status_code, response.json()['slug']), (201, 'cartoes-1'))
+
+
+class CouponValidateTests(TestCase):
+    def setUp(self):
+        clear_caches()
+        Coupon.objects.create(code='BemVindo ', discount_percentage=10)
+        Coupon.objects.create(code='VELHO', discount_percentage=50, is_active=False)
+
+    def test_lookup_is_normalized_and_served_from_memory(self):
+        self.assertEqual(self.client.get('/api/coupons/validate/', {'code': 'bemvindo'}).json()['discount_percentage'], 10)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get('/api/coupons/validate/', {'code': ' BEMVINDO'}).status_code, 200)
+            self.assertEqual(self.client.get('/api/coupons/validate/', {'code': 'velho'}).status_code, 404)
+
+    def test_token_bucket_per_ip(self):
+        statuses = [self.client.get('/api/coupons/validate/', {'code': f'X{i}'}).status_code for i in range(11)]
+        self.assertEqual(statuses, [404] * 10 + [429])
+        other_ip = self.client.get('/api/coupons/validate/', {'code': 'X'}, REMOTE_ADDR='10.0.0.2')
+        self.assertEqual(other_ip.status_code, 404)
+
+    def test_forwarded_for_is_ignored_without_a_proxy(self):
+        # NUM_PROXIES=0 (padrão): quem fala direto com o backend não escolhe o próprio IP
+        statuses = [
+            self.client.get('/api/coupons/validate/', {'code': 'X'}, HTTP_X_FORWARDED_FOR=f'1.1.1.{i}').status_code
+            for i in range(11)
+        ]
+        self.assertEqual(statuses[-1], 429)
+
+    @override_settings(REST_FRAMEWORK={**settings.REST_FRAMEWORK, 'NUM_PROXIES': 1})
+    def test_forged_forwarded_for_does_not_reset_the_bucket(self):
+        # Atrás do proxy só o último IP (o que ele anotou) conta; o que o cliente inventa antes é ignorado
+        statuses = [
+            self.client.get('/api/coupons/validate/', {'code': 'X'}, HTTP_X_FORWARDED_FOR=f'1.1.1.{i}, 10.0.0.9').status_code
+            for i in range(11)
+        ]
+        self.assertEqual(statuses[-1], 429)
+
+    def test_admin_rejects_code_that_only_differs_by_case(self):
+        with self.assertRaises(ValidationError):
+            Coupon(code=' bemvindo', discount_percentage=5).full_clean()
+
+
+class SiteSettingsTests(TestCase):
+    def setUp(self):
+        clear_caches()
+
+    def test_combined_payload_served_from_memory_until_saved(self):
+        config = CompanyConfig.objects.create(name='Cloud Design', whatsapp='85999999999', instagram='@cloud')
+        response = self.client.get('/api/site-settings/')
+        self.assertEqual((response.json()['company']['name'], response.json()['exit_popup']), ('Cloud Design', None))
+
+        with self.assertNumQueries(0):
+            cached = self.client.get('/api/site-settings/')
+            self.assertEqual(self.client.get('/api/site-settings/', HTTP_IF_NONE_MATCH=cached['ETag']).status_code, 304)
+
+        config.name = 'Cloud Design Gráfica'
+        with self.captureOnCommitCallbacks(execute=True):
+            config.save()
+        response = self.client.get('/api/site-settings/')
+        self.assertEqual(response.json()['company']['name'], 'Cloud Design Gráfica')
+        self.assertNotEqual(response['ETag'], cached['ETag'])
+
+
+class CategoryCountTests(TestCase):
+    def setUp(self):
+        clear_caches()
+
+    def test_counts_active_products_with_fixed_queries(self):
+        categories = [Category.objects.create(name=f'Categoria {i}') for i in range(5)]
+        create_product(categories[0], 'Cartão')
+        create_product(categories[0], 'Antigo', is_active=False)
+
+        # COUNT da paginação + SELECT com a contagem agrupada
+        with self.assertNumQueries(2):
+            results = self.client.get('/api/categories/').json()['results']
+        self.assertEqual([c['products_count'] for c in results], [1, 0, 0, 0, 0])
+
+
+class KitListTests(TestCase):
+    def setUp(self):
+        clear_caches()
+        category = Category.objects.create(name='Cartões')
+        products = [create_product(category, f'Item {i}') for i in range(3)]
+        for i in range(4):
+            kit = Kit.objects.create(name=f'Kit {i}', price='120.00')
+            kit.products.set(products)
+
+    def test_kits_cost_fixed_queries_and_carry_savings(self):
+        # COUNT + kits + produtos (com o "a partir de" anotado)
+        with self.assertNumQueries(3):
+            results = self.client.get('/api/kits/').json()['results']
+        self.assertEqual(len(results), 4)
+        self.assertEqual(results[0]['savings'], {'items_total': '150.00', 'amount': '30.00', 'percent': 20})
+        self.assertEqual(results[0]['products_details'][0]['starting_price'], 50.0)
+
+
+class CartQuoteTests(TestCase):
+    def setUp(self):
+        clear_caches()
+        category = Category.objects.create(name='Cartões')
+        self.finishing = Finishing.objects.create(name='Verniz')
+        self.card = create_product(category, 'Cartão', is_on_sale=True, discount_percent=10)
+        self.card.finishings.add(self.finishing)
+        self.banner = create_product(category, 'Lona', is_meter_price=True)
+        self.kit = Kit.objects.create(name='Kit', price='80.00')
+        Coupon.objects.create(code='PROMO10', discount_percentage=10)
+
+    def test_prices_whole_cart_with_fixed_queries(self):
+        payload = {'coupon': 'promo10', 'items': [
+            {'variant': self.card.variants.get(name='100 unidades').pk, 'quantity': 2, 'finishings': [self.finishing.pk]},
+            {'variant': self.banner.variants.get(name='100 unidades').pk, 'width': '0.5', 'height': '0.5'},
+            {'kit': self.kit.pk},
+        ]}
+        # variações + acabamentos + kits (cupom vem do índice, carregado uma vez)
+        self.client.post('/api/cart/quote/', payload, content_type='application/json')
+        with self.assertNumQueries(3):
+            data = self.client.post('/api/cart/quote/', payload, content_type='application/json').json()
+
+        self.assertEqual([line['line_total'] for line in data['items']], ['90.00', '25.00', '80.00'])
+        self.assertEqual(data['items'][0]['finishings'], [{'id': self.finishing.pk, 'name': 'Verniz'}])
+        self.assertEqual(data['items'][1]['charged_area'], '0.5')
+        self.assertEqual((data['subtotal'], data['discount'], data['total'], data['pix_total']),
+                         ('195.00', '19.50', '175.50', '166.73'))
+
+    def test_rejects_unknown_items_and_missing_measures(self):
+        response = self.client.post('/api/cart/quote/', {'items': [
+            {'variant': 999999},
+            {'variant': self.banner.variants.first().pk},
+            {'variant': self.card.variants.first().pk, 'finishings': [999999]},
+        ]}, content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(sorted(response.json()['items']), ['0', '1', '2'])
+
+    def test_coupon_guesses_share_the_validate_rate_limit(self):
+        for i in range(10):
+            self.client.get('/api/coupons/validate/', {'code': f'X{i}'})
+        items = [{'kit': self.kit.pk}]
+        guess = self.client.post('/api/cart/quote/', {'items': items, 'coupon': 'PROMO10'}, content_type='application/json')
+        self.assertEqual(guess.status_code, 429)
+        # Sem cupom o orçamento continua liberado
+        plain = self.client.post('/api/cart/quote/', {'items': items}, content_type='application/json')
+        self.assertEqual(plain.status_code, 200)
+
+
+class ProductBatchTests(TestCase):
+    def setUp(self):
+        clear_caches()
+        category = Category.objects.create(name='Cartões')
+        self.products = [create_product(category, f'Item {i}') for i in range(3)]
+        self.hidden = create_product(category, 'Inativo', is_active=False)
+
+    def test_request_order_without_view_side_effects(self):
+        first, second, third = self.products
+        # produtos (com categoria) + variações + acabamentos + upsells
+        with self.assertNumQueries(4):
+            response = self.client.get('/api/products/batch/', {
+                'ids': f'{third.pk},{first.pk},{self.hidden.pk},{third.pk}', 'slugs': f'{second.slug},sumiu',
+            })
+        data = response.json()
+        self.assertEqual([p['id'] for p in data['results']], [third.pk, first.pk, second.pk])
+        self.assertEqual(data['missing'], [self.hidden.pk, 'sumiu'])
+        self.assertEqual(Product.objects.filter(views_count__gt=0).count(), 0)
+
+    def test_limit_and_bad_ids(self):
+        self.assertEqual(self.client.get('/api/products/batch/', {'ids': '1,x'}).status_code, 400)
+        ids = ','.join(str(i) for i in range(1, 60))
+        self.assertEqual(self.client.get('/api/products/batch/', {'ids': ids}).status_code, 400)
+
+
+@skipUnless(connection.vendor == 'postgresql', "Busca full-text só existe no Postgres")
+class FullTextSearchTests(TestCase):
+    def setUp(self):
+        clear_caches()
+        self.category = Category.objects.create(name='Cartões', slug='cartoes')
+
+    def search(self, term):
+        return [p['name'] for p in self.client.get('/api/products/', {'search': term}).json()['results']]
+
+    def test_name_ranks_above_description(self):
+        create_product(self.category, 'Panfleto', description='Combina com o cartão de visita')
+        create_product(self.category, 'Cartão de Visita')
+        self.assertEqual(self.search('cartão'), ['Cartão de Visita', 'Panfleto'])
+
+    def test_accents_and_prefixes_are_ignored(self):
+        create_product(self.category, 'Cartão de Visita')
+        self.assertEqual(self.search('cartao'), ['Cartão de Visita'])
+        self.assertEqual(self.search('CART visi'), ['Cartão de Visita'])
+
+    def test_trigram_fallback_catches_typos(self):
+        create_product(self.category, 'Adesivo Personalizado')
+        self.assertEqual(self.search('adesvo'), ['Adesivo Personalizado'])
+
+    def test_vector_is_refreshed_on_save(self):
+        product = create_product(self.category, 'Banner')
+        product.name = 'Lona Fosca'
+        product.save()
+        self.assertEqual(self.search('fosca'), ['Lona Fosca'])
+        self.assertEqual(self.search('banner'), [])
+
+
+class SuggestTests(TestCase):
+    def setUp(self):
+        clear_caches()
+        # Os saves aqui rodam os on_commit: o worker de imagens fica de fora
+        patcher = mock.patch('products.signals.schedule_derivatives')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client = APIClient()
+        self.category = Category.objects.create(name='Cartões', slug='cartoes')
+        create_product(self.category, 'Cartão de Visita')
+        create_product(self.category, 'Panfleto')
+
+    def test_suggest_matches_accent_folded_prefixes(self):
+        names = [item['name'] for item in self.client.get('/api/products/suggest/', {'q': 'cartao vi'}).json()]
+        self.assertEqual(names, ['Cartão de Visita'])
+
+        names = [item['name'] for item in self.client.get('/api/products/suggest/', {'q': 'CART'}).json()]
+        self.assertEqual(names, ['Cartões', 'Cartão de Visita'])
+
+    def test_index_follows_saves(self):
+        self.client.get('/api/products/suggest/', {'q': 'pan'})
+        product = Product.objects.get(name='Panfleto')
+        product.name = 'Folder'
+        with self.captureOnCommitCallbacks(execute=True):
+            product.save()
+        self.assertEqual(self.client.get('/api/products/suggest/', {'q': 'pan'}).json(), [])
+        self.assertEqual(self.client.get('/api/products/suggest/', {'q': 'fold'}).json()[0]['id'], product.id)
+
+    def test_save_inside_atomic_updates_without_rebuilding(self):
+        self.client.get('/api/products/suggest/', {'q': 'pan'})
+        product = Product.objects.get(name='Panfleto')
+        with self.captureOnCommitCallbacks(execute=True), transaction.atomic():
+            product.name = 'Folder'
+            product.save()
+            Category.objects.create(name='Lonas', slug='lonas')
+        with mock.patch.object(suggestion_index, 'rebuild') as rebuild:
+            names = [item['name'] for item in self.client.get('/api/products/suggest/', {'q': 'fold'}).json()]
+            self.assertEqual(self.client.get('/api/products/suggest/', {'q': 'lon'}).json()[0]['name'], 'Lonas')
+        rebuild.assert_not_called()
+        self.assertEqual(names, ['Folder'])
+
+
+class KeysetPaginationTests(TestCase):
+    def setUp(self):
+        clear_caches()
+        self.client = APIClient()
+        category = Category.objects.create(name='Cartões', slug='cartoes')
+        self.products = [create_product(category, f'Produto {i}') for i in range(15)]
+        for views, product in enumerate(self.products):
+            Product.objects.filter(pk=product.pk).update(views_count=views % 3)
+
+    def walk(self, params, url='/api/products/'):
+        ids, response = [], self.client.get(url, params).json()
+        while True:
+            self.assertNotIn('count', response)
+            ids += [p['id'] for p in response['results']]
+            self.assertEqual(len(ids), len(set(ids)), 'cursor repetiu itens')
+            if not response['next']:
+                return ids
+            response = self.client.get(response['next']).json()
+
+    def test_cursor_walks_every_product_once(self):
+        self.assertEqual(self.walk({'cursor': ''}), sorted((p.id for p in self.products), reverse=True))
+
+        ids = self.walk({'cursor': '', 'ordering': 'views_count'})
+        expected = sorted(self.products, key=lambda p: (Product.objects.get(pk=p.pk).views_count, p.id))
+        self.assertEqual(ids, [p.id for p in expected])
+
+    def test_created_at_cursor_keeps_microseconds(self):
+        # Kits criados no mesmo milissegundo: o cursor não pode repetir nem pular nenhum
+        moment = timezone.now().replace(microsecond=123000)
+        kits = [Kit.objects.create(name=f'Kit {i}', price='10.00') for i in range(30)]
+        for i, kit in enumerate(kits):
+            Kit.objects.filter(pk=kit.pk).update(created_at=moment + timedelta(microseconds=(i * 7) % 30))
+        by_date = sorted(Kit.objects.all(), key=lambda kit: (kit.created_at, kit.pk))
+
+        ids = self.walk({'cursor': '', 'ordering': 'created_at'}, '/api/kits/')
+        self.assertEqual(ids, [kit.pk for kit in by_date])
+        ids = self.walk({'cursor': '', 'ordering': '-created_at'}, '/api/kits/')
+        self.assertEqual(ids, [kit.pk for kit in reversed(by_date)])
+
+    def test_invalid_cursor(self):
+        self.assertEqual(self.client.get('/api/products/', {'cursor': 'lixo'}).status_code, 404)
+
+
+class SparseFieldsTests(TestCase):
+    def setUp(self):
+        clear_caches()
+        self.client = APIClient()
+        create_product(Category.objects.create(name='Cartões', slug='cartoes'), 'Cartão')
+
+    def test_fields_and_compact_view(self):
+        item = self.client.get('/api/products/', {'fields': 'id,name'}).json()['results'][0]
+        self.assertEqual(set(item), {'id', 'name'})
+
+        item = self.client.get('/api/products/', {'view': 'compact'}).json()['results'][0]
+        self.assertNotIn('variants', item)
+        self.assertEqual(str(item['sale_price']), '50.00')
+
+        item = self.client.get('/api/products/', {'view': 'compact', 'expand': 'variants'}).json()['results'][0]
+        self.assertEqual(len(item['variants']), 2)
+
+    def test_compact_view_skips_prefetches(self):
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get('/api/products/', {'view': 'compact'})
+        # COUNT + produtos/categoria
+        self.assertEqual(len(ctx.captured_queries), 2)
+
+
+class FeedTests(TestCase):
+    def setUp(self):
+        clear_caches()
+        self.client = APIClient()
+        category = Category.objects.create(name='Cartões & Cia', slug='cartoes')
+        create_product(category, 'Cartão <Premium>', is_on_sale=True, discount_percent=10)
+
+    def test_feed_streams_every_product_with_sale_price(self):
+        response = self.client.get('/api/feed.xml')
+        body = b''.join(response.streaming_content).decode()
+        self.assertIn('<g:title>Cartão &lt;Premium&gt;</g:title>', body)
+        self.assertIn('<g:price>50.00 BRL</g:price>', body)
+        self.assertIn('<g:sale_price>45.00 BRL</g:sale_price>', body)
+
+        response = self.client.get('/api/feed.xml', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_sitemap(self):
+        body = b''.join(self.client.get('/api/sitemap.xml').streaming_content).decode()
+        self.assertIn('/produto/cartao-premium</loc>', body)
+        self.assertIn('?category__slug=cartoes</loc>', body)
+
+    def test_xml_accept_headers_are_served(self):
+        for url in ('/api/feed.xml', '/api/sitemap.xml'):
+            for accept in ('application/xml', 'text/xml', 'text/html'):
+                response = self.client.get(url, HTTP_ACCEPT=accept)
+                self.assertEqual(response.status_code, 200, (url, accept))
+                self.assertEqual(response['Content-Type'], 'application/xml; charset=utf-8')
+
+
+class ImageDerivativeTests(TestCase):
+    def test_derivatives_are_generated_next_to_the_original(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        buffer = BytesIO()
+        Image.new('RGBA', (900, 600), (255, 0, 0, 128)).save(buffer, 'PNG')
+
+        with override_settings(MEDIA_ROOT=media_root), self.captureOnCommitCallbacks(execute=False):
+            product = Product.objects.create(
+                category=Category.objects.create(name='Cartões', slug='cartoes'), name='Cartão',
+                image=SimpleUploadedFile('foto.png', buffer.getvalue()), production_time='1 dia',
+            )
+            self.assertIsNone(srcset(product))
+            product.image_derivatives = generate_derivatives(product.image)
+            with self.assertNumQueries(0), mock.patch.object(product.image.storage, 'exists') as exists:
+                sources = srcset(product)
+            exists.assert_not_called()
+
+            # Regerar com outro resultado muda o nome (servido como imutável) e apaga o antigo
+            with mock.patch.dict('products.images.FORMATS', {
+                'webp': ('WEBP', {'quality': 50, 'method': 4}), 'jpeg': FORMATS['jpeg'],
+            }):
+                regenerated = generate_derivatives(product.image, previous=product.image_derivatives)
+            old_name, new_name = product.image_derivatives['webp'][0][1], regenerated['webp'][0][1]
+            self.assertNotEqual(old_name, new_name)
+            self.assertFalse(product.image.storage.exists(old_name))
+            self.assertEqual(product.image_derivatives['jpeg'], regenerated['jpeg'])
+
+        self.assertRegex(sources['webp'], r'^/products/foto__w320\.[0-9a-f]{8}\.webp 320w, /products/foto__w640\.[0-9a-f]{8}\.webp 640w$')
+        self.assertTrue(sources['jpeg'].startswith('/products/foto__w320.'))
+
+    def test_worker_stores_dimensions_and_placeholder(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        buffer = BytesIO()
+        Image.new('RGB', (900, 600), 'blue').save(buffer, 'JPEG')
+
+        with override_settings(MEDIA_ROOT=media_root), self.captureOnCommitCallbacks(execute=False):
+            product = Product.objects.create(
+                category=Category.objects.create(name='Cartões', slug='cartoes'), name='Cartão',
+                image=SimpleUploadedFile('foto.jpg', buffer.getvalue()), production_time='1 dia',
+            )
+            _process(Product, product.pk, ['image'])
+            # A versão da URL vem do que o worker gravou: serializar não lê o arquivo
+            with mock.patch('products.media.file_hash') as hashed:
+                data = self.client.get(f'/api/products/{product.pk}/').json()
+            hashed.assert_not_called()
+
+        self.assertEqual((data['image_width'], data['image_height']), (900, 600))
+        self.assertIn('640w', data['image_srcset']['webp'])
+        self.assertEqual(data['image'], f"/{product.image.name}?v={file_hash(BytesIO(buffer.getvalue()))}")
+        self.assertTrue(data['image_placeholder'].startswith('data:image/webp;base64,'))
+        self.assertLess(len(data['image_placeholder']), 400)
+
+    def test_category_icon_and_popup_carry_dimensions(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        buffer = BytesIO()
+        Image.new('RGB', (64, 48), 'green').save(buffer, 'PNG')
+
+        with override_settings(MEDIA_ROOT=media_root), self.captureOnCommitCallbacks(execute=False):
+            category = Category.objects.create(name='Cartões', slug='cartoes', icon=SimpleUploadedFile('icone.png', buffer.getvalue()))
+            popup = ExitPopupConfig.objects.create(name='Saída', is_active=True, image=SimpleUploadedFile('popup.png', buffer.getvalue()))
+            _process(Category, category.pk, ['icon'])
+            _process(ExitPopupConfig, popup.pk, ['image'])
+            clear_caches()
+            icon = self.client.get('/api/categories/').json()['results'][0]
+            popup_data = self.client.get('/api/site-settings/').json()['exit_popup']
+
+        self.assertEqual((icon['icon_width'], icon['icon_height']), (64, 48))
+        self.assertTrue(icon['icon_placeholder'].startswith('data:image/webp;base64,'))
+        self.assertIn('?v=', icon['icon'])
+        self.assertEqual((popup_data['image_width'], popup_data['image_height']), (64, 48))
+        self.assertTrue(popup_data['image_placeholder'])
+
+
+class MediaServingTests(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        with open(f'{self.media_root}/banner.jpg', 'wb') as f:
+            f.write(bytes(range(256)) * 4)
+
+    def test_etag_range_and_immutable_urls(self):
+        with override_settings(MEDIA_ROOT=self.media_root):
+            with open(f'{self.media_root}/banner.jpg', 'rb') as f:
+                version = file_hash(f)
+            response = self.client.get('/media/banner.jpg', {'v': version})
+            self.assertEqual(response['Cache-Control'], 'public, max-age=31536000, immutable')
+            self.assertEqual(len(b''.join(response.streaming_content)), 1024)
+            # Versão que não bate com o conteúdo não fica presa no cache por um ano
+            response = self.client.get('/media/banner.jpg', {'v': 'abc123'})
+            self.assertEqual(response['Cache-Control'], 'public, max-age=3600')
+
+            response = self.client.get('/media/banner.jpg', HTTP_IF_NONE_MATCH=response['ETag'])
+            self.assertEqual(response.status_code, 304)
+
+            response = self.client.get('/media/banner.jpg', HTTP_RANGE='bytes=10-19')
+            self.assertEqual(response.status_code, 206)
+            self.assertEqual(response['Content-Range'], 'bytes 10-19/1024')
+            self.assertEqual(b''.join(response.streaming_content), bytes(range(10, 20)))
+
+            with override_settings(MEDIA_ACCEL_REDIRECT_PREFIX='/protected-media/'):
+                response = self.client.get('/media/banner.jpg')
+            self.assertEqual(response['X-Accel-Redirect'], '/protected-media/banner.jpg')
+
+            self.assertEqual(self.client.get('/media/../settings.py').status_code, 404)
+
+
+class CatalogImportTests(TestCase):
+    def setUp(self):
+        clear_caches()
+        Category.objects.create(name='Cartões', slug='cartoes')
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user('admin', password='x'))
+
+    def upload(self, content, name='produtos.csv'):
+        return self.client.post('/api/products/import/', {'file': SimpleUploadedFile(name, content.encode())}, format='multipart')
+
+    def test_csv_upsert_keeps_variant_ids(self):
+        csv_content = (
+            'slug,name,category,production_time,variants,finishings,upsells\n'
+            'cartao,Cartão,cartoes,1 dia,100 un=50.00|500 un=120.00,Verniz|Laminação,adesivo\n'
+            'adesivo,Adesivo,cartoes,2 dias,10 un=9.90,,\n'
+            'ruim,Ruim,nao-existe,1 dia,,,\n'
+        )
+        report = self.upload(csv_content).json()
+        self.assertEqual((report['created'], report['variants_created']), (2, 3))
+        self.assertEqual(len(report['errors']), 1)
+
+        product = Product.objects.get(slug='cartao')
+        self.assertEqual((product.min_price, product.max_price), (Decimal('50.00'), Decimal('120.00')))
+        self.assertEqual(set(product.finishings.values_list('name', flat=True)), {'Verniz', 'Laminação'})
+        self.assertEqual(list(product.upsell_products.values_list('slug', flat=True)), ['adesivo'])
+        variant_ids = set(product.variants.values_list('id', flat=True))
+
+        report = self.upload('{"slug": "cartao", "variants": [{"name": "100 un", "price": "45.00"}, {"name": "500 un", "price": "120.00"}]}\n', 'p.jsonl').json()
+        self.assertEqual((report['updated'], report['variants_updated'], report['variants_deleted']), (1, 1, 0))
+        self.assertEqual(set(product.variants.values_list('id', flat=True)), variant_ids)
+        self.assertEqual(Product.objects.get(slug='cartao').min_price, Decimal('45.00'))
+
+        exported = b''.join(self.client.get('/api/products/export/', {'file_format': 'jsonl'}).streaming_content)
+        self.assertIn('"100 un", "price": "45.00"', exported.decode())
+
+    def test_non_finite_price_is_a_row_error(self):
+        csv_content = (
+            'slug,name,category,production_time,variants\n'
+            'cartao,Cartão,cartoes,1 dia,100 un=NaN\n'
+            'flyer,Flyer,cartoes,1 dia,100 un=Infinity\n'
+            'adesivo,Adesivo,cartoes,2 dias,10 un=9.90\n'
+        )
+        report = self.upload(csv_content).json()
+        self.assertEqual(report['created'], 1)
+        self.assertEqual([error['line'] for error in report['errors']], [2, 3])
+        self.assertFalse(Product.objects.filter(slug__in=['cartao', 'flyer']).exists())
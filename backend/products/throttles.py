@@ -0,0 +1,51 @@
+from rest_framework.throttling import SimpleRateThrottle
+
+
+class TokenBucketThrottle(SimpleRateThrottle):
+    """
+    Limite por IP em balde de fichas: cabem `N` requisições de rajada e o balde
+    volta a encher na taxa N/período (ex: '10/min' = 10 de uma vez, depois 1 a cada 6s).
+
+    Só usa o cache (um get + um set por requisição): quem passa do limite recebe
+    429 antes da view rodar, sem tocar no banco. A taxa vem de
+    REST_FRAMEWORK['DEFAULT_THROTTLE_RATES'][scope].
+    """
+
+    def get_cache_key(self, request, view):
+        return self.cache_format % {'scope': self.scope, 'ident': self.get_ident(request)}
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+        self.key = self.get_cache_key(request, view)
+        capacity, refill_per_second = self.num_requests, self.num_requests / self.duration
+
+        now = self.timer()
+        tokens, last = self.cache.get(self.key, (capacity, now))
+        tokens = min(capacity, tokens + (now - last) * refill_per_second)
+        allowed = tokens >= 1
+        if allowed:
+            tokens -= 1
+        self.cache.set(self.key, (tokens, now), self.duration)
+        self.wait_seconds = 0 if allowed else (1 - tokens) / refill_per_second
+        return allowed
+
+    def wait(self):
+        return getattr(self, 'wait_seconds', None)
+
+
+class CouponValidateThrottle(TokenBucketThrottle):
+    scope = 'coupon_validate'
+
+
+class CartQuoteCouponThrottle(CouponValidateThrottle):
+    """
+    Mesmo balde do /coupons/validate/: o orçamento do carrinho também resolve cupom, e
+    sem isso viraria uma segunda porta para testar códigos. Carrinho sem cupom não gasta ficha.
+    """
+
+    def allow_request(self, request, view):
+        data = request.data if hasattr(request.data, 'get') else {}
+        if not str(data.get('coupon') or '').strip():
+            return True
+        return super().allow_request(request, view)
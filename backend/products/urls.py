@@ -1,6 +1,9 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import ProductViewSet, CategoryViewSet, BannerViewSet, CompanyConfigViewSet, DashboardStatsView, CouponViewSet, FinishingViewSet, KitViewSet, ExitPopupConfigViewSet
+from .cart import CartQuoteView
+from .feeds import ProductFeedView, SitemapView
+from .site_settings import SiteSettingsView
+from .views import ProductViewSet, CategoryViewSet, BannerViewSet, CompanyConfigViewSet, DashboardStatsView, CouponViewSet, FinishingViewSet, KitViewSet, ExitPopupConfigViewSet, PriceCampaignViewSet
 
 # O router cria rotas como /api/products/ e /api/products/1/ automaticamente
 router = DefaultRouter()
@@ -12,8 +15,13 @@ router.register(r'finishings', FinishingViewSet, basename='finishing')
 router.register(r'coupons', CouponViewSet)
 router.register(r'kits', KitViewSet, basename='kit')
 router.register(r'popup-config', ExitPopupConfigViewSet, basename='popup-config')
+router.register(r'price-campaigns', PriceCampaignViewSet, basename='price-campaign')
 
 urlpatterns = [
     path('', include(router.urls)),
     path('dashboard/stats/', DashboardStatsView.as_view(), name='dashboard-stats'),
+    path('cart/quote/', CartQuoteView.as_view(), name='cart-quote'),
+    path('site-settings/', SiteSettingsView.as_view(), name='site-settings'),
+    path('feed.xml', ProductFeedView.as_view(), name='product-feed'),
+    path('sitemap.xml', SitemapView.as_view(), name='sitemap'),
 ]
\ No newline at end of file
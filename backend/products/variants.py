@@ -0,0 +1,99 @@
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction
+
+from .cache import bump_generation
+from .models import Product, ProductVariant
+
+
+def _clean(item):
+    if not isinstance(item, dict):
+        raise ValueError(f"variação inválida: {item!r}")
+    name = str(item.get('name') or '').strip()
+    if not name:
+        raise ValueError("variação sem nome")
+    try:
+        price = Decimal(str(item.get('price')).strip().replace(',', '.'))
+        # NaN passa pelo quantize e só estoura depois, na comparação
+        if not price.is_finite():
+            raise InvalidOperation
+        price = price.quantize(Decimal('0.01'))
+    except ArithmeticError:
+        raise ValueError(f"preço inválido na variação {name!r}: {item.get('price')!r}")
+    if price < 0:
+        raise ValueError(f"preço negativo na variação {name!r}")
+    try:
+        pk = int(item['id']) if item.get('id') not in (None, '') else None
+    except (TypeError, ValueError):
+        raise ValueError(f"id inválido na variação {name!r}")
+    return pk, name, price
+
+
+def clean_variants(variants):
+    """Valida uma lista de variações vinda do painel/import. Levanta ValueError."""
+    return [_clean(item) for item in variants]
+
+
+def sync_variants(items, refresh_prices=True):
+    """
+    Aplica a lista de variações de cada produto mexendo só no que mudou.
+
+    `items` é [(product_id, [{'id': opcional, 'name': ..., 'price': ...}])]. Cada variação
+    recebida casa com a existente pelo id (se vier e for do produto) ou pelo nome; as que
+    casam são atualizadas só se nome/preço mudaram, as novas entram num bulk_create e as
+    que sobraram são apagadas. Os ids se mantêm (carrinhos continuam apontando certo) e o
+    custo não cresce com a lista: 1 SELECT + um INSERT/UPDATE em lote (o DELETE ainda
+    dispara os signals de cada variação apagada).
+    Usado pelo ProductSerializer, pelo admin e pelo import em lote.
+
+    Levanta ValueError se alguma variação for inválida (antes de gravar qualquer coisa).
+    Retorna {'created': [...], 'updated': [...], 'deleted': [...]} com as instâncias.
+    """
+    cleaned = [(product_id, clean_variants(variants)) for product_id, variants in items]
+    result = {'created': [], 'updated': [], 'deleted': []}
+    if not cleaned:
+        return result
+
+    product_ids = [product_id for product_id, _ in cleaned]
+    with transaction.atomic():
+        current = {}
+        for variant in ProductVariant.objects.filter(product_id__in=product_ids).order_by('pk'):
+            current.setdefault(variant.product_id, {})[variant.pk] = variant
+
+        for product_id, variants in cleaned:
+            existing = current.get(product_id, {})
+            by_name = {}
+            for variant in existing.values():
+                by_name.setdefault(variant.name, variant)
+            # Primeiro os que vieram com id, para o casamento por nome não "roubar" a linha
+            matches = {}
+            for index, (pk, name, price) in enumerate(variants):
+                if pk in existing:
+                    matches[index] = existing.pop(pk)
+            for index, (pk, name, price) in enumerate(variants):
+                if index in matches:
+                    continue
+                variant = by_name.get(name)
+                if variant is not None and variant.pk in existing:
+                    matches[index] = existing.pop(variant.pk)
+
+            for index, (pk, name, price) in enumerate(variants):
+                variant = matches.get(index)
+                if variant is None:
+                    result['created'].append(ProductVariant(product_id=product_id, name=name, price=price))
+                elif (variant.name, variant.price) != (name, price):
+                    variant.name, variant.price = name, price
+                    result['updated'].append(variant)
+            result['deleted'].extend(existing.values())
+
+        if result['deleted']:
+            ProductVariant.objects.filter(pk__in=[variant.pk for variant in result['deleted']]).delete()
+        ProductVariant.objects.bulk_create(result['created'])
+        ProductVariant.objects.bulk_update(result['updated'], ['name', 'price'])
+
+        # bulk_* não dispara os signals: faixa de preço e cache ficam por nossa conta
+        if result['created'] or result['updated'] or result['deleted']:
+            if refresh_prices:
+                Product.objects.filter(pk__in=product_ids).refresh_price_range()
+            bump_generation(ProductVariant)
+    return result
@@ -0,0 +1,138 @@
+import atexit
+import logging
+import threading
+import time
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import F
+
+logger = logging.getLogger(__name__)
+
+
+class ViewCounter:
+    """
+    Contador de visualizações com escrita atrasada (write-behind).
+
+    Cada GET de produto só incrementa um contador em memória; de tempos em tempos
+    (ou quando acumula visualizações demais) o buffer é gravado no banco com um
+    UPDATE atômico por lote (views_count = views_count + N), sem save() da linha inteira,
+    e vira eventos para o rollup de hora/dia do app analytics. Os pares sessão/produto
+    (para as recomendações) seguem o mesmo caminho.
+    """
+
+    def __init__(self, flush_interval=30, flush_threshold=100, max_buffer=10000):
+        self.flush_interval = flush_interval
+        self.flush_threshold = flush_threshold
+        # Com o banco fora do ar o buffer não cresce sem limite (produtos e pares de sessão)
+        self.max_buffer = max_buffer
+        self._pending = Counter()
+        self._sessions = set()
+        self._lock = threading.Lock()
+        self._flusher = None
+
+    def record(self, product_id, amount=1, session=None):
+        with self._lock:
+            self._pending[product_id] += amount
+            if session:
+                self._sessions.add((session, product_id))
+            total = sum(self._pending.values())
+
+        # Intervalo 0 = grava na hora (útil em dev/testes)
+        if self.flush_interval <= 0 or total >= self.flush_threshold:
+            # Está no caminho da requisição: erro no banco não pode virar 500 na vitrine
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Erro ao gravar visualizações (o lote continua no buffer)")
+        else:
+            self._ensure_flusher()
+
+    def pending(self, product_id=None):
+        """Quantas visualizações ainda estão esperando para ir ao banco."""
+        with self._lock:
+            if product_id is not None:
+                return self._pending.get(product_id, 0)
+            return sum(self._pending.values())
+
+    def flush(self):
+        """Grava o buffer no banco. Retorna quantas visualizações foram gravadas."""
+        from analytics.recommendations import record_session_views
+        from analytics.rollup import record_view_events
+        from .models import Product
+
+        with self._lock:
+            batch, self._pending = self._pending, Counter()
+            sessions, self._sessions = self._sessions, set()
+        if not batch:
+            return 0
+
+        try:
+            with transaction.atomic():
+                # Produto apagado com views no buffer: descarta (o evento quebraria a FK
+                # e o lote voltaria pro buffer para sempre). O lock segura o delete até o commit.
+                existing = set(Product.objects.select_for_update().filter(pk__in=list(batch)).values_list('pk', flat=True))
+                batch = Counter({product_id: amount for product_id, amount in batch.items() if product_id in existing})
+                sessions = {(session, product_id) for session, product_id in sessions if product_id in existing}
+
+                # Agrupa por incremento: um único UPDATE para todos os produtos com o mesmo N
+                by_amount = defaultdict(list)
+                for product_id, amount in batch.items():
+                    by_amount[amount].append(product_id)
+                for amount, ids in by_amount.items():
+                    Product.objects.filter(pk__in=ids).update(views_count=F('views_count') + amount)
+                record_view_events(batch)
+                record_session_views(sessions)
+        except Exception:
+            # Devolve pro buffer para tentar de novo no próximo flush
+            with self._lock:
+                self._pending.update(batch)
+                self._sessions.update(sessions)
+                self._trim()
+            raise
+        return sum(batch.values())
+
+    def _trim(self):
+        # Chamado com o lock: mantém só os produtos mais vistos e descarta pares de sessão a mais
+        if len(self._pending) > self.max_buffer:
+            self._pending = Counter(dict(self._pending.most_common(self.max_buffer)))
+        if len(self._sessions) > self.max_buffer:
+            self._sessions = set(list(self._sessions)[:self.max_buffer])
+
+    def _ensure_flusher(self):
+        if self._flusher is not None and self._flusher.is_alive():
+            return
+        with self._lock:
+            if self._flusher is not None and self._flusher.is_alive():
+                return
+            self._flusher = threading.Thread(target=self._run_flusher, name='view-counter-flusher', daemon=True)
+            self._flusher.start()
+
+    def _run_flusher(self):
+        from analytics.rollup import rollup_views
+
+        while True:
+            time.sleep(self.flush_interval)
+            try:
+                self.flush()
+                rollup_views()
+            except Exception:
+                logger.exception("Erro ao gravar visualizações")
+            finally:
+                close_old_connections()
+
+
+view_counter = ViewCounter(
+    flush_interval=getattr(settings, 'VIEW_COUNTER_FLUSH_INTERVAL', 30),
+    flush_threshold=getattr(settings, 'VIEW_COUNTER_FLUSH_THRESHOLD', 100),
+)
+
+
+@atexit.register
+def _flush_on_exit():
+    # Não perde o que estava no buffer quando o worker do gunicorn é reciclado
+    try:
+        view_counter.flush()
+    except Exception:
+        pass
@@ -1,32 +1,56 @@
+from django.db.models import Prefetch, Q
+from django.http import StreamingHttpResponse
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import viewsets, filters, status, permissions
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.parsers import MultiPartParser
 from rest_framework.response import Response
-from django.db.models import Sum
 from rest_framework.views import APIView
 from rest_framework.permissions import IsAuthenticated
-from .models import Category, Product, Banner, CompanyConfig, Coupon, Finishing, Kit, ExitPopupConfig
-from .serializers import CategorySerializer, ProductSerializer, BannerSerializer, CompanyConfigSerializer, CouponSerializer, FinishingSerializer, KitSerializer, ExitPopupConfigSerializer
+from .models import Category, Product, ProductVariant, Banner, CompanyConfig, Coupon, Finishing, Kit, ExitPopupConfig, PriceCampaign
+from .serializers import CategorySerializer, ProductSerializer, ProductCompactSerializer, UpsellProductSerializer, BannerSerializer, CompanyConfigSerializer, CouponSerializer, FinishingSerializer, KitSerializer, ExitPopupConfigSerializer, PriceCampaignSerializer
+from .view_counter import view_counter
+from .cache import CachedResponseMixin
+from .conditional import ConditionalGetMixin
+from .pagination import CatalogPagination
+from .search import FullTextSearchFilter
+from .suggest import suggestion_index
+from .coupons import coupon_index
+from .throttles import CouponValidateThrottle
+from .catalog_io import ProductImporter, detect_format, export_lines, export_products, read_rows
+from . import campaigns
+from analytics import rollup
+from analytics.recommendations import session_key
 
 
-class CategoryViewSet(viewsets.ModelViewSet):
-    queryset = Category.objects.all()
+class CategoryViewSet(ConditionalGetMixin, CachedResponseMixin, viewsets.ModelViewSet):
+    # Contagem de produtos ativos já vem no SELECT (sem um COUNT por categoria)
+    queryset = Category.objects.with_products_count().order_by('id')
     serializer_class = CategorySerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+    cache_models = (Category, Product)
     
     def get_permissions(self):
         if self.action in ['create', 'update', 'partial_update', 'destroy']:
             return [IsAuthenticated()]
         return []
 
-class ProductViewSet(viewsets.ModelViewSet):
+class ProductViewSet(ConditionalGetMixin, CachedResponseMixin, viewsets.ModelViewSet):
     queryset = Product.objects.all().order_by('-id')
     serializer_class = ProductSerializer
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
-    search_fields = ['name', 'description']
-    ordering_fields = ['views_count', 'id']
+    filter_backends = [DjangoFilterBackend, FullTextSearchFilter, filters.OrderingFilter]
+    ordering_fields = ['views_count', 'id', 'min_price', 'sale_price']
+    pagination_class = CatalogPagination
+    keyset_orderings = ['-id', 'id', '-views_count', 'views_count']
     filterset_fields = ['category__slug', 'is_featured']
-    search_fields = ['name', 'description']
+    search_fields = ['name', 'description']  # usado só no fallback sem Postgres
+    cache_models = (Product, ProductVariant, Category, Finishing)
+    # O detalhe conta visualização: fica fora do cache e do 304
+    cache_actions = ('list', 'batch')
+    conditional_actions = ('list',)
+    # Máximo de produtos por chamada no /batch/
+    batch_limit = 50
     
     def get_permissions(self):
         # 1. EXCEÇÃO: Qualquer visitante pode incrementar a visualização (POST)
@@ -34,7 +58,7 @@ class ProductViewSet(viewsets.ModelViewSet):
             return [permissions.AllowAny()]
             
         # 2. BLOQUEIO: Apenas você (Admin) pode Criar, Editar ou Deletar produtos
-        if self.action in ['create', 'update', 'partial_update', 'destroy']:
+        if self.action in ['create', 'update', 'partial_update', 'destroy', 'import_file', 'export']:
             return [permissions.IsAuthenticated()]
             
         # 3. REGRA PADRÃO: Qualquer um pode ver (GET), mas só admin pode o resto
@@ -44,19 +68,108 @@ class ProductViewSet(viewsets.ModelViewSet):
     def increment_view(self, request, pk=None):
         """Endpoint para contar visualização: POST /api/products/{id}/increment_view/"""
         product = self.get_object()
-        product.views_count += 1
-        product.save()
-        return Response({'status': 'visualização computada', 'total': product.views_count})
+        view_counter.record(product.pk, session=session_key(request))
+        total = product.views_count + view_counter.pending(product.pk)
+        return Response({'status': 'visualização computada', 'total': total})
+
+    @action(detail=False, methods=['post'], url_path='import', parser_classes=[MultiPartParser])
+    def import_file(self, request):
+        """Importação em lote pelo painel: POST /api/products/import/ (multipart: file, dry_run)"""
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response({'error': 'Envie o arquivo no campo "file"'}, status=status.HTTP_400_BAD_REQUEST)
+        file_format = request.data.get('file_format') or detect_format(upload.name)
+        importer = ProductImporter(dry_run=request.data.get('dry_run') in ('1', 'true', 'True'))
+        return Response(importer.run(read_rows(upload.file, file_format)))
+
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        """Planilha do catálogo inteiro: GET /api/products/export/?file_format=csv|jsonl (gerada aos poucos)"""
+        file_format = 'jsonl' if request.query_params.get('file_format') == 'jsonl' else 'csv'
+        content_type = 'application/x-ndjson' if file_format == 'jsonl' else 'text/csv'
+        response = StreamingHttpResponse(export_lines(export_products(), file_format), content_type=f'{content_type}; charset=utf-8')
+        response['Content-Disposition'] = f'attachment; filename="produtos.{file_format}"'
+        return response
+
+    @action(detail=False, methods=['get'])
+    def batch(self, request):
+        """
+        Vários produtos numa chamada só, na ordem pedida: GET /api/products/batch/?ids=3,1,2
+        (ou ?slugs=a,b). Para reidratar carrinho/favoritos; não conta visualização.
+        """
+        return self._cached_response(self._batch, request)
+
+    def _batch(self, request):
+        ids = [value for value in request.query_params.get('ids', '').split(',') if value.strip()]
+        slugs = [value.strip() for value in request.query_params.get('slugs', '').split(',') if value.strip()]
+        try:
+            ids = [int(value) for value in ids]
+        except ValueError:
+            raise ValidationError({'ids': 'Use números separados por vírgula'})
+        keys = list(dict.fromkeys([*ids, *slugs]))
+        if not keys:
+            raise ValidationError({'ids': 'Informe ids= ou slugs='})
+        if len(keys) > self.batch_limit:
+            raise ValidationError({'ids': f'No máximo {self.batch_limit} produtos por vez'})
+
+        products = (
+            Product.objects.filter(is_active=True)
+            .filter(Q(pk__in=ids) | Q(slug__in=slugs))
+            .for_serializer(relations=self.get_serializer_relations())
+        )
+        found = {}
+        for product in products:
+            found[product.pk] = found[product.slug] = product
+        ordered = list({found[key].pk: found[key] for key in keys if key in found}.values())
+        return Response({
+            'results': self.get_serializer(ordered, many=True).data,
+            'missing': [key for key in keys if key not in found],
+        })
+
+    @action(detail=True, methods=['get'])
+    def recommendations(self, request, pk=None):
+        """"Quem viu também viu": GET /api/products/{id}/recommendations/ (pré-calculado pelo build_recommendations)"""
+        products = (
+            Product.objects.for_upsell()
+            .filter(is_active=True, recommended_in__product_id=pk)
+            .order_by('recommended_in__rank')
+        )
+        return Response(UpsellProductSerializer(products, many=True).data)
+
+    def get_serializer_class(self):
+        # ?view=compact: payload enxuto para cards e seletores (relações só com ?expand=)
+        if self.request.method == 'GET' and self.request.query_params.get('view') == 'compact':
+            return ProductCompactSerializer
+        return ProductSerializer
+
+    def get_serializer_relations(self):
+        """Relações que a resposta vai realmente serializar (só essas são pré-carregadas)."""
+        serializer = self.get_serializer()
+        return {name for name in ('variants', 'finishings', 'upsell_products') if name in serializer.fields}
+
+    @action(detail=False, methods=['get'])
+    def suggest(self, request):
+        """Autocomplete da busca: GET /api/products/suggest/?q=cart (produtos, kits e categorias)"""
+        try:
+            limit = min(int(request.query_params.get('limit', 8)), 20)
+        except ValueError:
+            limit = 8
+        return Response(suggestion_index.search(request.query_params.get('q', ''), limit=limit))
 
     def retrieve(self, request, *args, **kwargs):
         instance = self.get_object()
-        instance.views_count += 1  # Lógica de visualização
-        instance.save()
+        # Lógica de visualização: vai pro buffer, o banco é atualizado em lote
+        view_counter.record(instance.pk, session=session_key(request))
+        instance.views_count += view_counter.pending(instance.pk)
         serializer = self.get_serializer(instance)
         return Response(serializer.data)
 
     def get_queryset(self):
-        queryset = Product.objects.filter(is_active=True)
+        queryset = Product.objects.filter(is_active=True).order_by('-id')
+        if self.action == 'increment_view':
+            # Só precisamos saber se o produto existe
+            return queryset.only('pk', 'views_count')
+        queryset = queryset.for_serializer(relations=self.get_serializer_relations())
         
         # Filtros existentes
         category_slug = self.request.query_params.get('category')
@@ -70,42 +183,55 @@ class ProductViewSet(viewsets.ModelViewSet):
         if category_slug:
             queryset = queryset.filter(category__slug=category_slug)
         
+        # Faixa de preço pelo preço "a partir de" que o card mostra (sale_price = menor
+        # variação já com a promoção): os dois limites valem para o mesmo preço, numa
+        # coluna indexada (sem JOIN nem DISTINCT)
         if min_price:
-            queryset = queryset.filter(variants__price__gte=min_price).distinct()
+            queryset = queryset.filter(sale_price__gte=min_price)
             
         if max_price:
-            queryset = queryset.filter(variants__price__lte=max_price).distinct()
+            queryset = queryset.filter(sale_price__lte=max_price)
 
         return queryset
 
 
-class BannerViewSet(viewsets.ModelViewSet): 
+class BannerViewSet(ConditionalGetMixin, CachedResponseMixin, viewsets.ModelViewSet): 
     queryset = Banner.objects.filter(is_active=True)
     serializer_class = BannerSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+    cache_models = (Banner,)
 
     def get_permissions(self):
         if self.action in ['create', 'update', 'partial_update', 'destroy']:
             return [IsAuthenticated()]
         return []
 
-class CompanyConfigViewSet(viewsets.ReadOnlyModelViewSet):
+class CompanyConfigViewSet(ConditionalGetMixin, CachedResponseMixin, viewsets.ReadOnlyModelViewSet):
     queryset = CompanyConfig.objects.all()
     serializer_class = CompanyConfigSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+    cache_models = (CompanyConfig,)
 
 class DashboardStatsView(APIView):
     permission_classes = [IsAuthenticated] # Apenas logados veem os dados
 
     def get(self, request):
-        total_views = Product.objects.aggregate(Sum('views_count'))['views_count__sum'] or 0
-        top_products = Product.objects.order_by('-views_count')[:10]
-        
+        # Tudo lido das tabelas agregadas do analytics (nada de somar a tabela de produtos)
+        top_products = Product.objects.for_serializer().order_by('-views_count')[:10]
         serializer = ProductSerializer(top_products, many=True)
+
+        recent = rollup.top_products(days=7, limit=10)
+        names = Product.objects.in_bulk([row['product_id'] for row in recent])
         
         return Response({
-            "total_catalog_views": total_views,
-            "ranking": serializer.data
+            "total_catalog_views": rollup.total_catalog_views(),
+            "pending_views": view_counter.pending(),
+            "ranking": serializer.data,
+            "top_last_7_days": [
+                {"id": row['product_id'], "name": names[row['product_id']].name, "views": row['views']}
+                for row in recent if row['product_id'] in names
+            ],
+            "daily_trend": rollup.daily_trend(days=14),
         })
 
 class CouponViewSet(viewsets.ReadOnlyModelViewSet):
@@ -113,17 +239,16 @@ class CouponViewSet(viewsets.ReadOnlyModelViewSet):
     serializer_class = CouponSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
 
-    @action(detail=False, methods=['get'])
+    @action(detail=False, methods=['get'], throttle_classes=[CouponValidateThrottle])
     def validate(self, request):
-        code = request.query_params.get('code')
-        try:
-            coupon = Coupon.objects.get(code__iexact=code, is_active=True)
-            return Response({
-                'code': coupon.code,
-                'discount_percentage': coupon.discount_percentage
-            })
-        except Coupon.DoesNotExist:
+        # Consulta o índice em memória (sem banco); o throttle barra força bruta antes daqui
+        coupon = coupon_index.get(request.query_params.get('code'))
+        if coupon is None:
             return Response({'error': 'Cupom inválido'}, status=status.HTTP_404_NOT_FOUND)
+        return Response({
+            'code': coupon['code'],
+            'discount_percentage': coupon['discount_percentage']
+        })
 
 
 class FinishingViewSet(viewsets.ModelViewSet):
@@ -137,17 +262,23 @@ class FinishingViewSet(viewsets.ModelViewSet):
         return []
 
 
-class KitViewSet(viewsets.ModelViewSet):
+class KitViewSet(ConditionalGetMixin, CachedResponseMixin, viewsets.ModelViewSet):
     serializer_class = KitSerializer
-    filter_backends = [filters.SearchFilter, filters.OrderingFilter]
-    search_fields = ['name', 'description']
+    filter_backends = [FullTextSearchFilter, filters.OrderingFilter]
+    search_fields = ['name', 'description']  # usado só no fallback sem Postgres
     ordering_fields = ['created_at', 'price']
+    pagination_class = CatalogPagination
+    keyset_orderings = ['-created_at', 'created_at', 'price', '-price']
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+    cache_models = (Kit, Product, ProductVariant)
 
     def get_queryset(self):
         # Se for cliente acessando, mostra só os ativos.
         # No painel admin (onde usamos token), vamos buscar todos no frontend
-        queryset = Kit.objects.all().order_by('-created_at')
+        # Itens do kit + "a partir de" de cada um numa única query de prefetch
+        queryset = Kit.objects.prefetch_related(
+            Prefetch('products', queryset=Product.objects.for_upsell().order_by('pk'))
+        ).order_by('-created_at')
         
         slug = self.request.query_params.get('slug')
         is_active = self.request.query_params.get('is_active')
@@ -160,11 +291,46 @@ class KitViewSet(viewsets.ModelViewSet):
 
         return queryset
 
-class ExitPopupConfigViewSet(viewsets.ModelViewSet):
+class ExitPopupConfigViewSet(CachedResponseMixin, viewsets.ModelViewSet):
     queryset = ExitPopupConfig.objects.all()
     serializer_class = ExitPopupConfigSerializer
     permission_classes = [permissions.AllowAny] # Público
+    cache_models = (ExitPopupConfig,)
 
     def get_queryset(self):
         # Retorna apenas o ativo mais recente (ou o primeiro da lista)
-        return ExitPopupConfig.objects.filter(is_active=True).order_by('-created_at')[:1]
\ No newline at end of file
+        return ExitPopupConfig.objects.filter(is_active=True).order_by('-created_at')[:1]
+
+class PriceCampaignViewSet(viewsets.ModelViewSet):
+    """Campanhas de promoção/reajuste em lote (só painel)."""
+    queryset = PriceCampaign.objects.prefetch_related('categories', 'finishings')
+    serializer_class = PriceCampaignSerializer
+    permission_classes = [IsAuthenticated]
+
+    @action(detail=True, methods=['get'])
+    def preview(self, request, pk=None):
+        """Antes/depois sem gravar: GET /api/price-campaigns/{id}/preview/"""
+        return Response(campaigns.preview(self.get_object()))
+
+    @action(detail=True, methods=['post'])
+    def apply(self, request, pk=None):
+        """Aplica agora (sem esperar o início agendado): POST /api/price-campaigns/{id}/apply/"""
+        try:
+            campaign = campaigns.apply_campaign(self.get_object())
+        except campaigns.CampaignError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(self.get_serializer(campaign).data)
+
+    @action(detail=True, methods=['post'])
+    def rollback(self, request, pk=None):
+        """Desfaz, voltando os valores de antes: POST /api/price-campaigns/{id}/rollback/"""
+        try:
+            campaign = campaigns.rollback_campaign(self.get_object())
+        except campaigns.CampaignError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(self.get_serializer(campaign).data)
+
+    def perform_destroy(self, instance):
+        if instance.status == 'active':
+            raise ValidationError("Desfaça a campanha antes de apagar.")
+        instance.delete()
@@ -0,0 +1,28 @@
+import { NextResponse } from 'next/server';
+
+// O sitemap completo (produtos, kits e categorias) é gerado em streaming pelo backend
+export const dynamic = 'force-dynamic';
+export const revalidate = 0;
+
+const API_URL = "http://backend:8000/api";
+
+export async function GET() {
+    try {
+        const res = await fetch(`${API_URL}/sitemap.xml`, { cache: 'no-store' });
+
+        if (!res.ok || !res.body) {
+            throw new Error(`Falha ao buscar sitemap: ${res.status}`);
+        }
+
+        return new NextResponse(res.body, {
+            headers: {
+                'Content-Type': 'application/xml; charset=utf-8',
+                'Cache-Control': res.headers.get('Cache-Control') || 'public, max-age=3600',
+            },
+        });
+
+    } catch (error) {
+        console.error("Sitemap: erro ao buscar do backend:", error);
+        return new NextResponse("Erro ao gerar sitemap", { status: 500 });
+    }
+}
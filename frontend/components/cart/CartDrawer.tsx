@@ -4,7 +4,7 @@ import Link from "next/link";
 import { useCart } from "@/context/CartContext";
 import { X, MessageCircle, User, Phone, ArrowRight, ShoppingCart, Trash2, Ticket, Truck, PackagePlus } from "lucide-react";
 import { toast } from "react-hot-toast";
-import { getImageUrl, PIX_DISCOUNT_PERCENT, PIX_MULTIPLIER } from "@/services/api";
+import { getCompanyConfig, getImageUrl, quoteCart, PIX_DISCOUNT_PERCENT, PIX_MULTIPLIER } from "@/services/api";
 
 export default function CartDrawer({ isOpen, onClose }: { isOpen: boolean, onClose: () => void }) {
     const { cart, removeFromCart, coupon, applyCoupon, removeCoupon } = useCart();
@@ -12,6 +12,7 @@ export default function CartDrawer({ isOpen, onClose }: { isOpen: boolean, onClo
     const [couponInput, setCouponInput] = useState("");
     const [customerData, setCustomerData] = useState({ name: "", phone: "" });
     const [whatsappNumber, setWhatsappNumber] = useState("");
+    const [quote, setQuote] = useState<any | null>(null);
 
     // --- CONFIGURAÇÃO DA BARRA DE PROGRESSO ---
     const GOAL_AMOUNT = 300.00; // Valor para ganhar o bônus (Frete Grátis)
@@ -26,27 +27,31 @@ export default function CartDrawer({ isOpen, onClose }: { isOpen: boolean, onClo
                 setCustomerData({ name: savedName || "", phone: savedPhone || "" });
             }
 
-            const apiUrl = process.env.NEXT_PUBLIC_API_URL || "http://127.0.0.1:8000/api";
-
-            fetch(`${apiUrl}/company-config/`)
-                .then(res => res.json())
-                .then(data => {
-                    const configList = data.results || data;
-                    if (configList && configList.length > 0) {
-                        setWhatsappNumber(configList[0].whatsapp.replace(/\D/g, ""));
-                    }
-                })
-                .catch(() => console.error("Erro ao carregar configuração"));
+            getCompanyConfig().then(company => {
+                if (company?.whatsapp) {
+                    setWhatsappNumber(company.whatsapp.replace(/\D/g, ""));
+                }
+            });
         }
     }, [isOpen]);
 
-    const subtotal = cart.reduce((acc: number, item: any) => {
+    // Preço oficial vem do backend; enquanto não chega (ou se falhar) usa o cálculo local
+    useEffect(() => {
+        if (!isOpen) return;
+        let active = true;
+        quoteCart(cart, coupon?.code).then(data => { if (active) setQuote(data); });
+        return () => { active = false; };
+    }, [isOpen, cart, coupon]);
+
+    const localSubtotal = cart.reduce((acc: number, item: any) => {
         const price = item.selectedVariant?.price ? Number(item.selectedVariant.price) : 0;
         return acc + price;
     }, 0);
 
-    const discountValue = coupon ? (subtotal * coupon.discount) / 100 : 0;
+    const subtotal = quote ? Number(quote.subtotal) : localSubtotal;
+    const discountValue = quote ? Number(quote.discount) : (coupon ? (subtotal * coupon.discount) / 100 : 0);
     const total = subtotal - discountValue;
+    const pixTotal = quote ? Number(quote.pix_total) : total * PIX_MULTIPLIER;
 
     // --- LÓGICA DA BARRA DE PROGRESSO ---
     const progressPercentage = Math.min((total / GOAL_AMOUNT) * 100, 100);
@@ -103,7 +108,7 @@ export default function CartDrawer({ isOpen, onClose }: { isOpen: boolean, onClo
         }
 
         message += `\n✅ *TOTAL FINAL: R$ ${total.toFixed(2)}*\n`;
-        message += `🟩 *TOTAL NO PIX (${PIX_DISCOUNT_PERCENT}% OFF): R$ ${(total * PIX_MULTIPLIER).toFixed(2)}*\n`;
+        message += `🟩 *TOTAL NO PIX (${PIX_DISCOUNT_PERCENT}% OFF): R$ ${pixTotal.toFixed(2)}*\n`;
 
         if (goalReached) {
             message += `🚚 *BÔNUS ALCANÇADO:* Frete Grátis!\n`;
@@ -273,7 +278,7 @@ export default function CartDrawer({ isOpen, onClose }: { isOpen: boolean, onClo
                             {coupon && <p className="text-xs text-gray-500 line-through mb-[-4px]">R$ {subtotal.toFixed(2)}</p>}
                             <p className="text-3xl font-black text-brand-blue">R$ {total.toFixed(2)}</p>
                             <p className="text-xs font-bold text-green-400 mt-1">
-                                ou R$ {(total * PIX_MULTIPLIER).toFixed(2)} no PIX ({PIX_DISCOUNT_PERCENT}% OFF)
+                                ou R$ {pixTotal.toFixed(2)} no PIX ({PIX_DISCOUNT_PERCENT}% OFF)
                             </p>
                         </div>
                     </div>
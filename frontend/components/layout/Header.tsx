@@ -7,6 +7,7 @@ import { useEffect, useState } from "react";
 import { useCart } from "@/context/CartContext";
 import CartDrawer from "@/components/cart/CartDrawer";
 import SearchBar from "@/components/layout/SearchBar";
+import { getCompanyConfig } from "@/services/api";
 
 export default function Header() {
     const { theme, setTheme } = useTheme();
@@ -17,19 +18,11 @@ export default function Header() {
 
     useEffect(() => {
         async function loadCompanyConfig() {
-            try {
-                const res = await fetch(`${process.env.NEXT_PUBLIC_API_URL}/company-config/`);
-                const data = await res.json();
-
-                // BLINDAGEM: Lida com a paginação do Django
-                const configList = data.results || data;
-
-                if (configList && configList.length > 0) {
-                    // BLINDAGEM: Tira parênteses, traços e espaços para não quebrar o link!
-                    setWhatsapp(configList[0].whatsapp.replace(/\D/g, ""));
-                }
-            } catch (error) {
-                console.error("Erro ao carregar WhatsApp", error);
+            // Mesmo endpoint do resto do site (/site-settings/, servido da memória do backend)
+            const company = await getCompanyConfig();
+            if (company?.whatsapp) {
+                // BLINDAGEM: Tira parênteses, traços e espaços para não quebrar o link!
+                setWhatsapp(company.whatsapp.replace(/\D/g, ""));
             }
         }
         loadCompanyConfig();
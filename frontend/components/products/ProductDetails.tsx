@@ -2,7 +2,7 @@
 import { useState, useEffect, useRef } from "react";
 import Link from "next/link";
 import { useCart } from "@/context/CartContext";
-import { registerView, getImageUrl, getCompanyConfig, PIX_MULTIPLIER, PIX_DISCOUNT_PERCENT } from "@/services/api";
+import { registerView, getRecommendations, getImageUrl, getCompanyConfig, PIX_MULTIPLIER, PIX_DISCOUNT_PERCENT } from "@/services/api";
 import { ShoppingCart, ShieldCheck, Clock, Truck, MessageCircle, TrendingDown, PackagePlus } from "lucide-react";
 import { toast } from "react-hot-toast";
 
@@ -17,12 +17,18 @@ export default function ProductDetails({ product }: { product: any }) {
     const [selectedVariant, setSelectedVariant] = useState(defaultVariant);
     const [showStickyBar, setShowStickyBar] = useState(false);
     const [whatsappNumber, setWhatsappNumber] = useState("");
+    const [recommended, setRecommended] = useState<any[]>([]);
 
     const mainButtonRef = useRef<HTMLDivElement>(null);
+    const upsells = product.upsell_products?.length ? product.upsell_products : recommended;
 
     // --- EFEITOS ---
     useEffect(() => {
         if (product?.id) registerView(product.id);
+        // Sem "Compre Junto" cadastrado, mostra o que outros clientes viram junto
+        if (product?.id && !product.upsell_products?.length) {
+            getRecommendations(product.id).then(setRecommended);
+        }
 
         getCompanyConfig().then(response => {
             const configList = response?.results || response;
@@ -230,13 +236,13 @@ export default function ProductDetails({ product }: { product: any }) {
             </div>
 
             {/* INÍCIO DO COMPRE JUNTO (UPSELL) */}
-            {product.upsell_products && product.upsell_products.length > 0 && (
+            {upsells.length > 0 && (
                 <div className="col-span-full mt-12 pt-10 border-t border-white/10 animate-in fade-in slide-in-from-bottom-8">
                     <h3 className="text-2xl font-black text-white mb-6 uppercase tracking-widest flex items-center gap-3">
                         <PackagePlus className="text-brand-blue" size={28} /> Aproveite e leve também
                     </h3>
                     <div className="grid grid-cols-1 md:grid-cols-2 lg:grid-cols-3 gap-6">
-                        {product.upsell_products.map((upsell: any) => (
+                        {upsells.map((upsell: any) => (
                             <Link
                                 key={upsell.id}
                                 href={`/produto/${upsell.slug}`}
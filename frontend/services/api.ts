@@ -95,14 +95,36 @@ export const getCategories = async () => {
     return data.results || data;
 };
 
-export const getCompanyConfig = async () => {
+// Dados da empresa + pop-up ativo numa chamada só (servido da memória do backend)
+export const getSiteSettings = async (options: RequestInit = { next: { revalidate: 60 } }) => {
     try {
-        const res = await fetch(`${API_URL_ENV}/company-config/`, { next: { revalidate: 600 } });
+        const res = await fetch(`${API_URL_ENV}/site-settings/`, options);
         if (!res.ok) return null;
+        return await res.json();
+    } catch { return null; }
+};
 
-        const data = await res.json();
-        const configList = data.results || data;
-        return Array.isArray(configList) && configList.length > 0 ? configList[0] : null;
+export const getCompanyConfig = async () => {
+    const settings = await getSiteSettings();
+    return settings?.company ?? null;
+};
+
+// Recalcula o carrinho no backend (preços atuais, promoção, m², cupom e PIX) numa chamada só
+export const quoteCart = async (cart: any[], couponCode?: string) => {
+    const items = cart.map((item: any) => {
+        if (String(item.id).startsWith('kit-')) return { kit: item.selectedVariant?.id };
+        const { id, width, height } = item.selectedVariant || {};
+        return width && height ? { variant: id, width, height } : { variant: id };
+    });
+    if (items.length === 0) return null;
+    try {
+        const res = await fetch(`${API_URL_ENV}/cart/quote/`, {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ items, coupon: couponCode || '' }),
+        });
+        if (!res.ok) return null;
+        return await res.json();
     } catch { return null; }
 };
 
@@ -126,6 +148,16 @@ export const getKitBySlug = async (slug: string) => {
     } catch { return null; }
 };
 
+// Id aleatório da aba (some ao fechar): o backend só guarda um hash dele, para o "quem viu também viu"
+const getSessionId = () => {
+    let id = sessionStorage.getItem("@CloudDesign:session");
+    if (!id) {
+        id = crypto.randomUUID();
+        sessionStorage.setItem("@CloudDesign:session", id);
+    }
+    return id;
+};
+
 export const registerView = async (productId: number) => {
     try {
         await fetch(`${API_URL_ENV}/products/${productId}/increment_view/`, {
@@ -133,6 +165,7 @@ export const registerView = async (productId: number) => {
             headers: {
                 'Content-Type': 'application/json',
             },
+            body: JSON.stringify({ session: getSessionId() }),
             keepalive: true // Garante que o request termine mesmo se mudar de página
         });
     } catch (error) {
@@ -140,6 +173,15 @@ export const registerView = async (productId: number) => {
     }
 };
 
+// "Quem viu também viu" (pré-calculado no backend)
+export const getRecommendations = async (productId: number) => {
+    try {
+        const res = await fetch(`${API_URL_ENV}/products/${productId}/recommendations/`);
+        if (!res.ok) return [];
+        return await res.json();
+    } catch { return []; }
+};
+
 export const getProductBySlug = async (slug: string) => {
     try {
         console.log(`[API] Buscando slug: ${slug} em ${API_URL}`); // Log para debug
@@ -171,13 +213,6 @@ export const getProductBySlug = async (slug: string) => {
 };
 
 export const getExitPopupConfig = async () => {
-    try {
-        const res = await fetch(`${API_URL_ENV}/popup-config/`, { next: { revalidate: 0 }, cache: 'no-store' });
-        if (!res.ok) return null;
-        const data = await res.json();
-        // A API pode retornar lista ou objeto, garantimos pegar o primeiro item
-        if (Array.isArray(data) && data.length > 0) return data[0];
-        if (Array.isArray(data) && data.length === 0) return null;
-        return data; // Se for objeto direto
-    } catch { return null; }
+    const settings = await getSiteSettings({ cache: 'no-store' });
+    return settings?.exit_popup ?? null;
 };
\ No newline at end of file